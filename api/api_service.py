@@ -1,8 +1,22 @@
 """FastAPI Application for Sales Analytics"""
-from fastapi import FastAPI, HTTPException
-from models.database import db_manager
+from config.settings import config, load_env
+
+# This module is the API's entry point (uvicorn api.api_service:app): load .env before the database
+# manager and routes below read their settings
+load_env()
+
+from datetime import date
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from models.async_database import async_db_manager, PoolExhausted, StatementTimeout
+from models.generation import SELECT_SQL as LOAD_GENERATION_SQL
+from api.cache import ResponseCache
+from api import metrics, queries
+from etl.instrumentation import ETL_PROCESS
+from api.pagination import KeysetQuery, DEFAULT_PAGE_SIZE, STREAM_MEDIA_TYPES, page, stream_rows_async
 from config.logger import setup_logger
-from config.settings import config
 
 logger = setup_logger(__name__)
 
@@ -12,8 +26,27 @@ app = FastAPI(
     version="1.0.0"
 )
 
+async def read_load_generation():
+    return int(await async_db_manager.fetchval(LOAD_GENERATION_SQL) or 0)
+
+response_cache = ResponseCache(read_load_generation)
+
+@app.exception_handler(PoolExhausted)
+async def pool_exhausted_handler(request: Request, exc: PoolExhausted):
+    logger.warning(f"Rejecting {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(StatementTimeout)
+async def statement_timeout_handler(request: Request, exc: StatementTimeout):
+    logger.warning(f"Timed out serving {request.url.path}: {exc}")
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.on_event("shutdown")
+async def shutdown():
+    await async_db_manager.close()
+
 @app.get("/")
-def root():
+async def root():
     return {
         "name": "Sales Analytics API",
         "version": "1.0.0",
@@ -21,57 +54,111 @@ def root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     try:
-        db_manager.execute_query("SELECT 1")
-        return {"status": "healthy", "database": "connected"}
+        await async_db_manager.fetchval("SELECT 1")
+        return {"status": "healthy", "database": "connected", "pool": async_db_manager.pool_stats()}
     except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        return {"status": "unhealthy", "error": str(e), "pool": async_db_manager.pool_stats()}
+
+@app.get("/api/v1/pool/stats")
+async def get_pool_stats():
+    return async_db_manager.pool_stats()
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    return response_cache.stats()
+
+if config.API_METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        registry = metrics.MetricsRegistry()
+        metrics.add_pool_metrics(registry, async_db_manager.pool_stats())
+        metrics.add_cache_metrics(registry, response_cache.stats())
+        try:
+            metrics.add_stage_metrics(registry, await async_db_manager.fetch(metrics.LATEST_STAGES_SQL, ETL_PROCESS))
+        except (PoolExhausted, StatementTimeout):
+            raise
+        except Exception as e:
+            logger.warning(f"Could not read ETL stage metrics: {e}")
+        return metrics.metrics_response(registry)
 
 @app.get("/api/v1/sales/metrics")
-def get_sales_metrics():
+async def get_sales_metrics(request: Request):
+    return await response_cache.respond_async(request, _sales_metrics)
+
+async def _sales_metrics():
     try:
-        query = """
-            SELECT 
-                COUNT(*) as total_transactions,
-                SUM(amount) as total_revenue,
-                AVG(amount) as avg_transaction_value,
-                SUM(CASE WHEN is_won = TRUE THEN amount ELSE 0 END) as won_revenue
-            FROM fact_sales
-        """
-        result = db_manager.execute_query(query)
-        
-        if result and result[0]:
-            row = result[0]
-            return {
-                "total_transactions": int(row[0] or 0),
-                "total_revenue": float(row[1] or 0),
-                "avg_transaction_value": float(row[2] or 0),
-                "won_revenue": float(row[3] or 0)
-            }
-        return {"message": "No data available"}
+        return queries.sales_metrics(await async_db_manager.fetchrow(queries.SALES_METRICS_SQL))
+    except (PoolExhausted, StatementTimeout):
+        raise
     except Exception as e:
         logger.error(f"Error fetching metrics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/v1/customers")
-def get_customers():
+FORMAT_PATTERN = '^(json|ndjson|csv)$'
+
+async def _page(query: KeysetQuery, columns: list, after, limit: int, name: str):
+    limit = min(limit or DEFAULT_PAGE_SIZE, config.API_MAX_PAGE_SIZE)
     try:
-        query = "SELECT customer_name, industry, city, state FROM dim_customer LIMIT 10"
-        results = db_manager.execute_query(query)
-        
-        return [
-            {
-                "customer_name": row[0],
-                "industry": row[1],
-                "city": row[2],
-                "state": row[3]
-            }
-            for row in results
-        ]
+        sql, params = query.sql(after=after, limit=limit + 1)
+        rows = await async_db_manager.fetch(sql, *params)
+    except (PoolExhausted, StatementTimeout):
+        raise
     except Exception as e:
-        logger.error(f"Error fetching customers: {e}")
+        logger.error(f"Error fetching {name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    records, next_cursor = page(rows, columns, limit, query.key)
+    return {name: records, "next_cursor": next_cursor}
+
+async def _export(query: KeysetQuery, columns: list, after, limit, fmt: str, name: str):
+    sql, params = query.sql(after=after, limit=limit)
+    batches = await async_db_manager.stream(sql, *params)
+    return StreamingResponse(
+        stream_rows_async(columns, batches, fmt),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+        # Runs after the response however it ended, including a disconnect before the body started
+        background=BackgroundTask(batches.aclose)
+    )
+
+@app.get("/api/v1/customers")
+async def get_customers(
+    request: Request,
+    industry: Optional[str] = None,
+    state: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    after: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size for json; row cap for ndjson/csv exports"),
+    fmt: str = Query('json', alias='format', pattern=FORMAT_PATTERN)
+):
+    query = queries.customers_query('numeric', industry, state, created_from, created_to)
+    if fmt != 'json':
+        return await _export(query, queries.CUSTOMER_COLUMNS, after, limit, fmt, 'customers')
+    return await response_cache.respond_async(
+        request, lambda: _page(query, queries.CUSTOMER_COLUMNS, after, limit, 'customers')
+    )
+
+@app.get("/api/v1/sales/facts")
+async def get_sales_facts(
+    request: Request,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    customer_key: Optional[int] = None,
+    product_key: Optional[int] = None,
+    source_system: Optional[str] = None,
+    is_won: Optional[bool] = None,
+    after: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size for json; row cap for ndjson/csv exports"),
+    fmt: str = Query('json', alias='format', pattern=FORMAT_PATTERN)
+):
+    query = queries.facts_query('numeric', date_from, date_to, customer_key, product_key, source_system, is_won)
+    if fmt != 'json':
+        return await _export(query, queries.FACT_COLUMNS, after, limit, fmt, 'sales_facts')
+    return await response_cache.respond_async(
+        request, lambda: _page(query, queries.FACT_COLUMNS, after, limit, 'facts')
+    )
 
 if __name__ == "__main__":
     import uvicorn
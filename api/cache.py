@@ -0,0 +1,138 @@
+"""TTL + LRU response cache for read endpoints, invalidated by the ETL load generation"""
+import json
+import time
+import inspect
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Any
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class ResponseCache:
+    def __init__(self, generation_reader: Callable[[], int], max_entries: int = None,
+                 ttl: float = None, generation_poll_interval: float = None):
+        self.generation_reader = generation_reader
+        self.max_entries = max_entries or config.API_CACHE_MAX_ENTRIES
+        self.ttl = config.API_CACHE_TTL if ttl is None else ttl
+        self.generation_poll_interval = (
+            config.API_CACHE_GENERATION_POLL if generation_poll_interval is None else generation_poll_interval
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _generation_fresh(self) -> bool:
+        return (self._generation is not None
+                and time.monotonic() - self._generation_checked < self.generation_poll_interval)
+
+    def current_generation(self):
+        if self._generation_fresh():
+            return self._generation
+        try:
+            generation = self.generation_reader()
+        except Exception as e:
+            logger.warning(f"Could not read load generation, bypassing cache: {e}")
+            return None
+        return self._set_generation(generation)
+
+    async def current_generation_async(self):
+        if self._generation_fresh():
+            return self._generation
+        try:
+            generation = self.generation_reader()
+            if inspect.isawaitable(generation):
+                generation = await generation
+        except Exception as e:
+            logger.warning(f"Could not read load generation, bypassing cache: {e}")
+            return None
+        return self._set_generation(generation)
+
+    def _set_generation(self, generation):
+        now = time.monotonic()
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+            self._generation = generation
+            self._generation_checked = now
+        return generation
+
+    def _key(self, request: Request):
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    def _lookup(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, entry_generation, etag, payload = entry
+            if entry_generation != generation or time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return etag, payload, 'HIT'
+
+    def _store(self, key, generation, etag, payload):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, generation, etag, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def respond(self, request: Request, compute: Callable[[], Any]) -> Response:
+        generation = self.current_generation()
+        key = self._key(request)
+        cached = self._lookup(key, generation) if generation is not None else None
+        if cached is None:
+            cached = self._encode(key, generation, compute())
+        return self._render(request, cached)
+
+    async def respond_async(self, request: Request, compute: Callable[[], Any]) -> Response:
+        """Like respond(), for an async generation reader and a coroutine function computing the body"""
+        generation = await self.current_generation_async()
+        key = self._key(request)
+        cached = self._lookup(key, generation) if generation is not None else None
+        if cached is None:
+            cached = self._encode(key, generation, await compute())
+        return self._render(request, cached)
+
+    def _encode(self, key, generation, body):
+        self.misses += 1
+        payload = json.dumps(jsonable_encoder(body)).encode()
+        etag = f'W/"{generation}-{hashlib.sha1(payload).hexdigest()[:16]}"'
+        if generation is not None:
+            self._store(key, generation, etag, payload)
+        return etag, payload, 'MISS'
+
+    def _render(self, request: Request, cached) -> Response:
+        etag, payload, status = cached
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'X-Cache': status}
+        if _not_modified(etag, request.headers.get('if-none-match')):
+            return Response(status_code=304, headers=headers)
+        return Response(content=payload, media_type='application/json', headers=headers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'generation': self._generation
+            }
+
+def _not_modified(etag: str, if_none_match) -> bool:
+    """If-None-Match matches the current ETag, or is * (any current representation)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in {tag.strip() for tag in if_none_match.split(',')}
@@ -0,0 +1,83 @@
+"""Prometheus text exposition for API pool/cache stats and the latest ETL stage metrics"""
+from fastapi import Response
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+LATEST_STAGES_SQL = """
+    SELECT DISTINCT ON (stage, COALESCE(source_system, ''))
+           stage, COALESCE(source_system, '') AS source_system, status, end_time,
+           duration_seconds, records_processed, records_inserted, records_updated, bytes_processed,
+           rows_per_second, peak_rss_mb, retry_sleep_seconds, rate_limit_sleep_seconds
+    FROM etl_log
+    WHERE etl_process = $1 AND stage IS NOT NULL
+    ORDER BY stage, COALESCE(source_system, ''), log_id DESC
+"""
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families = {}
+
+    def add(self, name: str, metric_type: str, help_text: str, value, labels: dict = None):
+        if value is None:
+            return
+        family = self._families.setdefault(name, (metric_type, help_text, []))
+        family[2].append((labels or {}, float(value)))
+
+    def render(self) -> str:
+        lines = []
+        for name, (metric_type, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+def add_pool_metrics(registry: MetricsRegistry, stats: dict):
+    for state in ('size', 'idle', 'in_use', 'waiting'):
+        registry.add('sales_api_db_pool_connections', 'gauge', "Async DB pool connections by state",
+                     stats.get(state), {'state': state})
+    for counter in ('acquires', 'rejected', 'acquire_timeouts', 'statement_timeouts'):
+        registry.add(f'sales_api_db_pool_{counter}_total', 'counter', f"Async DB pool {counter.replace('_', ' ')}",
+                     stats.get(counter))
+
+def add_cache_metrics(registry: MetricsRegistry, stats: dict):
+    registry.add('sales_api_cache_hits_total', 'counter', "Response cache hits", stats['hits'])
+    registry.add('sales_api_cache_misses_total', 'counter', "Response cache misses", stats['misses'])
+    registry.add('sales_api_cache_entries', 'gauge', "Response cache entries", stats['entries'])
+    registry.add('sales_api_load_generation', 'gauge', "Warehouse load generation seen by the cache",
+                 stats['generation'])
+
+def add_stage_metrics(registry: MetricsRegistry, rows):
+    for row in rows:
+        labels = {'stage': row['stage'], 'source_system': row['source_system']}
+        registry.add('etl_stage_success', 'gauge', "1 if the latest run of the stage succeeded",
+                     1 if row['status'] == 'SUCCESS' else 0, labels)
+        if row['end_time'] is not None:
+            registry.add('etl_stage_last_run_timestamp_seconds', 'gauge', "End time of the latest run of the stage",
+                         row['end_time'].timestamp(), labels)
+        registry.add('etl_stage_duration_seconds', 'gauge', "Wall time of the latest run of the stage",
+                     row['duration_seconds'], labels)
+        registry.add('etl_stage_rows', 'gauge', "Rows in, out (inserted) and updated in the latest run of the stage",
+                     row['records_processed'], {**labels, 'direction': 'in'})
+        registry.add('etl_stage_rows', 'gauge', "Rows in, out (inserted) and updated in the latest run of the stage",
+                     row['records_inserted'], {**labels, 'direction': 'out'})
+        registry.add('etl_stage_rows', 'gauge', "Rows in, out (inserted) and updated in the latest run of the stage",
+                     row['records_updated'], {**labels, 'direction': 'updated'})
+        registry.add('etl_stage_rows_per_second', 'gauge', "Throughput of the latest run of the stage",
+                     row['rows_per_second'], labels)
+        registry.add('etl_stage_bytes', 'gauge', "Bytes processed by the latest run of the stage",
+                     row['bytes_processed'], labels)
+        if row['peak_rss_mb'] is not None:
+            registry.add('etl_stage_peak_rss_bytes', 'gauge', "Pipeline process peak RSS at the end of the stage",
+                         float(row['peak_rss_mb']) * 1024 * 1024, labels)
+        registry.add('etl_stage_sleep_seconds', 'gauge', "Connector sleep time in the latest run of the stage",
+                     row['retry_sleep_seconds'], {**labels, 'kind': 'retry'})
+        registry.add('etl_stage_sleep_seconds', 'gauge', "Connector sleep time in the latest run of the stage",
+                     row['rate_limit_sleep_seconds'], {**labels, 'kind': 'rate_limit'})
+
+def metrics_response(registry: MetricsRegistry) -> Response:
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,87 @@
+"""Keyset pagination, filtering and streamed exports shared by the APIs"""
+import csv
+import io
+import json
+from fastapi.encoders import jsonable_encoder
+
+DEFAULT_PAGE_SIZE = 100
+
+STREAM_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+class KeysetQuery:
+    """SELECT ... WHERE <filters> AND <key> > <after> ORDER BY <key> LIMIT <n>
+
+    paramstyle is 'numeric' ($1, $2 for asyncpg) or 'qmark' (? for sqlite3).
+    """
+
+    def __init__(self, select: str, key: str, paramstyle: str = 'numeric'):
+        self.select = select
+        self.key = key
+        self.paramstyle = paramstyle
+        self.clauses = []
+        self.params = []
+
+    def _placeholder(self, position: int) -> str:
+        return f"${position}" if self.paramstyle == 'numeric' else '?'
+
+    def where(self, clause: str, value):
+        """Add a filter whose single {} is replaced by a placeholder; skipped when value is None"""
+        if value is not None:
+            self.params.append(value)
+            self.clauses.append(clause.format(self._placeholder(len(self.params))))
+        return self
+
+    def sql(self, after=None, limit: int = None):
+        clauses, params = list(self.clauses), list(self.params)
+        if after is not None:
+            params.append(after)
+            clauses.append(f"{self.key} > {self._placeholder(len(params))}")
+
+        query = self.select
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {self.key}"
+        if limit is not None:
+            params.append(limit)
+            query += f" LIMIT {self._placeholder(len(params))}"
+        return query, params
+
+def page(rows, columns: list, limit: int, key: str):
+    """Turn limit + 1 fetched rows into (records, next_cursor)"""
+    records = [dict(zip(columns, row)) for row in rows[:limit]]
+    next_cursor = records[-1][key] if len(rows) > limit else None
+    return records, next_cursor
+
+def encode_rows(columns: list, rows, fmt: str) -> bytes:
+    if fmt == 'ndjson':
+        return ''.join(
+            json.dumps(jsonable_encoder(dict(zip(columns, row)))) + '\n' for row in rows
+        ).encode()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+def encode_header(columns: list, fmt: str) -> bytes:
+    if fmt != 'csv':
+        return b''
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+def stream_rows(columns: list, batches, fmt: str):
+    """Encode an iterable of row batches as NDJSON or CSV"""
+    yield encode_header(columns, fmt)
+    for rows in batches:
+        yield encode_rows(columns, rows, fmt)
+
+async def stream_rows_async(columns: list, batches, fmt: str):
+    """Async stream_rows; closes batches however the response ends, releasing what it holds"""
+    try:
+        yield encode_header(columns, fmt)
+        async for rows in batches:
+            yield encode_rows(columns, rows, fmt)
+    finally:
+        await batches.aclose()
@@ -0,0 +1,65 @@
+"""Warehouse queries shared by the Postgres (asyncpg) and SQLite APIs"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from api.pagination import KeysetQuery
+
+CUSTOMER_COLUMNS = ['customer_key', 'customer_id', 'customer_name', 'industry', 'city', 'state', 'created_date']
+
+FACT_COLUMNS = [
+    'sales_key', 'date_key', 'customer_key', 'product_key', 'sales_rep_key', 'territory_key',
+    'amount', 'is_won', 'is_closed', 'transaction_date', 'source_system', 'source_id'
+]
+
+# Served from the incrementally maintained summary table rather than scanning fact_sales
+SALES_METRICS_SQL = """
+    SELECT
+        COALESCE(SUM(transaction_count), 0) as total_transactions,
+        COALESCE(SUM(total_amount), 0) as total_revenue,
+        COALESCE(SUM(won_amount), 0) as won_revenue,
+        (SELECT refreshed_at FROM agg_refresh WHERE summary_name = 'sales') as as_of
+    FROM agg_sales_monthly
+"""
+
+def _day_start(day: Optional[date], days: int = 0):
+    return datetime.combine(day + timedelta(days=days), time.min) if day else None
+
+def _date_key(day: Optional[date]):
+    return day.year * 10000 + day.month * 100 + day.day if day else None
+
+def customers_query(paramstyle: str, industry: str = None, state: str = None,
+                    created_from: date = None, created_to: date = None) -> KeysetQuery:
+    return (
+        KeysetQuery(f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM dim_customer", 'customer_key', paramstyle)
+        .where("industry = {}", industry)
+        .where("state = {}", state)
+        .where("created_date >= {}", _day_start(created_from))
+        .where("created_date < {}", _day_start(created_to, days=1))
+    )
+
+def facts_query(paramstyle: str, date_from: date = None, date_to: date = None, customer_key: int = None,
+                product_key: int = None, source_system: str = None, is_won: bool = None) -> KeysetQuery:
+    return (
+        KeysetQuery(f"SELECT {', '.join(FACT_COLUMNS)} FROM fact_sales", 'sales_key', paramstyle)
+        # Date filters compare date_key, the partition key, so only partitions in range are scanned
+        .where("date_key >= {}", _date_key(date_from))
+        .where("date_key <= {}", _date_key(date_to))
+        .where("customer_key = {}", customer_key)
+        .where("product_key = {}", product_key)
+        .where("source_system = {}", source_system)
+        .where("is_won = {}", is_won)
+    )
+
+def sales_metrics(row) -> dict:
+    if not row:
+        return {"message": "No data available"}
+    total_transactions = int(row[0])
+    total_revenue = float(row[1])
+    as_of = row[3]
+    return {
+        "total_transactions": total_transactions,
+        "total_revenue": total_revenue,
+        "avg_transaction_value": total_revenue / total_transactions if total_transactions else 0.0,
+        "won_revenue": float(row[2]),
+        # asyncpg returns a datetime, sqlite3 the stored ISO text
+        "as_of": as_of.isoformat() if isinstance(as_of, datetime) else as_of
+    }
@@ -1,14 +1,37 @@
 """Simple API for Sales Analytics"""
-from fastapi import FastAPI
+from config.settings import config, load_env
+
+# Entry point of the simple API: load .env before anything reads its settings
+load_env()
+
+from datetime import date
+from typing import Optional
+from fastapi import FastAPI, Request, Query
+from fastapi.responses import StreamingResponse
 import sqlite3
+from models.generation import SELECT_SQL as LOAD_GENERATION_SQL
+from models import sqlite_adapters  # noqa: F401 - registers the sqlite3 date adapters
+from api import queries
+from api.cache import ResponseCache
+from api.pagination import DEFAULT_PAGE_SIZE, STREAM_MEDIA_TYPES, page, stream_rows
 
 app = FastAPI(title="Sales Analytics API")
 
 def get_db():
-    conn = sqlite3.connect('sales_analytics.db')
+    conn = sqlite3.connect(config.SQLITE_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+def load_generation():
+    conn = get_db()
+    try:
+        row = conn.execute(LOAD_GENERATION_SQL).fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+response_cache = ResponseCache(load_generation)
+
 @app.get("/")
 def root():
     return {"name": "Sales Analytics API", "status": "active"}
@@ -17,30 +40,90 @@ def root():
 def health():
     try:
         conn = get_db()
-        conn.execute("SELECT 1")
-        conn.close()
+        try:
+            conn.execute("SELECT 1")
+        finally:
+            conn.close()
         return {"status": "healthy"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
-@app.get("/api/v1/customers")
-def get_customers():
+def _page(query, columns, after, limit, name):
+    limit = min(limit or DEFAULT_PAGE_SIZE, config.API_MAX_PAGE_SIZE)
+    sql, params = query.sql(after=after, limit=limit + 1)
     conn = get_db()
-    cursor = conn.execute("SELECT * FROM dim_customer")
-    customers = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return {"customers": customers}
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    records, next_cursor = page(rows, columns, limit, query.key)
+    return {name: records, "next_cursor": next_cursor}
+
+def _batches(sql, params):
+    # The response body is iterated from threadpool workers, so the connection may hop threads
+    conn = sqlite3.connect(config.SQLITE_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(config.API_STREAM_BATCH_ROWS)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def _export(query, columns, after, limit, fmt, name):
+    sql, params = query.sql(after=after, limit=limit)
+    return StreamingResponse(
+        stream_rows(columns, _batches(sql, params), fmt),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    )
+
+@app.get("/api/v1/customers")
+def get_customers(
+    request: Request,
+    industry: Optional[str] = None,
+    state: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fmt: str = Query('json', alias='format', pattern='^(json|ndjson|csv)$')
+):
+    query = queries.customers_query('qmark', industry, state, created_from, created_to)
+    if fmt != 'json':
+        return _export(query, queries.CUSTOMER_COLUMNS, after, limit, fmt, 'customers')
+    return response_cache.respond(request, lambda: _page(query, queries.CUSTOMER_COLUMNS, after, limit, 'customers'))
+
+@app.get("/api/v1/sales/facts")
+def get_sales_facts(
+    request: Request,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    customer_key: Optional[int] = None,
+    product_key: Optional[int] = None,
+    source_system: Optional[str] = None,
+    is_won: Optional[bool] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fmt: str = Query('json', alias='format', pattern='^(json|ndjson|csv)$')
+):
+    query = queries.facts_query('qmark', date_from, date_to, customer_key, product_key, source_system, is_won)
+    if fmt != 'json':
+        return _export(query, queries.FACT_COLUMNS, after, limit, fmt, 'sales_facts')
+    return response_cache.respond(request, lambda: _page(query, queries.FACT_COLUMNS, after, limit, 'facts'))
 
 @app.get("/api/v1/sales/metrics")
-def get_metrics():
+def get_metrics(request: Request):
+    return response_cache.respond(request, _metrics)
+
+def _metrics():
     conn = get_db()
-    cursor = conn.execute("SELECT COUNT(*), SUM(amount) FROM fact_sales")
-    count, total = cursor.fetchone()
-    conn.close()
-    return {
-        "total_transactions": count,
-        "total_revenue": float(total or 0)
-    }
+    try:
+        return queries.sales_metrics(conn.execute(queries.SALES_METRICS_SQL).fetchone())
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     import uvicorn
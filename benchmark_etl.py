@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Benchmark extract -> transform -> load at scale against SQLite and a local Postgres
+
+Each (backend, scale) runs in a fresh worker process fed by the synthetic mock connectors, so peak RSS
+is measured per run. Per-stage throughput and memory are compared against benchmark_baseline.json.
+
+    python benchmark_etl.py                                  # 10k and 1m on both backends
+    python benchmark_etl.py --scales 10k,1m,10m --backends postgres
+    python benchmark_etl.py --update-baseline                # record the current results as the baseline
+    python benchmark_etl.py --backends postgres --load-workers 4   # parallel fact loading
+    python benchmark_etl.py --check                          # exit 1 on a regression beyond --tolerance
+
+Both backends run the same pipeline (SalesDataPipeline) through the warehouse backend interface.
+Postgres runs go to an isolated etl_benchmark schema that is dropped afterwards, so the regular
+warehouse tables are never touched; SQLite runs use a throwaway database file.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from config.settings import load_env
+
+BASELINE = Path(__file__).with_name('benchmark_baseline.json')
+BENCH_SCHEMA = 'etl_benchmark'
+RESULT_MARKER = 'BENCHMARK_RESULT '
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+# Stages shorter than this are too noisy to flag as throughput regressions
+MIN_COMPARABLE_SECONDS = 0.2
+
+def parse_scale(text: str) -> tuple:
+    label = text.strip().lower()
+    if label in SCALES:
+        return label, SCALES[label]
+    return label, int(label)
+
+def stage_key(stage: dict) -> str:
+    return f"{stage['stage']}[{stage['source_system']}]" if stage['source_system'] else stage['stage']
+
+def stage_table(metrics) -> dict:
+    """Per-stage summary keyed stage[source]; repeated stages (one per entity) are summed"""
+    table = {}
+    for s in metrics:
+        row = table.setdefault(stage_key(s), {'seconds': 0.0, 'rows_in': 0, 'rows_out': 0})
+        row['seconds'] = round(row['seconds'] + s['seconds'], 4)
+        row['rows_in'] += s['rows_in']
+        row['rows_out'] += s['rows_out']
+        row['rows_per_second'] = round((row['rows_in'] or row['rows_out']) / row['seconds'], 1) if row['seconds'] else 0.0
+        row['peak_rss_mb'] = max(row.get('peak_rss_mb') or 0, s['peak_rss_mb'] or 0)
+    return table
+
+# --- workers (run in a subprocess; configuration comes from the environment) ---
+
+def _run_pipeline(db) -> dict:
+    from etl.pipeline import SalesDataPipeline
+
+    db.initialize_schema()
+    start = time.perf_counter()
+    result = SalesDataPipeline(db=db).run_full_pipeline()
+    seconds = time.perf_counter() - start
+    if result['status'] == 'FAILED':
+        raise RuntimeError(result['error'])
+    if result['extract_errors']:
+        raise RuntimeError(f"Extraction failed: {result['extract_errors']}")
+    return {'seconds': round(seconds, 3), 'fact_rows': db.execute_query("SELECT COUNT(*) FROM fact_sales")[0][0],
+            'bytes_per_row': {entity: m['bytes_per_row'] for entity, m in result['entity_memory'].items()},
+            'stages': stage_table(result['stages'])}
+
+def postgres_worker(workdir: Path) -> dict:
+    from models.database import DatabaseManager
+
+    admin = DatabaseManager()
+    admin.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE; CREATE SCHEMA {BENCH_SCHEMA}")
+    db = DatabaseManager()
+    db.connection_params['options'] = f"-c search_path={BENCH_SCHEMA}"
+    try:
+        return _run_pipeline(db)
+    finally:
+        db.close()
+        admin.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        admin.close()
+
+def sqlite_worker(workdir: Path) -> dict:
+    from models.sqlite_database import SQLiteDatabaseManager
+
+    db = SQLiteDatabaseManager(workdir / 'benchmark.db')
+    try:
+        return _run_pipeline(db)
+    finally:
+        db.close()
+
+def run_worker(args) -> int:
+    from etl.instrumentation import peak_rss_mb
+
+    worker = postgres_worker if args.worker == 'postgres' else sqlite_worker
+    result = worker(Path(os.environ['STAGING_DIR']))
+    result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    print(RESULT_MARKER + json.dumps(result))
+    return 0
+
+# --- parent ---
+
+def run_benchmark(backend: str, rows: int, seed: int, timeout: float, load_workers: int = 1) -> dict:
+    with tempfile.TemporaryDirectory(prefix='etl-benchmark-') as workdir:
+        env = {
+            **os.environ,
+            'MOCK_SYNTHETIC_ROWS': str(rows),
+            'MOCK_SYNTHETIC_SEED': str(seed),
+            'STAGING_DIR': workdir,
+            'STAGING_KEEP_RUNS': '1',
+            'DIMENSION_CACHE_PERSIST': 'false',
+            'LOAD_WORKERS': str(load_workers),
+            'LOG_LEVEL': os.environ.get('BENCHMARK_LOG_LEVEL', 'WARNING')
+        }
+        command = [sys.executable, __file__, '--worker', backend]
+        proc = subprocess.run(command, env=env, capture_output=True, text=True, timeout=timeout,
+                              cwd=Path(__file__).parent)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    tail = '\n'.join((proc.stderr or proc.stdout).strip().splitlines()[-5:])
+    raise RuntimeError(f"{backend} worker exited with {proc.returncode}:\n{tail}")
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Throughput drops and peak RSS growth beyond tolerance, per stage and overall"""
+    regressions = []
+    if baseline is None:
+        return regressions
+    for key, stage in result['stages'].items():
+        base = baseline['stages'].get(key)
+        if base is None:
+            continue
+        if (min(stage['seconds'], base['seconds']) >= MIN_COMPARABLE_SECONDS and base['rows_per_second']
+                and stage['rows_per_second'] < base['rows_per_second'] * (1 - tolerance)):
+            regressions.append(f"{key}: {stage['rows_per_second']:,.0f} rows/s vs "
+                               f"{base['rows_per_second']:,.0f} baseline")
+    if result['seconds'] > baseline['seconds'] * (1 + tolerance) and baseline['seconds'] >= MIN_COMPARABLE_SECONDS:
+        regressions.append(f"total: {result['seconds']:.2f}s vs {baseline['seconds']:.2f}s baseline")
+    for entity, size in result.get('bytes_per_row', {}).items():
+        base = baseline.get('bytes_per_row', {}).get(entity)
+        if base and size > base * (1 + tolerance):
+            regressions.append(f"{entity}: {size:.0f} bytes/row in memory vs {base:.0f} baseline")
+    if result['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak RSS: {result['peak_rss_mb']:.0f} MB vs {baseline['peak_rss_mb']:.0f} MB baseline")
+    return regressions
+
+def print_result(backend: str, label: str, result: dict, baseline: dict):
+    print(f"\n{backend} @ {label}: {result['seconds']:.2f}s, {result['fact_rows']:,} fact rows, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"  {'stage':<36} {'seconds':>9} {'rows':>11} {'rows/s':>12} {'baseline':>12} {'RSS MB':>8}")
+    for key, stage in result['stages'].items():
+        base = (baseline or {}).get('stages', {}).get(key)
+        base_rate = f"{base['rows_per_second']:>12,.0f}" if base else f"{'-':>12}"
+        print(f"  {key:<36} {stage['seconds']:>9.3f} {stage['rows_in']:>11,} {stage['rows_per_second']:>12,.0f} "
+              f"{base_rate} {stage['peak_rss_mb'] or 0:>8.0f}")
+    if result.get('bytes_per_row'):
+        print("  bytes/row in memory: " + ', '.join(f"{entity} {size:.0f}" for entity, size in result['bytes_per_row'].items()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='10k,1m', help="Comma-separated fact row counts (10k, 1m, 10m or N)")
+    parser.add_argument('--backends', default='sqlite,postgres', help="Comma-separated: sqlite, postgres")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed regression fraction (default 0.2)")
+    parser.add_argument('--timeout', type=float, default=3600, help="Per-run timeout in seconds")
+    parser.add_argument('--load-workers', type=int, default=1,
+                        help="Parallel fact load workers (Postgres); results are recorded as <backend>/<N>w")
+    parser.add_argument('--update-baseline', action='store_true', help="Write these results to the baseline")
+    parser.add_argument('--check', action='store_true', help="Exit 1 if any run regressed")
+    parser.add_argument('--worker', choices=['sqlite', 'postgres'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    load_env()
+
+    if args.worker:
+        return run_worker(args)
+
+    stored = json.loads(BASELINE.read_text()) if BASELINE.exists() else {'results': {}}
+    results, regressions, failures = {}, [], []
+    for backend in [b.strip() for b in args.backends.split(',') if b.strip()]:
+        if args.load_workers > 1:
+            backend = f"{backend}/{args.load_workers}w"
+        for label, rows in map(parse_scale, args.scales.split(',')):
+            try:
+                result = run_benchmark(backend.split('/')[0], rows, args.seed, args.timeout, args.load_workers)
+            except Exception as e:
+                failures.append(f"{backend} @ {label}: {e}")
+                print(f"\n{backend} @ {label}: FAILED\n{e}")
+                continue
+            baseline = stored['results'].get(backend, {}).get(label)
+            print_result(backend, label, result, baseline)
+            for regression in compare(result, baseline, args.tolerance):
+                regressions.append(f"{backend} @ {label} {regression}")
+            results.setdefault(backend, {})[label] = result
+
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+    elif results:
+        print("\nNo regressions against the baseline")
+
+    if args.update_baseline and results:
+        for backend, scales in results.items():
+            stored['results'].setdefault(backend, {}).update(scales)
+        stored['updated'] = datetime.now().isoformat(timespec='seconds')
+        stored['machine'] = {'platform': platform.platform(), 'python': platform.python_version(),
+                             'cpus': os.cpu_count()}
+        BASELINE.write_text(json.dumps(stored, indent=2) + '\n')
+        print(f"Baseline written to {BASELINE.name}")
+
+    return 1 if failures or (args.check and regressions) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
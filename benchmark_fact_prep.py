@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark vectorized fact preparation against the original row-wise implementation"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from etl.transform import build_facts
+
+def synthetic_inputs(rows: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    customers = max(rows // 100, 10)
+    products, reps, territories = 50, 40, 8
+
+    close_dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 1460, rows), unit='D')
+    opportunities = pd.DataFrame({
+        'opportunity_id': np.char.add('OPP', np.arange(rows).astype(str)),
+        'customer_id': np.char.add('SF', rng.integers(0, customers, rows).astype(str)),
+        'product_id': np.char.add('PROD', rng.integers(0, products, rows).astype(str)),
+        'owner_name': np.char.add('Rep ', rng.integers(0, reps, rows).astype(str)),
+        'amount': rng.integers(1_000, 500_000, rows),
+        'close_date': close_dates,
+        'is_closed': rng.random(rows) < 0.6,
+        'is_won': rng.random(rows) < 0.3
+    })
+    charges = pd.DataFrame({
+        'charge_id': np.char.add('CH', np.arange(rows).astype(str)),
+        'customer_id': opportunities['customer_id'].to_numpy(),
+        'amount': rng.integers(1_000, 500_000, rows),
+        'status': rng.choice(['succeeded', 'pending', 'failed'], rows, p=[0.9, 0.05, 0.05]),
+        'paid': rng.random(rows) < 0.9,
+        'created': close_dates
+    })
+
+    customer_ids = np.char.add('SF', np.arange(customers).astype(str))
+    rep_keys = pd.Series(np.arange(1, reps + 1), index=np.char.add('Rep ', np.arange(reps).astype(str)))
+    key_maps = {
+        'customer': pd.Series(np.arange(1, customers + 1), index=customer_ids),
+        'product': pd.Series(np.arange(1, products + 1), index=np.char.add('PROD', np.arange(products).astype(str))),
+        'sales_rep': rep_keys,
+        'sales_rep_territory': pd.Series(rep_keys.to_numpy() % territories + 1, index=rep_keys.to_numpy())
+    }
+    return opportunities, charges, key_maps
+
+def legacy_prepare_facts(opportunities: pd.DataFrame, key_maps: dict) -> pd.DataFrame:
+    # The pre-vectorization implementation: per-row strftime and a customer-only merge
+    opp_facts = opportunities.copy()
+    opp_facts['date_key'] = opp_facts['close_date'].apply(
+        lambda x: int(pd.to_datetime(x).strftime('%Y%m%d')) if pd.notna(x) else None
+    )
+    customer_map = key_maps['customer'].rename('customer_key').rename_axis('customer_id').reset_index()
+    opp_facts = opp_facts.merge(customer_map, on='customer_id', how='left')
+    facts = pd.DataFrame({
+        'date_key': opp_facts['date_key'],
+        'customer_key': opp_facts['customer_key'],
+        'amount': opp_facts['amount'],
+        'is_won': opp_facts['is_won'],
+        'is_closed': opp_facts['is_closed'],
+        'transaction_date': opp_facts['close_date'],
+        'source_system': 'Salesforce'
+    })
+    return facts.dropna(subset=['date_key', 'customer_key'])
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000, help="Opportunity rows (charges get the same count)")
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the vectorized transform")
+    args = parser.parse_args()
+
+    opportunities, charges, key_maps = synthetic_inputs(args.rows)
+    per_million = 1_000_000 / args.rows
+
+    print("=" * 80)
+    print(f"FACT PREPARATION BENCHMARK ({args.rows:,} opportunities + {args.rows:,} charges)")
+    print("=" * 80)
+
+    facts, vectorized_opps = timed(build_facts, opportunities, None, key_maps)
+    print(f"Vectorized, opportunities only: {vectorized_opps:.3f}s "
+          f"({vectorized_opps * per_million:.2f}s per 1M rows, {len(facts):,} facts)")
+
+    facts, vectorized_all = timed(build_facts, opportunities, charges, key_maps)
+    print(f"Vectorized, opportunities + charges with all dimension keys: {vectorized_all:.3f}s "
+          f"({vectorized_all * per_million / 2:.2f}s per 1M rows, {len(facts):,} facts)")
+
+    if not args.skip_legacy:
+        legacy, legacy_seconds = timed(legacy_prepare_facts, opportunities, key_maps)
+        print(f"Legacy row-wise, opportunities only: {legacy_seconds:.3f}s "
+              f"({legacy_seconds * per_million:.2f}s per 1M rows, {len(legacy):,} facts)")
+        print(f"Speedup on the like-for-like opportunity transform: {legacy_seconds / vectorized_opps:.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
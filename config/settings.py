@@ -1,33 +1,132 @@
-"""Configuration settings"""
+"""Configuration settings
+
+Settings are read from the environment when config is created. Importing this module does not read
+.env; entry points call load_env() first thing so the file's values apply to the whole process.
+"""
 import os
-from dotenv import load_dotenv
 from pathlib import Path
 
-load_dotenv()
-
 class Config:
-    # Database
-    DB_HOST = os.getenv('DB_HOST', 'localhost')
-    DB_PORT = int(os.getenv('DB_PORT', '5432'))
-    DB_NAME = os.getenv('DB_NAME', 'sales_analytics')
-    DB_USER = os.getenv('DB_USER', os.getenv('USER', 'postgres'))
-    DB_PASSWORD = os.getenv('DB_PASSWORD', '')
-    
-    # API
-    API_HOST = os.getenv('API_HOST', '0.0.0.0')
-    API_PORT = int(os.getenv('API_PORT', '8000'))
+    def __init__(self):
+        self.reload()
     
-    # Logging
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FILE = os.getenv('LOG_FILE', 'logs/pipeline.log')
+    def reload(self):
+        # Database
+        self.DB_HOST = os.getenv('DB_HOST', 'localhost')
+        self.DB_PORT = int(os.getenv('DB_PORT', '5432'))
+        self.DB_NAME = os.getenv('DB_NAME', 'sales_analytics')
+        self.DB_USER = os.getenv('DB_USER', os.getenv('USER', 'postgres'))
+        self.DB_PASSWORD = os.getenv('DB_PASSWORD', '')
+        self.DB_COPY_CHUNK_ROWS = int(os.getenv('DB_COPY_CHUNK_ROWS', '50000'))
+        self.DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+        self.DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+        self.DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+        self.DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))
+        # Connections are pinged on every checkout; a positive interval skips the ping for connections
+        # returned to the pool less than that many seconds ago
+        self.DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '0'))
+        self.DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '1'))
+        self.DB_POOL_MAX_WAITING = int(os.getenv('DB_POOL_MAX_WAITING', '100'))
+        self.DB_STATEMENT_TIMEOUT = float(os.getenv('DB_STATEMENT_TIMEOUT', '5'))
+        # Schema that detached fact_sales partitions are moved to when archived
+        self.DB_ARCHIVE_SCHEMA = os.getenv('DB_ARCHIVE_SCHEMA', 'archive')
+        
+        # Extraction
+        self.EXTRACT_MAX_WORKERS = int(os.getenv('EXTRACT_MAX_WORKERS', '8'))
+        self.EXTRACT_SOURCE_CONCURRENCY = int(os.getenv('EXTRACT_SOURCE_CONCURRENCY', '2'))
+        # Seconds each source has to finish; EXTRACT_SOURCE_TIMEOUTS overrides it per source,
+        # e.g. 'Salesforce=600,Stripe=120'
+        self.EXTRACT_TIMEOUT = float(os.getenv('EXTRACT_TIMEOUT', '300'))
+        self.EXTRACT_SOURCE_TIMEOUTS = os.getenv('EXTRACT_SOURCE_TIMEOUTS', '')
+        
+        # HTTP connectors
+        self.HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '30'))
+        self.HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+        self.HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+        self.HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+        self.HTTP2 = os.getenv('HTTP2', 'false').lower() in ('1', 'true', 'yes')
+        
+        # API
+        self.API_HOST = os.getenv('API_HOST', '0.0.0.0')
+        self.API_PORT = int(os.getenv('API_PORT', '8000'))
+        self.API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', '300'))
+        self.API_CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', '256'))
+        self.API_CACHE_GENERATION_POLL = float(os.getenv('API_CACHE_GENERATION_POLL', '1'))
+        self.API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+        self.API_STREAM_BATCH_ROWS = int(os.getenv('API_STREAM_BATCH_ROWS', '5000'))
+        self.API_METRICS_ENABLED = os.getenv('API_METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        
+        # Logging
+        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+        self.LOG_FILE = os.getenv('LOG_FILE', 'logs/pipeline.log')
+        
+        # Paths
+        self.BASE_DIR = Path(__file__).parent.parent
+        self.DATA_DIR = self.BASE_DIR / 'data'
+        self.LOG_DIR = self.BASE_DIR / 'logs'
+        
+        # Parquet staging between extract and load
+        self.STAGING_DIR = Path(os.getenv('STAGING_DIR', str(self.DATA_DIR / 'staging')))
+        self.STAGING_ROWS_PER_FILE = int(os.getenv('STAGING_ROWS_PER_FILE', '500000'))
+        self.STAGING_BATCH_ROWS = int(os.getenv('STAGING_BATCH_ROWS', '100000'))
+        self.STAGING_KEEP_RUNS = int(os.getenv('STAGING_KEEP_RUNS', '5'))
+        
+        # Parallel fact loading (Postgres): worker processes that each build whole month partitions,
+        # swapped in together at the end; 1 loads facts serially with upserts
+        self.LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', '1'))
+        self.LOAD_SHARD_RETRIES = int(os.getenv('LOAD_SHARD_RETRIES', '2'))
+        
+        # Scheduler daemon (run_pipeline.py run --daemon): seconds between incremental runs of each source
+        # (0 disables it), randomised by +/- SCHEDULE_JITTER of the interval
+        self.SCHEDULE_SALESFORCE_SECONDS = int(os.getenv('SCHEDULE_SALESFORCE_SECONDS', '300'))
+        self.SCHEDULE_STRIPE_SECONDS = int(os.getenv('SCHEDULE_STRIPE_SECONDS', '60'))
+        self.SCHEDULE_GOOGLE_SHEETS_SECONDS = int(os.getenv('SCHEDULE_GOOGLE_SHEETS_SECONDS', '3600'))
+        self.SCHEDULE_JITTER = float(os.getenv('SCHEDULE_JITTER', '0.1'))
+        # Held for the duration of each run so daemons and one-shot runs never overlap
+        self.PIPELINE_LOCK_FILE = Path(os.getenv('PIPELINE_LOCK_FILE', str(self.DATA_DIR / 'pipeline.lock')))
+        
+        # Warehouse backend used by the pipeline by default: 'postgres' or 'sqlite'
+        self.WAREHOUSE_BACKEND = os.getenv('WAREHOUSE_BACKEND', 'postgres')
+        
+        # SQLite warehouse for the simple pipeline and API
+        self.SQLITE_PATH = os.getenv('SQLITE_PATH', 'sales_analytics.db')
+        self.SQLITE_BATCH_ROWS = int(os.getenv('SQLITE_BATCH_ROWS', '50000'))
+        self.SQLITE_CACHE_MB = int(os.getenv('SQLITE_CACHE_MB', '256'))
+        
+        # Synthetic mock data (0 keeps the small hard-coded samples; otherwise the number of fact rows)
+        self.MOCK_SYNTHETIC_ROWS = int(os.getenv('MOCK_SYNTHETIC_ROWS', '0'))
+        self.MOCK_SYNTHETIC_SEED = int(os.getenv('MOCK_SYNTHETIC_SEED', '42'))
+        self.MOCK_SYNTHETIC_SKEW = float(os.getenv('MOCK_SYNTHETIC_SKEW', '2.0'))
+        self.MOCK_SYNTHETIC_CHUNK_ROWS = int(os.getenv('MOCK_SYNTHETIC_CHUNK_ROWS', '100000'))
+        
+        # Rate limiting ('memory' shares a bucket per API within a process, 'sqlite' across processes)
+        self.RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+        self.RATE_LIMIT_DB = Path(os.getenv('RATE_LIMIT_DB', str(self.DATA_DIR / 'rate_limits.sqlite')))
+        
+        # On-disk cache of connector GET responses: bodies with ETag/Last-Modified validators are
+        # revalidated with conditional requests; within HTTP_CACHE_TTLS ('endpoint prefix=seconds,...',
+        # else HTTP_CACHE_TTL) they are served without a request. Off unless enabled, since the file is
+        # shared by every connector and process on the host
+        self.HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        self.HTTP_CACHE_PATH = Path(os.getenv('HTTP_CACHE_PATH', str(self.DATA_DIR / 'http_cache.sqlite')))
+        self.HTTP_CACHE_MAX_MB = int(os.getenv('HTTP_CACHE_MAX_MB', '256'))
+        self.HTTP_CACHE_TTL = float(os.getenv('HTTP_CACHE_TTL', '0'))
+        self.HTTP_CACHE_TTLS = os.getenv('HTTP_CACHE_TTLS', '')
+        
+        # Dimension key cache (persisted to DATA_DIR/dimension_keys/ as Parquet between runs when enabled)
+        self.DIMENSION_CACHE_PERSIST = os.getenv('DIMENSION_CACHE_PERSIST', 'false').lower() in ('1', 'true', 'yes')
     
-    # Paths
-    BASE_DIR = Path(_file_).parent.parent
-    DATA_DIR = BASE_DIR / 'data'
-    LOG_DIR = BASE_DIR / 'logs'
-    
-    def _init_(self):
-        self.DATA_DIR.mkdir(exist_ok=True)
-        self.LOG_DIR.mkdir(exist_ok=True)
+    def create_dirs(self):
+        self.DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 config = Config()
+
+def load_env(path: str = None) -> Config:
+    """Load .env (or path) into the environment without overriding variables already set, re-read
+    config from it and create the data and log directories"""
+    from dotenv import load_dotenv
+    load_dotenv(path)
+    config.reload()
+    config.create_dirs()
+    return config
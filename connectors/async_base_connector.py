@@ -0,0 +1,165 @@
+"""Async Base API Connector"""
+import asyncio
+import httpx
+from typing import Dict, Any, Optional, AsyncIterator, Iterable, List
+from abc import ABC, abstractmethod
+from config.settings import config
+from config.logger import setup_logger
+from connectors.pagination import PaginationStrategy
+from connectors.rate_limiter import TokenBucket, get_rate_limiter
+from connectors.base_connector import new_request_stats
+from connectors.http_cache import HTTPCache, get_http_cache
+
+logger = setup_logger(__name__)
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class AsyncBaseAPIConnector(ABC):
+    def __init__(self, base_url: str, rate_limit_calls: int = 100, rate_limit_period: int = 60,
+                 max_connections: int = None, max_keepalive_connections: int = None,
+                 keepalive_expiry: float = None, http2: bool = None, timeout: float = None,
+                 rate_limit_burst: int = None, rate_limiter: TokenBucket = None,
+                 cache: HTTPCache = None, cache_ttls: Dict[str, float] = None):
+        self.base_url = base_url
+        self.rate_limit_calls = rate_limit_calls
+        self.rate_limit_period = rate_limit_period
+        self.limits = httpx.Limits(
+            max_connections=max_connections or config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else config.HTTP_KEEPALIVE_EXPIRY
+        )
+        self.timeout = timeout or config.HTTP_TIMEOUT
+        self.http2 = config.HTTP2 if http2 is None else http2
+        if self.http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            self.http2 = False
+        self.rate_limiter = rate_limiter or get_rate_limiter(
+            base_url, rate_limit_calls, rate_limit_period, burst=rate_limit_burst
+        )
+        self.cache = cache or get_http_cache()
+        self.cache_ttls = cache_ttls or {}
+        self._client = None
+        self.stats = new_request_stats()
+
+    @abstractmethod
+    async def authenticate(self) -> bool:
+        pass
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, http2=self.http2, timeout=self.timeout)
+        return self._client
+
+    async def _check_rate_limit(self):
+        waited = await self.rate_limiter.acquire_async()
+        self.stats['rate_limit_sleep_seconds'] += waited
+        if waited > 0.01:
+            logger.warning(f"Rate limit reached. Slept for {waited:.2f} seconds")
+
+    def _url(self, endpoint: str) -> str:
+        if endpoint.startswith(('http://', 'https://')):
+            return endpoint
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                            data: Optional[Dict] = None, json: Optional[Dict] = None,
+                            headers: Optional[Dict] = None, retry_count: int = 3):
+        url = self._url(endpoint)
+
+        # The cache is a SQLite file that other processes may be writing, so it is used from a thread
+        # rather than blocking the event loop; everything the request is sent with selects the entry
+        cache = self.cache if method == 'GET' else None
+        request_headers = {**self.client.headers, **(headers or {})}
+        cached = await asyncio.to_thread(cache.get, url, params, request_headers) if cache else None
+        if cached is not None:
+            if cached.fresh:
+                self.stats['cache_hits'] += 1
+                return cached.payload()
+            headers = {**(headers or {}), **cached.validators()}
+
+        for attempt in range(retry_count):
+            await self._check_rate_limit()
+            try:
+                response = await self.client.request(
+                    method=method, url=url, params=params, data=data,
+                    json=json, headers=headers
+                )
+                await self.rate_limiter.update_from_headers_async(response.headers)
+                self.stats['requests'] += 1
+                self.stats['bytes_received'] += len(response.content)
+                if cached is not None and response.status_code == 304:
+                    self.stats['not_modified'] += 1
+                    await asyncio.to_thread(cache.refresh, cached, response.headers, self._cache_ttl(url))
+                    return cached.payload()
+                response.raise_for_status()
+                if cache:
+                    await asyncio.to_thread(cache.put, url, params, response.headers, response.content,
+                                            self._cache_ttl(url), request_headers)
+                try:
+                    return response.json()
+                except ValueError:
+                    return {"data": response.text}
+            except httpx.HTTPError as e:
+                logger.error(f"Request error on attempt {attempt + 1}/{retry_count}: {e}")
+                if attempt == retry_count - 1:
+                    raise
+                self.stats['retries'] += 1
+                self.stats['retry_sleep_seconds'] += 2 ** attempt
+                await asyncio.sleep(2 ** attempt)
+
+        raise Exception(f"Failed after {retry_count} attempts")
+
+    def _cache_ttl(self, url: str) -> float:
+        endpoint = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return self.cache.ttl(endpoint, self.cache_ttls)
+
+    async def get(self, endpoint: str, params: Optional[Dict] = None, **kwargs):
+        return await self._make_request('GET', endpoint, params=params, **kwargs)
+
+    async def get_many(self, requests: Iterable, concurrency: int = None, **kwargs) -> List:
+        """Issue GETs for (endpoint, params) pairs concurrently, returning bodies in request order"""
+        semaphore = asyncio.Semaphore(concurrency or self.limits.max_connections)
+
+        async def fetch(endpoint, params):
+            async with semaphore:
+                return await self.get(endpoint, params=params, **kwargs)
+
+        return await asyncio.gather(*(fetch(endpoint, params) for endpoint, params in requests))
+
+    async def paginate(self, endpoint: str, strategy: PaginationStrategy, params: Optional[Dict] = None,
+                       max_pages: Optional[int] = None, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        request = strategy.first_request(endpoint, params)
+        pages = 0
+        while request is not None:
+            endpoint, params = request
+            page = await self.get(endpoint, params=params, **kwargs)
+            yield page
+            pages += 1
+            if max_pages is not None and pages >= max_pages:
+                return
+            # Strategies see the absolute URL, so links in a page resolve against what was fetched
+            request = strategy.next_request(page, strategy.records(page), self._url(endpoint), params)
+
+    async def iter_records(self, endpoint: str, strategy: PaginationStrategy, params: Optional[Dict] = None,
+                           **kwargs) -> AsyncIterator[Any]:
+        async for page in self.paginate(endpoint, strategy, params=params, **kwargs):
+            for record in strategy.records(page):
+                yield record
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        await self.authenticate()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
@@ -1,50 +1,98 @@
 """Base API Connector"""
 import time
+import threading
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator, List
 from abc import ABC, abstractmethod
+from config.settings import config
 from config.logger import setup_logger
+from connectors.pagination import PaginationStrategy
+from connectors.rate_limiter import TokenBucket, get_rate_limiter
+from connectors.http_cache import HTTPCache, get_http_cache
 
 logger = setup_logger(__name__)
 
+def new_request_stats() -> dict:
+    return {
+        'requests': 0,
+        'retries': 0,
+        'bytes_received': 0,
+        'retry_sleep_seconds': 0.0,
+        'rate_limit_sleep_seconds': 0.0,
+        'cache_hits': 0,
+        'not_modified': 0
+    }
+
 class BaseAPIConnector(ABC):
-    def __init__(self, base_url: str, rate_limit_calls: int = 100, rate_limit_period: int = 60):
+    def __init__(self, base_url: str, rate_limit_calls: int = 100, rate_limit_period: int = 60,
+                 rate_limit_burst: Optional[int] = None, rate_limiter: Optional[TokenBucket] = None,
+                 cache: Optional[HTTPCache] = None, cache_ttls: Optional[Dict[str, float]] = None):
+        """cache_ttls maps endpoint prefixes to seconds their cached responses are served without a
+        request, e.g. {'values/Products': 3600} for reference data that rarely changes"""
         self.base_url = base_url
         self.session = requests.Session()
         self.rate_limit_calls = rate_limit_calls
         self.rate_limit_period = rate_limit_period
-        self._request_times = []
+        self.rate_limiter = rate_limiter or get_rate_limiter(
+            base_url, rate_limit_calls, rate_limit_period, burst=rate_limit_burst
+        )
+        self.cache = cache or get_http_cache()
+        self.cache_ttls = cache_ttls or {}
+        self.stats = new_request_stats()
+        self._stats_lock = threading.Lock()
+    
+    def _record(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
     
     @abstractmethod
     def authenticate(self) -> bool:
         pass
     
     def _check_rate_limit(self):
-        current_time = time.time()
-        self._request_times = [t for t in self._request_times if current_time - t < self.rate_limit_period]
-        
-        if len(self._request_times) >= self.rate_limit_calls:
-            sleep_time = self.rate_limit_period - (current_time - self._request_times[0])
-            if sleep_time > 0:
-                logger.warning(f"Rate limit reached. Sleeping for {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-                self._request_times = []
-        
-        self._request_times.append(current_time)
+        waited = self.rate_limiter.acquire()
+        self._record(rate_limit_sleep_seconds=waited)
+        if waited > 0.01:
+            logger.warning(f"Rate limit reached. Slept for {waited:.2f} seconds")
+    
+    def _url(self, endpoint: str) -> str:
+        if endpoint.startswith(('http://', 'https://')):
+            return endpoint
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
     
     def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, 
                       data: Optional[Dict] = None, json: Optional[Dict] = None, 
                       headers: Optional[Dict] = None, retry_count: int = 3):
-        self._check_rate_limit()
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        url = self._url(endpoint)
+        
+        cache = self.cache if method == 'GET' else None
+        # Everything the request is sent with, credentials included, selects the cache entry
+        request_headers = {**self.session.headers, **(headers or {})}
+        cached = cache.get(url, params, request_headers) if cache else None
+        if cached is not None:
+            if cached.fresh:
+                self._record(cache_hits=1)
+                return cached.payload()
+            headers = {**(headers or {}), **cached.validators()}
         
         for attempt in range(retry_count):
+            self._check_rate_limit()
             try:
                 response = self.session.request(
                     method=method, url=url, params=params, data=data,
-                    json=json, headers=headers, timeout=30
+                    json=json, headers=headers, timeout=config.HTTP_TIMEOUT
                 )
+                self.rate_limiter.update_from_headers(response.headers)
+                self._record(requests=1, bytes_received=len(response.content))
+                if cached is not None and response.status_code == 304:
+                    self._record(not_modified=1)
+                    cache.refresh(cached, response.headers, self._cache_ttl(url))
+                    return cached.payload()
                 response.raise_for_status()
+                if cache:
+                    cache.put(url, params, response.headers, response.content, self._cache_ttl(url),
+                              request_headers)
                 try:
                     return response.json()
                 except ValueError:
@@ -53,13 +101,50 @@ class BaseAPIConnector(ABC):
                 logger.error(f"Request error on attempt {attempt + 1}/{retry_count}: {e}")
                 if attempt == retry_count - 1:
                     raise
+                self._record(retries=1, retry_sleep_seconds=2 ** attempt)
                 time.sleep(2 ** attempt)
         
         raise Exception(f"Failed after {retry_count} attempts")
     
+    def _cache_ttl(self, url: str) -> float:
+        endpoint = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return self.cache.ttl(endpoint, self.cache_ttls)
+    
     def get(self, endpoint: str, params: Optional[Dict] = None, **kwargs):
         return self._make_request('GET', endpoint, params=params, **kwargs)
     
+    def paginate(self, endpoint: str, strategy: PaginationStrategy, params: Optional[Dict] = None,
+                 max_pages: Optional[int] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        request = strategy.first_request(endpoint, params)
+        pages = 0
+        while request is not None:
+            endpoint, params = request
+            page = self.get(endpoint, params=params, **kwargs)
+            yield page
+            pages += 1
+            if max_pages is not None and pages >= max_pages:
+                return
+            # Strategies see the absolute URL, so links in a page resolve against what was fetched
+            request = strategy.next_request(page, strategy.records(page), self._url(endpoint), params)
+    
+    def iter_records(self, endpoint: str, strategy: PaginationStrategy, params: Optional[Dict] = None,
+                     **kwargs) -> Iterator[Any]:
+        for page in self.paginate(endpoint, strategy, params=params, **kwargs):
+            yield from strategy.records(page)
+    
+    def iter_dataframes(self, endpoint: str, strategy: PaginationStrategy, chunk_size: int = 10000,
+                        params: Optional[Dict] = None, columns: Optional[List[str]] = None, **kwargs):
+        import pandas as pd
+        
+        buffer = []
+        for record in self.iter_records(endpoint, strategy, params=params, **kwargs):
+            buffer.append(record)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    
     def __enter__(self):
         self.authenticate()
         return self
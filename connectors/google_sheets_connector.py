@@ -1,15 +1,30 @@
 """Google Sheets API Connector with Mock Data"""
 import pandas as pd
+from connectors.synthetic import SyntheticDataset, collect
+from connectors.schemas import apply_schema
 from config.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 class MockGoogleSheetsConnector:
+    def __init__(self, synthetic: SyntheticDataset = None):
+        """synthetic replaces the hard-coded samples with generated data (MOCK_SYNTHETIC_ROWS by default)"""
+        self.synthetic = synthetic if synthetic is not None else SyntheticDataset.from_config()
+    
     def authenticate(self) -> bool:
         logger.info("Using mock Google Sheets connector")
         return True
     
+    def iter_products(self):
+        if self.synthetic:
+            return self.synthetic.iter_products()
+        return iter([self.get_products()])
+    
     def get_products(self):
+        if self.synthetic:
+            df = collect(self.synthetic.iter_products())
+            logger.info(f"Generated {len(df)} synthetic products")
+            return df
         data = {
             'product_id': ['PROD001', 'PROD002', 'PROD003', 'PROD004', 'PROD005'],
             'product_name': ['Enterprise License', 'Pro Services', 'Cloud Hosting', 'Support Premium', 'Training'],
@@ -18,16 +33,25 @@ class MockGoogleSheetsConnector:
             'is_active': [True, True, True, True, True]
         }
         logger.info(f"Extracted {len(data['product_id'])} products from Google Sheets")
-        return pd.DataFrame(data)
+        return apply_schema('products', pd.DataFrame(data))
+    
+    def iter_territories(self):
+        if self.synthetic:
+            return self.synthetic.iter_territories()
+        return iter([self.get_territories()])
     
     def get_territories(self):
+        if self.synthetic:
+            df = collect(self.synthetic.iter_territories())
+            logger.info(f"Generated {len(df)} synthetic territories")
+            return df
         data = {
             'territory_name': ['Northeast', 'Southeast', 'Midwest', 'West', 'Southwest'],
             'region': ['East', 'East', 'Central', 'West', 'Central'],
             'sales_rep_name': ['Alice Johnson', 'Bob Smith', 'Carol Williams', 'David Brown', 'Emma Davis']
         }
         logger.info(f"Extracted {len(data['territory_name'])} territories from Google Sheets")
-        return pd.DataFrame(data)
+        return apply_schema('territories', pd.DataFrame(data))
     
     def __enter__(self):
         self.authenticate()
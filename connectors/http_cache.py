@@ -0,0 +1,198 @@
+"""On-disk HTTP response cache for connector GET requests
+
+Responses carrying an ETag or Last-Modified validator (or fetched from an endpoint with a TTL) are
+stored in a local SQLite file shared by every connector and process on the host. Within an
+endpoint's TTL a cached body is served without a request; after it the request is made conditional
+(If-None-Match / If-Modified-Since) and a 304 reuses the stored body. Entries are keyed by URL, query
+and a hash of the request headers, so a body fetched with one set of credentials is never served to
+another. The total body size, kept up to date by triggers, is bounded by evicting the least recently
+used entries.
+"""
+import json
+import hashlib
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Request headers that do not select a response variant
+VALIDATOR_HEADERS = {'if-none-match', 'if-modified-since'}
+
+def parse_ttls(text: str) -> Dict[str, float]:
+    """'values/Products=3600,values/Territories=86400' -> {endpoint prefix: seconds}"""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        prefix, _, seconds = item.rpartition('=')
+        ttls[prefix.strip().lstrip('/')] = float(seconds)
+    return ttls
+
+def decode_body(body: bytes):
+    """Parse a stored body the way connectors parse live responses"""
+    try:
+        return json.loads(body)
+    except ValueError:
+        return {"data": body.decode('utf-8', errors='replace')}
+
+class CachedResponse:
+    def __init__(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes,
+                 expires_at: float):
+        self.key = key
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def payload(self):
+        return decode_body(self.body)
+
+class HTTPCache:
+    def __init__(self, path: Path = None, max_bytes: int = None, default_ttl: float = None,
+                 ttls: Dict[str, float] = None):
+        self.path = Path(path or config.HTTP_CACHE_PATH)
+        self.max_bytes = max_bytes or config.HTTP_CACHE_MAX_MB * 1024 * 1024
+        self.default_ttl = config.HTTP_CACHE_TTL if default_ttl is None else default_ttl
+        self.ttls = parse_ttls(config.HTTP_CACHE_TTLS) if ttls is None else ttls
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    key TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_access ON http_cache(last_access)")
+            # Running total of body sizes, so eviction does not sum the table on every put
+            conn.execute("CREATE TABLE IF NOT EXISTS http_cache_size (total INTEGER NOT NULL)")
+            conn.execute("INSERT INTO http_cache_size SELECT COALESCE(SUM(size), 0) FROM http_cache "
+                         "WHERE NOT EXISTS (SELECT 1 FROM http_cache_size)")
+            conn.executescript(
+                """
+                CREATE TRIGGER IF NOT EXISTS http_cache_size_insert AFTER INSERT ON http_cache
+                BEGIN UPDATE http_cache_size SET total = total + NEW.size; END;
+                CREATE TRIGGER IF NOT EXISTS http_cache_size_update AFTER UPDATE OF size ON http_cache
+                BEGIN UPDATE http_cache_size SET total = total - OLD.size + NEW.size; END;
+                CREATE TRIGGER IF NOT EXISTS http_cache_size_delete AFTER DELETE ON http_cache
+                BEGIN UPDATE http_cache_size SET total = total - OLD.size; END;
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None, request_headers: Optional[Dict] = None) -> str:
+        """URL, query and a hash of the request headers (Authorization among them) sent for it"""
+        variant = sorted((str(k).lower(), str(v)) for k, v in (request_headers or {}).items()
+                         if str(k).lower() not in VALIDATOR_HEADERS)
+        return json.dumps([url, sorted((str(k), str(v)) for k, v in (params or {}).items()),
+                           hashlib.sha256(json.dumps(variant).encode()).hexdigest()])
+
+    def ttl(self, endpoint: str, ttls: Dict[str, float] = None) -> float:
+        """TTL of the longest prefix matching endpoint in ttls (a connector's own) or HTTP_CACHE_TTLS,
+        else the default"""
+        ttls = {**self.ttls, **(ttls or {})}
+        endpoint = endpoint.lstrip('/')
+        matches = [prefix for prefix in ttls if endpoint.startswith(prefix)]
+        return ttls[max(matches, key=len)] if matches else self.default_ttl
+
+    def get(self, url: str, params: Optional[Dict] = None,
+            request_headers: Optional[Dict] = None) -> Optional[CachedResponse]:
+        key = self.key(url, params, request_headers)
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, body, expires_at FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE http_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        return CachedResponse(key, row[0], row[1], row[2], row[3])
+
+    def put(self, url: str, params: Optional[Dict], headers, body: bytes, ttl: float,
+            request_headers: Optional[Dict] = None) -> bool:
+        """Store a 200 response (headers are the response's) if it can be reused; returns whether it was
+        stored"""
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if 'no-store' in (headers.get('Cache-Control') or '') or len(body) > self.max_bytes:
+            return False
+        if not etag and not last_modified and ttl <= 0:
+            return False
+        now = time.time()
+        with self._connection() as conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the size trigger
+            conn.execute(
+                "INSERT INTO http_cache VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "etag = excluded.etag, last_modified = excluded.last_modified, body = excluded.body, "
+                "size = excluded.size, expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (self.key(url, params, request_headers), etag, last_modified, body, len(body), now + ttl, now)
+            )
+            self._evict(conn)
+        return True
+
+    def refresh(self, cached: CachedResponse, headers, ttl: float):
+        """Record a 304: the stored body is current for another TTL, with any updated validators"""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE http_cache SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "expires_at = ? WHERE key = ?",
+                (headers.get('ETag'), headers.get('Last-Modified'), time.time() + ttl, cached.key)
+            )
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT total FROM http_cache_size").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM http_cache ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} HTTP cache entries to stay under {self.max_bytes / 1e6:.1f} MB")
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM http_cache")
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_http_cache(path: Path = None) -> Optional[HTTPCache]:
+    """Shared cache for HTTP_CACHE_PATH (or path), or None when HTTP_CACHE_ENABLED is off"""
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+    path = Path(path or config.HTTP_CACHE_PATH)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = HTTPCache(path)
+        return _caches[path]
@@ -0,0 +1,126 @@
+"""Pagination strategies for paginated REST endpoints"""
+import re
+from urllib.parse import urljoin
+from typing import Dict, Any, Optional, List, Tuple
+from abc import ABC, abstractmethod
+
+PageRequest = Tuple[str, Optional[Dict]]
+
+class PaginationStrategy(ABC):
+    def first_request(self, endpoint: str, params: Optional[Dict]) -> PageRequest:
+        return endpoint, dict(params or {})
+
+    @abstractmethod
+    def records(self, page: Dict[str, Any]) -> List:
+        pass
+
+    @abstractmethod
+    def next_request(self, page: Dict[str, Any], records: List, endpoint: str,
+                     params: Optional[Dict]) -> Optional[PageRequest]:
+        pass
+
+class CursorPagination(PaginationStrategy):
+    """Stripe-style lists: ?limit=N&starting_after=<last id> while has_more is true"""
+
+    def __init__(self, limit: int = 100, limit_param: str = 'limit', cursor_param: str = 'starting_after',
+                 records_key: str = 'data', has_more_key: str = 'has_more', id_key: str = 'id'):
+        self.limit = limit
+        self.limit_param = limit_param
+        self.cursor_param = cursor_param
+        self.records_key = records_key
+        self.has_more_key = has_more_key
+        self.id_key = id_key
+
+    def first_request(self, endpoint, params):
+        params = dict(params or {})
+        params.setdefault(self.limit_param, self.limit)
+        return endpoint, params
+
+    def records(self, page):
+        return page.get(self.records_key) or []
+
+    def next_request(self, page, records, endpoint, params):
+        if not page.get(self.has_more_key) or not records:
+            return None
+        params = dict(params or {})
+        params[self.cursor_param] = records[-1][self.id_key]
+        return endpoint, params
+
+class OffsetPagination(PaginationStrategy):
+    """?offset=N&limit=M until a short page comes back"""
+
+    def __init__(self, limit: int = 1000, offset_param: str = 'offset', limit_param: str = 'limit',
+                 records_key: Optional[str] = 'data', start: int = 0):
+        self.limit = limit
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+        self.records_key = records_key
+        self.start = start
+
+    def first_request(self, endpoint, params):
+        params = dict(params or {})
+        params[self.offset_param] = self.start
+        params[self.limit_param] = self.limit
+        return endpoint, params
+
+    def records(self, page):
+        if self.records_key is None:
+            return page if isinstance(page, list) else []
+        return page.get(self.records_key) or []
+
+    def next_request(self, page, records, endpoint, params):
+        if len(records) < self.limit:
+            return None
+        params = dict(params or {})
+        params[self.offset_param] = params.get(self.offset_param, self.start) + len(records)
+        return endpoint, params
+
+class SheetRangePagination(PaginationStrategy):
+    """Google Sheets values API: request A1 ranges of page_size rows until a short page comes back"""
+
+    def __init__(self, sheet: str, first_column: str = 'A', last_column: str = 'Z',
+                 page_size: int = 1000, start_row: int = 2):
+        self.sheet = sheet
+        self.first_column = first_column
+        self.last_column = last_column
+        self.page_size = page_size
+        self.start_row = start_row
+
+    def _range(self, row: int) -> str:
+        return f"{self.sheet}!{self.first_column}{row}:{self.last_column}{row + self.page_size - 1}"
+
+    def first_request(self, endpoint, params):
+        return f"{endpoint.rstrip('/')}/{self._range(self.start_row)}", dict(params or {})
+
+    def records(self, page):
+        return page.get('values') or []
+
+    def next_request(self, page, records, endpoint, params):
+        if len(records) < self.page_size:
+            return None
+        # The response echoes the range it covers, e.g. 'Sheet1'!A2:F1001
+        match = re.search(r"![A-Z]+(\d+)", page.get('range', ''))
+        row = int(match.group(1)) if match else int(re.search(r"![A-Z]+(\d+)", endpoint).group(1))
+        base = endpoint.rsplit('/', 1)[0]
+        return f"{base}/{self._range(row + self.page_size)}", params
+
+class NextUrlPagination(PaginationStrategy):
+    """Salesforce-style query results: follow nextRecordsUrl until done is true
+
+    nextRecordsUrl is a server-relative path (/services/data/v58.0/query/01g...-2000), so it is
+    resolved against the origin of the page it came from, not appended to the connector's base_url.
+    """
+
+    def __init__(self, records_key: str = 'records', next_key: str = 'nextRecordsUrl', done_key: str = 'done'):
+        self.records_key = records_key
+        self.next_key = next_key
+        self.done_key = done_key
+
+    def records(self, page):
+        return page.get(self.records_key) or []
+
+    def next_request(self, page, records, endpoint, params):
+        next_url = page.get(self.next_key)
+        if page.get(self.done_key, False) or not next_url:
+            return None
+        return urljoin(endpoint, next_url), None
@@ -0,0 +1,210 @@
+"""Token-bucket rate limiting shared across connectors, threads, tasks and processes"""
+import time
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class TokenBucket:
+    """O(1) token bucket: holds up to `burst` tokens, refills at calls/period, callers sleep off any debt"""
+
+    # Whether reading and updating the state can block (on another process's lock); async callers
+    # then do it in a worker thread so the event loop keeps running
+    blocking = False
+
+    def __init__(self, rate_limit_calls: int, rate_limit_period: float, burst: int = None):
+        self.rate = rate_limit_calls / rate_limit_period
+        self.capacity = float(burst or rate_limit_calls)
+        self._lock = threading.Lock()
+        self._state = {
+            'tokens': self.capacity,
+            'updated': time.time(),
+            'blocked_until': 0.0,
+            'rate': self.rate,
+            'rate_until': 0.0
+        }
+
+    def _with_state(self, fn):
+        with self._lock:
+            return fn(self._state)
+
+    def _refill(self, state: dict, now: float):
+        if not state['rate_until'] or now >= state['rate_until']:
+            state['rate'], state['rate_until'] = self.rate, 0.0
+        elapsed = max(0.0, now - state['updated'])
+        state['tokens'] = min(self.capacity, state['tokens'] + elapsed * state['rate'])
+        state['updated'] = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        def take(state):
+            now = time.time()
+            self._refill(state, now)
+            state['tokens'] -= tokens
+            wait = max(0.0, state['blocked_until'] - now)
+            if state['tokens'] < 0:
+                wait = max(wait, -state['tokens'] / state['rate'])
+            return wait
+        return self._with_state(take)
+
+    def acquire(self, tokens: float = 1) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        wait = await asyncio.to_thread(self.reserve, tokens) if self.blocking else self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def update_from_headers(self, headers) -> None:
+        now = time.time()
+        retry_after = _parse_retry_after(headers.get('Retry-After'), now)
+        remaining = _parse_float(headers.get('X-RateLimit-Remaining'))
+        reset_at = _parse_reset(headers.get('X-RateLimit-Reset'), now)
+
+        if retry_after is None and remaining is None:
+            return
+
+        def adjust(state):
+            self._refill(state, now)
+            if retry_after is not None:
+                state['blocked_until'] = max(state['blocked_until'], retry_after)
+                state['tokens'] = min(state['tokens'], 0.0)
+            if remaining is not None:
+                state['tokens'] = min(state['tokens'], remaining)
+                if reset_at is not None and reset_at > now:
+                    if remaining <= 0:
+                        state['blocked_until'] = max(state['blocked_until'], reset_at)
+                    else:
+                        # Spread what the server says is left evenly over the rest of its window
+                        state['rate'] = min(self.rate, remaining / (reset_at - now))
+                        state['rate_until'] = reset_at
+        self._with_state(adjust)
+
+        if retry_after is not None:
+            logger.warning(f"Server requested backoff for {retry_after - now:.2f} seconds")
+
+    async def update_from_headers_async(self, headers) -> None:
+        if self.blocking:
+            await asyncio.to_thread(self.update_from_headers, headers)
+        else:
+            self.update_from_headers(headers)
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a local SQLite file so every process on the host shares it"""
+
+    blocking = True
+
+    def __init__(self, name: str, rate_limit_calls: int, rate_limit_period: float,
+                 burst: int = None, path: Path = None):
+        super().__init__(rate_limit_calls, rate_limit_period, burst)
+        self.name = name
+        self.path = Path(path or config.RATE_LIMIT_DB)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS token_bucket (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    blocked_until REAL NOT NULL,
+                    rate REAL NOT NULL,
+                    rate_until REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO token_bucket VALUES (?, ?, ?, ?, ?, ?)",
+                (name, self.capacity, time.time(), 0.0, self.rate, 0.0)
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _with_state(self, fn):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated, blocked_until, rate, rate_until FROM token_bucket WHERE name = ?",
+                (self.name,)
+            ).fetchone()
+            state = dict(zip(('tokens', 'updated', 'blocked_until', 'rate', 'rate_until'), row))
+            result = fn(state)
+            conn.execute(
+                "UPDATE token_bucket SET tokens = ?, updated = ?, blocked_until = ?, rate = ?, rate_until = ? "
+                "WHERE name = ?",
+                (state['tokens'], state['updated'], state['blocked_until'], state['rate'],
+                 state['rate_until'], self.name)
+            )
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str, rate_limit_calls: int, rate_limit_period: float,
+                     burst: int = None, backend: str = None) -> TokenBucket:
+    """Shared bucket for name with these rate settings; callers asking for the same name with other
+    settings get a bucket of their own, with a warning, rather than silently sharing the first one's"""
+    backend = backend or config.RATE_LIMIT_BACKEND
+    settings = (rate_limit_calls, rate_limit_period, burst)
+    with _limiters_lock:
+        limiter = _limiters.get((backend, name, settings))
+        if limiter is None:
+            others = [other for (b, n, other) in _limiters if (b, n) == (backend, name)]
+            if others:
+                logger.warning(f"Rate limiter {name} already exists with (calls, period, burst) {others[0]}; "
+                               f"using a separate bucket for {settings}")
+            if backend == 'sqlite':
+                # Processes share a bucket only when their settings match too
+                limiter = SQLiteTokenBucket(f"{name} {rate_limit_calls}/{rate_limit_period}s burst {burst}",
+                                            rate_limit_calls, rate_limit_period, burst)
+            elif backend == 'memory':
+                limiter = TokenBucket(rate_limit_calls, rate_limit_period, burst)
+            else:
+                raise ValueError(f"Unknown rate limit backend: {backend}")
+            _limiters[(backend, name, settings)] = limiter
+        return limiter
+
+def _parse_float(value):
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _parse_retry_after(value, now: float):
+    if value is None:
+        return None
+    seconds = _parse_float(value)
+    if seconds is not None:
+        return now + seconds
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _parse_reset(value, now: float):
+    reset = _parse_float(value)
+    if reset is None:
+        return None
+    # Some APIs send an epoch timestamp, others the number of seconds left in the window
+    return reset if reset > 1_000_000_000 else now + reset
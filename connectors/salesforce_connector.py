@@ -1,16 +1,31 @@
 """Salesforce API Connector with Mock Data"""
 import pandas as pd
 from datetime import datetime
+from connectors.synthetic import SyntheticDataset, collect
+from connectors.schemas import apply_schema
 from config.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 class MockSalesforceConnector:
+    def __init__(self, synthetic: SyntheticDataset = None):
+        """synthetic replaces the hard-coded samples with generated data (MOCK_SYNTHETIC_ROWS by default)"""
+        self.synthetic = synthetic if synthetic is not None else SyntheticDataset.from_config()
+    
     def authenticate(self) -> bool:
         logger.info("Using mock Salesforce connector")
         return True
     
+    def iter_accounts(self, modified_since=None):
+        if self.synthetic:
+            return self.synthetic.iter_accounts(modified_since)
+        return iter([self.get_accounts(modified_since)])
+    
     def get_accounts(self, modified_since=None):
+        if self.synthetic:
+            df = collect(self.synthetic.iter_accounts(modified_since))
+            logger.info(f"Generated {len(df)} synthetic accounts")
+            return df
         data = {
             'customer_id': ['SF001', 'SF002', 'SF003'],
             'customer_name': ['Acme Corp', 'TechStart Inc', 'Global Pharma'],
@@ -24,14 +39,28 @@ class MockSalesforceConnector:
             'created_date': pd.to_datetime(['2023-01-15', '2023-03-20', '2023-02-10']),
             'last_modified_date': pd.to_datetime(['2024-11-01', '2024-10-15', '2024-11-10'])
         }
-        logger.info(f"Extracted {len(data['customer_id'])} accounts from Salesforce")
-        return pd.DataFrame(data)
+        df = apply_schema('accounts', pd.DataFrame(data))
+        if modified_since is not None:
+            df = df[df['last_modified_date'] > pd.Timestamp(modified_since)].reset_index(drop=True)
+        logger.info(f"Extracted {len(df)} accounts from Salesforce")
+        return df
+    
+    def iter_opportunities(self, modified_since=None):
+        if self.synthetic:
+            return self.synthetic.iter_opportunities(modified_since)
+        return iter([self.get_opportunities(modified_since)])
     
     def get_opportunities(self, modified_since=None):
+        if self.synthetic:
+            df = collect(self.synthetic.iter_opportunities(modified_since))
+            logger.info(f"Generated {len(df)} synthetic opportunities")
+            return df
         data = {
             'opportunity_id': ['OPP001', 'OPP002', 'OPP003', 'OPP004'],
             'opportunity_name': ['Q4 Deal', 'License Renewal', 'New Product', 'Consulting'],
             'customer_id': ['SF001', 'SF003', 'SF002', 'SF001'],
+            'product_id': ['PROD001', 'PROD001', 'PROD003', 'PROD002'],
+            'owner_name': ['David Brown', 'Alice Johnson', 'Alice Johnson', 'David Brown'],
             'stage': ['Proposal', 'Closed Won', 'Negotiation', 'Qualification'],
             'amount': [250000, 75000, 150000, 50000],
             'probability': [60, 100, 70, 30],
@@ -41,8 +70,11 @@ class MockSalesforceConnector:
             'created_date': pd.to_datetime(['2024-10-01', '2024-09-15', '2024-10-20', '2024-11-01']),
             'last_modified_date': pd.to_datetime(['2024-11-18', '2024-11-15', '2024-11-19', '2024-11-05'])
         }
-        logger.info(f"Extracted {len(data['opportunity_id'])} opportunities from Salesforce")
-        return pd.DataFrame(data)
+        df = apply_schema('opportunities', pd.DataFrame(data))
+        if modified_since is not None:
+            df = df[df['last_modified_date'] > pd.Timestamp(modified_since)].reset_index(drop=True)
+        logger.info(f"Extracted {len(df)} opportunities from Salesforce")
+        return df
     
     def __enter__(self):
         self.authenticate()
@@ -0,0 +1,90 @@
+"""Declared dtypes of the extracted entities
+
+Low-cardinality text is categorical, identifiers and free text are Arrow-backed strings and small
+integers are downcast, so a large extract takes a fraction of the memory of pandas' object/int64
+defaults. Money stays float64: float32 cannot hold cents beyond about 100,000. Connectors apply the
+schema as they extract; the transform applies it again to whatever it reads back from staging.
+"""
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+
+STRING = pd.StringDtype('pyarrow')
+CATEGORY = 'category'
+DATETIME = 'datetime64[ns]'
+
+ENTITY_SCHEMAS = {
+    'accounts': {
+        'customer_id': STRING,
+        'customer_name': STRING,
+        'customer_type': CATEGORY,
+        'industry': CATEGORY,
+        'city': CATEGORY,
+        'state': CATEGORY,
+        'country': CATEGORY,
+        'email': STRING,
+        'phone': STRING,
+        'created_date': DATETIME,
+        'last_modified_date': DATETIME
+    },
+    'opportunities': {
+        'opportunity_id': STRING,
+        'opportunity_name': STRING,
+        'customer_id': STRING,
+        'product_id': STRING,
+        'owner_name': CATEGORY,
+        'stage': CATEGORY,
+        'amount': 'float64',
+        'probability': 'Int8',
+        'close_date': DATETIME,
+        'is_closed': 'bool',
+        'is_won': 'bool',
+        'created_date': DATETIME,
+        'last_modified_date': DATETIME
+    },
+    'charges': {
+        'charge_id': STRING,
+        'customer_id': STRING,
+        'amount': 'float64',
+        'currency': CATEGORY,
+        'status': CATEGORY,
+        'paid': 'bool',
+        'created': DATETIME
+    },
+    'products': {
+        'product_id': STRING,
+        'product_name': STRING,
+        'product_category': CATEGORY,
+        'unit_price': 'float64',
+        'is_active': 'bool'
+    },
+    'territories': {
+        'territory_name': CATEGORY,
+        'region': CATEGORY,
+        'sales_rep_name': STRING
+    }
+}
+
+def _conforms(dtype, declared) -> bool:
+    if declared == DATETIME:
+        # Any resolution will do; converting units would only copy the column
+        return is_datetime64_any_dtype(dtype)
+    return dtype == declared
+
+def apply_schema(entity: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the columns of df that do not already have their declared dtype; undeclared columns and
+    entities pass through unchanged"""
+    schema = ENTITY_SCHEMAS.get(entity)
+    if df is None or not schema:
+        return df
+    casts = {
+        column: dtype for column, dtype in schema.items()
+        if column in df.columns and not _conforms(df[column].dtype, dtype)
+    }
+    return df.astype(casts) if casts else df
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """In-memory size of df's values, including the strings object columns point to"""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    return memory_bytes(df) / len(df) if len(df) else 0.0
@@ -1,16 +1,31 @@
 """Stripe API Connector with Mock Data"""
 import pandas as pd
 from datetime import datetime
+from connectors.synthetic import SyntheticDataset, collect
+from connectors.schemas import apply_schema
 from config.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 class MockStripeConnector:
+    def __init__(self, synthetic: SyntheticDataset = None):
+        """synthetic replaces the hard-coded samples with generated data (MOCK_SYNTHETIC_ROWS by default)"""
+        self.synthetic = synthetic if synthetic is not None else SyntheticDataset.from_config()
+    
     def authenticate(self) -> bool:
         logger.info("Using mock Stripe connector")
         return True
     
+    def iter_charges(self, created_since=None):
+        if self.synthetic:
+            return self.synthetic.iter_charges(created_since)
+        return iter([self.get_charges(created_since)])
+    
     def get_charges(self, created_since=None):
+        if self.synthetic:
+            df = collect(self.synthetic.iter_charges(created_since))
+            logger.info(f"Generated {len(df)} synthetic charges")
+            return df
         data = {
             'charge_id': ['CH001', 'CH002', 'CH003', 'CH004', 'CH005'],
             'customer_id': ['SF001', 'SF003', 'SF002', 'SF001', 'SF003'],
@@ -20,8 +35,11 @@ class MockStripeConnector:
             'paid': [True, True, True, False, True],
             'created': pd.to_datetime(['2024-11-01', '2024-11-15', '2024-10-20', '2024-11-05', '2024-11-18']),
         }
-        logger.info(f"Extracted {len(data['charge_id'])} charges from Stripe")
-        return pd.DataFrame(data)
+        df = apply_schema('charges', pd.DataFrame(data))
+        if created_since is not None:
+            df = df[df['created'] > pd.Timestamp(created_since)].reset_index(drop=True)
+        logger.info(f"Extracted {len(df)} charges from Stripe")
+        return df
     
     def __enter__(self):
         self.authenticate()
@@ -0,0 +1,163 @@
+"""Deterministic synthetic source data for the mock connectors
+
+Every chunk is generated from its own seed (dataset seed, entity, chunk index), so output is
+reproducible regardless of chunk size consumed downstream or the order chunks are requested in.
+Customer activity is skewed: with skew=s, the top 10% of customers receive 10^(-1/s) of the
+opportunities and charges (about 32% at the default s=2).
+"""
+import math
+import numpy as np
+import pandas as pd
+from connectors.schemas import apply_schema
+from config.settings import config
+
+ENTITY_IDS = {'accounts': 1, 'opportunities': 2, 'charges': 3, 'products': 4, 'territories': 5}
+
+INDUSTRIES = ['Technology', 'Healthcare', 'Pharmaceutical', 'Finance', 'Retail', 'Manufacturing',
+              'Education', 'Energy', 'Media', 'Logistics']
+INDUSTRY_WEIGHTS = [0.22, 0.14, 0.08, 0.14, 0.1, 0.1, 0.06, 0.06, 0.05, 0.05]
+STATES = ['CA', 'NY', 'TX', 'MA', 'WA', 'IL', 'FL', 'GA', 'CO', 'NC']
+STATE_WEIGHTS = [0.24, 0.16, 0.12, 0.1, 0.08, 0.08, 0.07, 0.06, 0.05, 0.04]
+CITIES = dict(zip(STATES, ['San Francisco', 'New York', 'Austin', 'Boston', 'Seattle', 'Chicago', 'Miami',
+                           'Atlanta', 'Denver', 'Raleigh']))
+REGIONS = ['East', 'East', 'Central', 'West', 'Central', 'West', 'East', 'Central', 'West', 'East']
+CATEGORIES = ['Software', 'Services', 'Infrastructure', 'Support', 'Training']
+STAGES = ['Qualification', 'Proposal', 'Negotiation', 'Closed Won', 'Closed Lost']
+STAGE_WEIGHTS = [0.2, 0.15, 0.1, 0.3, 0.25]
+STAGE_PROBABILITY = [10, 40, 70, 100, 0]
+
+class SyntheticDataset:
+    def __init__(self, rows: int, seed: int = 42, skew: float = 2.0, chunk_size: int = 100_000,
+                 start: str = '2022-01-01', days: int = 1095):
+        """rows is the number of fact rows: half opportunities, half charges"""
+        if rows < 1:
+            raise ValueError(f"Synthetic dataset needs at least one row, got {rows}")
+        self.rows = rows
+        self.seed = seed
+        self.skew = skew
+        self.chunk_size = chunk_size
+        self.start = pd.Timestamp(start)
+        self.days = days
+
+        self.opportunities = rows // 2
+        self.charges = rows - self.opportunities
+        self.customers = max(rows // 50, 20)
+        self.products = 200
+        self.territories = 10
+        self.sales_reps = 50
+
+    @classmethod
+    def from_config(cls):
+        if config.MOCK_SYNTHETIC_ROWS <= 0:
+            return None
+        return cls(config.MOCK_SYNTHETIC_ROWS, seed=config.MOCK_SYNTHETIC_SEED,
+                   skew=config.MOCK_SYNTHETIC_SKEW, chunk_size=config.MOCK_SYNTHETIC_CHUNK_ROWS)
+
+    def _rng(self, entity: str, chunk: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, ENTITY_IDS[entity], chunk])
+
+    def _chunks(self, entity: str, total: int, build, since=None, column=None):
+        for chunk in range(math.ceil(total / self.chunk_size)):
+            start = chunk * self.chunk_size
+            n = min(self.chunk_size, total - start)
+            df = build(self._rng(entity, chunk), np.arange(start, start + n), n)
+            if since is not None:
+                df = df[df[column] > pd.Timestamp(since)].reset_index(drop=True)
+            yield apply_schema(entity, df)
+
+    def _dates(self, rng, n: int) -> pd.Series:
+        days = rng.integers(0, self.days, n)
+        seconds = rng.integers(0, 86400, n)
+        return pd.Series(self.start + pd.to_timedelta(days, unit='D') + pd.to_timedelta(seconds, unit='s'))
+
+    def _skewed(self, rng, n: int, population: int) -> np.ndarray:
+        return np.minimum((population * rng.random(n) ** self.skew).astype(np.int64), population - 1)
+
+    @staticmethod
+    def _ids(prefix: str, index: np.ndarray) -> pd.Series:
+        return prefix + pd.Series(index).astype(str)
+
+    def iter_accounts(self, modified_since=None):
+        def build(rng, index, n):
+            states = rng.choice(STATES, n, p=STATE_WEIGHTS)
+            created = self._dates(rng, n)
+            return pd.DataFrame({
+                'customer_id': self._ids('CUST', index),
+                'customer_name': self._ids('Customer ', index),
+                'customer_type': rng.choice(['Customer', 'Prospect'], n, p=[0.7, 0.3]),
+                'industry': rng.choice(INDUSTRIES, n, p=INDUSTRY_WEIGHTS),
+                'city': pd.Series(states).map(CITIES),
+                'state': states,
+                'country': 'USA',
+                'email': self._ids('contact', index) + '@example.com',
+                'phone': '555-' + pd.Series(rng.integers(1000, 9999, n)).astype(str),
+                'created_date': created,
+                'last_modified_date': created + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+            })
+        return self._chunks('accounts', self.customers, build, modified_since, 'last_modified_date')
+
+    def iter_opportunities(self, modified_since=None):
+        def build(rng, index, n):
+            stage_index = rng.choice(len(STAGES), n, p=STAGE_WEIGHTS)
+            created = self._dates(rng, n)
+            close = created + pd.to_timedelta(rng.integers(7, 180, n), unit='D')
+            return pd.DataFrame({
+                'opportunity_id': self._ids('OPP', index),
+                'opportunity_name': self._ids('Deal ', index),
+                'customer_id': self._ids('CUST', self._skewed(rng, n, self.customers)),
+                'product_id': self._ids('PROD', self._skewed(rng, n, self.products)),
+                'owner_name': self._ids('Rep ', rng.integers(0, self.sales_reps, n)),
+                'stage': np.array(STAGES)[stage_index],
+                'amount': rng.lognormal(9.5, 1.0, n).round(2),
+                'probability': np.array(STAGE_PROBABILITY)[stage_index],
+                'close_date': close.dt.normalize(),
+                'is_closed': stage_index >= 3,
+                'is_won': stage_index == 3,
+                'created_date': created,
+                'last_modified_date': created + pd.to_timedelta(rng.integers(0, 30, n), unit='D')
+            })
+        return self._chunks('opportunities', self.opportunities, build, modified_since, 'last_modified_date')
+
+    def iter_charges(self, created_since=None):
+        def build(rng, index, n):
+            return pd.DataFrame({
+                'charge_id': self._ids('CH', index),
+                'customer_id': self._ids('CUST', self._skewed(rng, n, self.customers)),
+                'amount': rng.lognormal(8.5, 1.2, n).round(2),
+                'currency': 'USD',
+                'status': rng.choice(['succeeded', 'pending', 'failed'], n, p=[0.9, 0.04, 0.06]),
+                'paid': rng.random(n) < 0.92,
+                'created': self._dates(rng, n)
+            })
+        return self._chunks('charges', self.charges, build, created_since, 'created')
+
+    def iter_products(self):
+        def build(rng, index, n):
+            return pd.DataFrame({
+                'product_id': self._ids('PROD', index),
+                'product_name': self._ids('Product ', index),
+                'product_category': rng.choice(CATEGORIES, n),
+                'unit_price': rng.lognormal(9.0, 0.8, n).round(2),
+                'is_active': rng.random(n) < 0.95
+            })
+        return self._chunks('products', self.products, build)
+
+    def iter_territories(self):
+        def build(rng, index, n):
+            territory = index % self.territories
+            return pd.DataFrame({
+                'territory_name': self._ids('Territory ', territory),
+                'region': np.array(REGIONS)[territory % len(REGIONS)],
+                'sales_rep_name': self._ids('Rep ', index)
+            })
+        return self._chunks('territories', self.sales_reps, build)
+
+def collect(chunks) -> pd.DataFrame:
+    """Concatenate generated chunks into one DataFrame"""
+    frames = list(chunks)
+    if len(frames) == 1:
+        return frames[0]
+    # Chunks have their own categories, which concat would widen to object
+    categorical = [column for column, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    df = pd.concat(frames, ignore_index=True)
+    return df.astype(dict.fromkeys(categorical, 'category')) if categorical else df
@@ -0,0 +1,85 @@
+"""Incrementally maintained sales summary tables"""
+import pandas as pd
+from models.warehouse import get_warehouse
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SUMMARY_NAME = 'sales'
+
+DAILY_INSERT = """
+    INSERT INTO agg_sales_daily (date_key, customer_key, product_key, territory_key, source_system,
+                                 transaction_count, total_amount, won_count, won_amount)
+    SELECT date_key, COALESCE(customer_key, 0), COALESCE(product_key, 0), COALESCE(territory_key, 0),
+           COALESCE(source_system, ''),
+           COUNT(*), SUM(amount), COUNT(*) FILTER (WHERE is_won), COALESCE(SUM(amount) FILTER (WHERE is_won), 0)
+    FROM fact_sales
+    {where}
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+MONTHLY_INSERT = """
+    INSERT INTO agg_sales_monthly (month_key, source_system, transaction_count, total_amount, won_count, won_amount)
+    SELECT date_key / 100, source_system,
+           SUM(transaction_count), SUM(total_amount), SUM(won_count), SUM(won_amount)
+    FROM agg_sales_daily
+    {where}
+    GROUP BY date_key / 100, source_system
+"""
+
+class SalesSummaries:
+    def __init__(self, db=None):
+        self.db = db or get_warehouse()
+
+    def affected_date_keys(self, facts: pd.DataFrame, current: pd.DataFrame) -> list:
+        """Dates touched by a fact load: the incoming dates plus the current dates of rows being replaced"""
+        date_keys = set(facts['date_key'].dropna().astype(int).tolist())
+        date_keys.update(current['date_key'].dropna().astype(int).tolist())
+        return sorted(date_keys)
+
+    def refresh(self, date_keys: list) -> int:
+        if not date_keys:
+            return 0
+        months = sorted({date_key // 100 for date_key in date_keys})
+        month_range = (months[0] * 100, months[-1] * 100 + 99)
+
+        dates, date_params = self.db.any_of('date_key', date_keys)
+        daily_months, daily_month_params = self.db.any_of('date_key / 100', months)
+        monthly_months, monthly_month_params = self.db.any_of('month_key', months)
+
+        with self.db.transaction() as cur:
+            cur.execute(f"DELETE FROM agg_sales_daily WHERE {dates}", date_params)
+            cur.execute(DAILY_INSERT.format(where=f"WHERE {dates}"), date_params)
+            daily_rows = cur.rowcount
+
+            cur.execute(f"DELETE FROM agg_sales_monthly WHERE {monthly_months}", monthly_month_params)
+            cur.execute(
+                MONTHLY_INSERT.format(where=f"WHERE date_key BETWEEN %s AND %s AND {daily_months}"),
+                month_range + daily_month_params
+            )
+            self._mark_refreshed(cur, daily_rows)
+
+        logger.info(f"Refreshed sales summaries for {len(date_keys)} dates ({daily_rows} daily rows)")
+        return daily_rows
+
+    def rebuild(self) -> int:
+        with self.db.transaction() as cur:
+            self.db.truncate(cur, ['agg_sales_daily', 'agg_sales_monthly'])
+            cur.execute(DAILY_INSERT.format(where=""))
+            daily_rows = cur.rowcount
+            cur.execute(MONTHLY_INSERT.format(where=""))
+            self._mark_refreshed(cur, daily_rows)
+
+        logger.info(f"Rebuilt sales summaries ({daily_rows} daily rows)")
+        return daily_rows
+
+    def _mark_refreshed(self, cur, rows: int):
+        cur.execute(
+            """
+            INSERT INTO agg_refresh (summary_name, refreshed_at, rows_refreshed)
+            VALUES (%s, CURRENT_TIMESTAMP, %s)
+            ON CONFLICT (summary_name) DO UPDATE
+            SET refreshed_at = EXCLUDED.refreshed_at, rows_refreshed = EXCLUDED.rows_refreshed
+            """,
+            (SUMMARY_NAME, rows)
+        )
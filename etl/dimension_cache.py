@@ -0,0 +1,212 @@
+"""In-process cache of dimension natural key -> surrogate key maps
+
+Dimensions with a row_hash column also cache a hash of each member's attributes, so a load writes
+only the members that are new or whose attributes changed since they were last written.
+
+When persisted, each dimension is saved as DATA_DIR/dimension_keys/<name>.parquet with the
+dimension's fingerprint in the file metadata; a file whose fingerprint no longer matches is ignored.
+"""
+import json
+import threading
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from models.warehouse import get_warehouse
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Attribute hash stored and cached with dimensions that list it among their extra columns
+HASH_COLUMN = 'row_hash'
+# Keeps fingerprint sums within SQLite's 64-bit integer SUM
+FINGERPRINT_MODULUS = 1000000007
+FINGERPRINT_METADATA = b'dimension_fingerprint'
+
+# name -> (table, natural key column, surrogate key column, extra cached columns)
+DIMENSIONS = {
+    'customer': ('dim_customer', 'customer_id', 'customer_key', [HASH_COLUMN]),
+    'product': ('dim_product', 'product_id', 'product_key', [HASH_COLUMN]),
+    'territory': ('dim_territory', 'territory_name', 'territory_key', []),
+    'sales_rep': ('dim_sales_rep', 'sales_rep_name', 'sales_rep_key', ['territory_key']),
+    'date': ('dim_date', 'date_key', 'date_key', [])
+}
+
+def row_hashes(df: pd.DataFrame, exclude: list = ()) -> pd.Series:
+    """Vectorized hash of each row's values outside exclude. Kept to 53 bits so it survives a round
+    trip through float64, which is how pandas reads an integer column that still has NULL hashes."""
+    hashes = pd.util.hash_pandas_object(df.drop(columns=list(exclude)), index=False)
+    return pd.Series((hashes.to_numpy() >> 11).astype('int64'), index=df.index)
+
+class DimensionKeyCache:
+    def __init__(self, db=None, path: Path = None):
+        self.db = db or get_warehouse()
+        if path is None and config.DIMENSION_CACHE_PERSIST:
+            path = config.DATA_DIR / 'dimension_keys'
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._members = {}
+        # Whether members changed since the last save; unchanged caches are not rewritten
+        self._dirty = False
+
+    def _fingerprint(self, name: str):
+        table, _, key, extra = DIMENSIONS[name]
+        aggregates = ["COUNT(*)", f"MAX({key})"]
+        # Members can change without their count or keys changing, so every cached attribute is
+        # summed too. Other attributes are weighted by the member's key, so two members swapping
+        # values (reps trading territories) still changes the sum.
+        for column in extra:
+            if column == HASH_COLUMN:
+                aggregates.append(f"SUM({HASH_COLUMN} % {FINGERPRINT_MODULUS})")
+            else:
+                aggregates.append(f"SUM(CAST({key} AS BIGINT) * COALESCE({column}, 0) % {FINGERPRINT_MODULUS})")
+        row = self.db.execute_query(f"SELECT {', '.join(aggregates)} FROM {table}")[0]
+        # Postgres sums bigints as numeric; ints compare equal however the warehouse returned them
+        return [None if value is None else int(value) for value in row]
+
+    def _read(self, name: str, natural_keys=None) -> pd.DataFrame:
+        table, natural, key, extra = DIMENSIONS[name]
+        columns = list(dict.fromkeys([natural, key] + extra))
+        if natural_keys is None:
+            return self.db.query_to_dataframe(f"SELECT {', '.join(columns)} FROM {table}")
+        return self.db.lookup(table, columns, natural, natural_keys)
+
+    def _index(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        natural = DIMENSIONS[name][1]
+        return df.drop_duplicates(natural, keep='last').set_index(natural)
+
+    def load(self, force: bool = False):
+        with self._lock:
+            if self._members and not force:
+                return self
+            persisted = {} if force else self._load_file()
+            for name in DIMENSIONS:
+                cached = persisted.get(name)
+                if cached is not None and cached[0] == self._fingerprint(name):
+                    self._members[name] = cached[1]
+                else:
+                    self._members[name] = self._index(name, self._read(name))
+                    self._dirty = True
+            logger.info("Dimension key cache loaded: " + ", ".join(
+                f"{name}={len(members)}" for name, members in self._members.items()
+            ))
+        return self
+
+    def _load_file(self) -> dict:
+        if self.path is None:
+            return {}
+        persisted = {}
+        for name in DIMENSIONS:
+            file = self.path / f"{name}.parquet"
+            if not file.exists():
+                continue
+            try:
+                table = pq.read_table(file)
+                fingerprint = json.loads(table.schema.metadata[FINGERPRINT_METADATA])
+                persisted[name] = (fingerprint, table.to_pandas())
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable dimension cache {file}: {e}")
+        return persisted
+
+    def clear(self):
+        """Forget every member, e.g. after a failed load rolled back keys this process had cached"""
+        with self._lock:
+            self._members = {}
+            self._dirty = False
+
+    def save(self):
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            self._dirty = False
+            snapshot = {name: (self._fingerprint(name), members) for name, members in self._members.items()}
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name, (fingerprint, members) in snapshot.items():
+            table = pa.Table.from_pandas(members)
+            metadata = {**(table.schema.metadata or {}), FINGERPRINT_METADATA: json.dumps(fingerprint).encode()}
+            file = self.path / f"{name}.parquet"
+            tmp = file.with_suffix('.tmp')
+            pq.write_table(table.replace_schema_metadata(metadata), tmp)
+            tmp.replace(file)
+
+    def _merge(self, name: str, df: pd.DataFrame):
+        if df.empty:
+            return
+        with self._lock:
+            current = self._members.get(name)
+            incoming = self._index(name, df)
+            self._dirty = True
+            if current is None or current.empty:
+                self._members[name] = incoming
+            else:
+                self._members[name] = pd.concat([current[~current.index.isin(incoming.index)], incoming])
+
+    def _changed(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Hash df's members and keep those that are new or differ from their cached hash"""
+        natural = DIMENSIONS[name][1]
+        df = df.assign(**{HASH_COLUMN: row_hashes(df, [natural])})
+        cached = self._members[name][HASH_COLUMN].reindex(df[natural]).to_numpy()
+        changed = df[~(cached == df[HASH_COLUMN].to_numpy())]
+        if len(changed) < len(df):
+            logger.info(f"Skipping {len(df) - len(changed)} unchanged {name} members")
+        return changed
+
+    def upsert_members(self, name: str, df: pd.DataFrame, key_columns: list = None) -> dict:
+        self.load()
+        table, natural, key, extra = DIMENSIONS[name]
+        if HASH_COLUMN in extra:
+            df = self._changed(name, df)
+            if df.empty:
+                return {'staged': 0, 'inserted': 0, 'updated': 0, 'conflicted': 0}
+        returning = list(dict.fromkeys([natural, key] + extra))
+        result = self.db.upsert(table, df, key_columns or [natural], returning=returning)
+        self._merge(name, pd.DataFrame(result.pop('rows'), columns=returning))
+
+        # Unchanged rows are not returned; read back any of them this process has not seen yet
+        missing = df.loc[~df[natural].isin(self._members[name].index), natural].unique()
+        if len(missing):
+            self._merge(name, self._read(name, missing.tolist()))
+        return result
+
+    def key_map(self, name: str) -> pd.Series:
+        self.load()
+        members = self._members[name]
+        key = DIMENSIONS[name][2]
+        if key == members.index.name:
+            return pd.Series(members.index, index=members.index)
+        return members[key]
+
+    def key_maps(self) -> dict:
+        reps = self.load()._members['sales_rep']
+        return {
+            'customer': self.key_map('customer'),
+            'product': self.key_map('product'),
+            'territory': self.key_map('territory'),
+            'sales_rep': self.key_map('sales_rep'),
+            'sales_rep_territory': reps.dropna(subset=['territory_key']).set_index('sales_rep_key')['territory_key']
+        }
+
+    def ensure_dates(self, date_keys: pd.Series) -> int:
+        known = self.key_map('date').index
+        missing = pd.Series(date_keys.dropna().unique()).astype('int64')
+        missing = missing[~missing.isin(known)]
+        if missing.empty:
+            return 0
+
+        dates = pd.to_datetime(missing.astype(str), format='%Y%m%d')
+        rows = pd.DataFrame({
+            'date_key': missing.to_numpy(),
+            'full_date': dates.dt.date,
+            'day_of_week': (dates.dt.dayofweek + 1) % 7,
+            'day_name': dates.dt.day_name().str.ljust(9),
+            'day_of_month': dates.dt.day,
+            'month': dates.dt.month,
+            'month_name': dates.dt.month_name().str.ljust(9),
+            'quarter': dates.dt.quarter,
+            'year': dates.dt.year,
+            'is_weekend': dates.dt.dayofweek >= 5
+        })
+        result = self.upsert_members('date', rows)
+        logger.info(f"Added {result['inserted']} dates to dim_date")
+        return result['inserted']
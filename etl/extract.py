@@ -0,0 +1,234 @@
+"""Concurrent extraction across independent source connectors
+
+Each source has its own deadline. When it passes, the source's tasks are cancelled: queued ones never
+start, and running ones stop at their next check_cancelled() (cancellable() checks between chunks).
+A timed-out source's connector stays open until its running tasks have returned.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class ExtractionCancelled(Exception):
+    """Raised in an extract task whose source's deadline has passed"""
+
+# Cancel event of the source whose task the current thread is running
+_task = threading.local()
+
+def check_cancelled():
+    """Raise ExtractionCancelled if the calling extract task's source has timed out"""
+    cancelled = getattr(_task, 'cancelled', None)
+    if cancelled is not None and cancelled.is_set():
+        raise ExtractionCancelled("Source timed out; extraction cancelled")
+
+def cancellable(chunks):
+    """Pass chunks through, stopping at the first one that arrives after the source timed out"""
+    for chunk in chunks:
+        check_cancelled()
+        yield chunk
+
+def parse_timeouts(text: str) -> dict:
+    """'Salesforce=600,Stripe=120' -> {source: seconds}"""
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        source, _, seconds = item.rpartition('=')
+        timeouts[source.strip()] = float(seconds)
+    return timeouts
+
+class ConnectorSessions:
+    """Connectors opened once and reused across extraction runs, so a long-lived process keeps its
+    HTTP sessions and authentication warm; a source whose extraction fails is reopened next run"""
+
+    def __init__(self):
+        self._connectors = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: str, connector_factory):
+        with self._lock:
+            if source not in self._connectors:
+                connector = connector_factory()
+                connector.__enter__()
+                self._connectors[source] = connector
+            return self._connectors[source]
+
+    def discard(self, source: str):
+        with self._lock:
+            connector = self._connectors.pop(source, None)
+        _close_connector(source, connector)
+
+    def close(self):
+        for source in list(self._connectors):
+            self.discard(source)
+
+def _close_connector(name: str, connector):
+    if connector is not None:
+        try:
+            connector.__exit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Error closing {name} connector: {e}")
+
+class _SourceState:
+    def __init__(self, name: str, connector_factory, source_concurrency: int, sessions: ConnectorSessions = None):
+        self.name = name
+        self.connector_factory = connector_factory
+        self.sessions = sessions
+        self.connector = None
+        self._baseline = {}
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(source_concurrency)
+        self.cancelled = threading.Event()
+        self.started = None
+        self.finished = None
+
+    def open(self):
+        with self.lock:
+            if self.connector is None:
+                if self.sessions is not None:
+                    connector = self.sessions.get(self.name, self.connector_factory)
+                else:
+                    connector = self.connector_factory()
+                    connector.__enter__()
+                # Shared connectors keep counting across runs; report this run's requests only
+                self._baseline = dict(getattr(connector, 'stats', None) or {})
+                self.connector = connector
+            return self.connector
+
+    def request_stats(self) -> dict:
+        stats = getattr(self.connector, 'stats', None) or {}
+        return {key: value - self._baseline.get(key, 0) for key, value in stats.items()}
+
+    def close(self, failed: bool = False):
+        if self.sessions is None:
+            _close_connector(self.name, self.connector)
+        elif failed:
+            self.sessions.discard(self.name)
+
+    def close_when_done(self, futures: list, failed: bool = False):
+        """Close once every future has finished, so tasks still running keep a usable connector"""
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finished(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.close(failed)
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+class ConcurrentExtractor:
+    def __init__(self, max_workers: int = None, source_concurrency: int = None, timeout: float = None,
+                 sessions: ConnectorSessions = None, timeouts: dict = None):
+        """timeout is the default per-source deadline in seconds, overridden per source by timeouts
+        (EXTRACT_SOURCE_TIMEOUTS by default); sessions keeps connectors open between runs, otherwise each
+        run opens and closes its own"""
+        self.max_workers = max_workers or config.EXTRACT_MAX_WORKERS
+        self.source_concurrency = source_concurrency or config.EXTRACT_SOURCE_CONCURRENCY
+        self.timeout = timeout or config.EXTRACT_TIMEOUT
+        self.timeouts = parse_timeouts(config.EXTRACT_SOURCE_TIMEOUTS) if timeouts is None else timeouts
+        self.sessions = sessions
+
+    def source_timeout(self, source: str) -> float:
+        return self.timeouts.get(source, self.timeout)
+
+    def _run_task(self, state: _SourceState, entity: str, extract):
+        with state.semaphore:
+            _task.cancelled = state.cancelled
+            check_cancelled()
+            start = time.perf_counter()
+            with state.lock:
+                if state.started is None:
+                    state.started = start
+            try:
+                df = extract(state.open())
+            finally:
+                _task.cancelled = None
+                end = time.perf_counter()
+                with state.lock:
+                    state.finished = max(state.finished or end, end)
+            logger.info(f"Extracted {state.name}.{entity} in {end - start:.2f}s")
+            return df, end - start
+
+    def run(self, plan: dict) -> dict:
+        """plan maps source name -> (connector_factory, {entity: callable(connector) -> result}), where the
+        result is typically a DataFrame or the staging metadata of an extract written to disk"""
+        states = {
+            source: _SourceState(source, factory, self.source_concurrency, self.sessions)
+            for source, (factory, _) in plan.items()
+        }
+        data, entity_timings, errors, timings, request_stats = {}, {}, {}, {}, {}
+        timed_out = set()
+        futures = {}
+        # Futures of timed-out sources that were still running when their deadline passed
+        abandoned = {source: [] for source in plan}
+
+        wall_start = time.perf_counter()
+        deadlines = {source: wall_start + self.source_timeout(source) for source in plan}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='extract')
+        try:
+            for source, (_, entities) in plan.items():
+                for entity, extract in entities.items():
+                    future = executor.submit(self._run_task, states[source], entity, extract)
+                    futures[future] = (source, entity)
+
+            pending = set(futures)
+            while pending:
+                next_deadline = min(deadlines[futures[future][0]] for future in pending)
+                done, pending = wait(pending, timeout=max(next_deadline - time.perf_counter(), 0),
+                                     return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    source, entity = futures[future]
+                    try:
+                        df, seconds = future.result()
+                    except Exception as e:
+                        logger.error(f"Extraction failed for {source}.{entity}: {e}")
+                        errors.setdefault(source, f"{entity}: {e}")
+                        continue
+                    data[(source, entity)] = df
+                    entity_timings[f"{source}.{entity}"] = round(seconds, 4)
+
+                now = time.perf_counter()
+                for future in [f for f in pending if deadlines[futures[f][0]] <= now]:
+                    source, entity = futures[future]
+                    pending.discard(future)
+                    timed_out.add(source)
+                    states[source].cancelled.set()
+                    if not future.cancel():
+                        abandoned[source].append(future)
+                    errors.setdefault(source, f"Timed out after {self.source_timeout(source):.1f}s extracting {entity}")
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            # Tasks of timed-out sources stop at their next cancellation check; do not wait for them
+            executor.shutdown(wait=not any(abandoned.values()), cancel_futures=True)
+            for source, state in states.items():
+                request_stats[source] = state.request_stats()
+                if abandoned[source]:
+                    state.close_when_done(abandoned[source], failed=True)
+                else:
+                    state.close(failed=source in errors)
+
+        for source, state in states.items():
+            if source in timed_out:
+                timings[source] = round(self.source_timeout(source), 4)
+            elif state.started is None:
+                timings[source] = round(wall_time, 4)
+            else:
+                timings[source] = round((state.finished or wall_start + wall_time) - state.started, 4)
+
+        for source, error in errors.items():
+            logger.error(f"Source {source} failed: {error}")
+
+        return {
+            'data': data,
+            'timings': timings,
+            'entity_timings': entity_timings,
+            'errors': errors,
+            'request_stats': request_stats,
+            'wall_time': round(wall_time, 4)
+        }
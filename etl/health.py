@@ -0,0 +1,56 @@
+"""Pipeline health check: warehouse reachability, the latest run and whether a run is in progress
+
+Kept to the standard library and the database driver so a probe does not pay for importing pandas
+and the pipeline.
+"""
+import time
+import sqlite3
+from etl.instrumentation import ETL_PROCESS
+from etl.run_lock import pipeline_running
+from config.settings import config
+
+LAST_RUN_SQL = """
+    SELECT run_id, MIN(start_time), MAX(end_time),
+           SUM(CASE WHEN status = 'FAILED' THEN 1 ELSE 0 END)
+    FROM etl_log
+    WHERE run_id = (SELECT run_id FROM etl_log WHERE etl_process = %s ORDER BY log_id DESC LIMIT 1)
+    GROUP BY run_id
+"""
+
+def _connect(backend: str):
+    if backend == 'sqlite':
+        # Read-only, so probing a missing warehouse does not create an empty file
+        return sqlite3.connect(f"file:{config.SQLITE_PATH}?mode=ro", uri=True, timeout=config.DB_STATEMENT_TIMEOUT)
+    import psycopg2
+    return psycopg2.connect(
+        host=config.DB_HOST, port=config.DB_PORT, dbname=config.DB_NAME, user=config.DB_USER,
+        password=config.DB_PASSWORD or None, connect_timeout=max(1, round(config.DB_STATEMENT_TIMEOUT))
+    )
+
+def check_health(backend: str = None) -> dict:
+    backend = (backend or config.WAREHOUSE_BACKEND).lower()
+    report = {'status': 'healthy', 'backend': backend, 'run_in_progress': pipeline_running()}
+    start = time.perf_counter()
+    try:
+        conn = _connect(backend)
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            report['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            cur.execute(LAST_RUN_SQL.replace('%s', '?') if backend == 'sqlite' else LAST_RUN_SQL, (ETL_PROCESS,))
+            row = cur.fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        report.update(status='unhealthy', error=str(e).strip())
+        return report
+
+    if row:
+        report['last_run'] = {
+            'run_id': row[0],
+            'started': str(row[1]),
+            'finished': str(row[2]),
+            'status': 'FAILED' if row[3] else 'SUCCESS'
+        }
+    return report
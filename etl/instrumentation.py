@@ -0,0 +1,141 @@
+"""Per-stage pipeline instrumentation persisted to etl_log"""
+import sys
+import time
+import resource
+from contextlib import contextmanager
+from datetime import datetime
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ETL_PROCESS = 'sales_pipeline'
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class StageMetrics:
+    def __init__(self, stage: str, source_system: str = None):
+        self.stage = stage
+        self.source_system = source_system
+        self.start_time = datetime.now()
+        self.end_time = None
+        self.status = 'RUNNING'
+        self.error = None
+        self.rows_in = 0
+        self.rows_out = 0
+        self.rows_updated = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.retry_sleep_seconds = 0.0
+        self.rate_limit_sleep_seconds = 0.0
+        self.peak_rss_mb = None
+
+    def add(self, rows_in: int = 0, rows_out: int = 0, rows_updated: int = 0, nbytes: int = 0):
+        self.rows_in += rows_in
+        self.rows_out += rows_out
+        self.rows_updated += rows_updated
+        self.bytes += nbytes
+
+    def add_upsert(self, rows_in: int, result: dict):
+        self.add(rows_in=rows_in, rows_out=result['inserted'], rows_updated=result['updated'])
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.rows_in or self.rows_out
+        return rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'stage': self.stage,
+            'source_system': self.source_system,
+            'status': self.status,
+            'seconds': round(self.seconds, 4),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_updated': self.rows_updated,
+            'bytes': self.bytes,
+            'rows_per_second': round(self.rows_per_second, 1),
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            'retry_sleep_seconds': round(self.retry_sleep_seconds, 3),
+            'rate_limit_sleep_seconds': round(self.rate_limit_sleep_seconds, 3),
+            'error': self.error
+        }
+
+class RunMetrics:
+    def __init__(self, run_id: str = None, process: str = ETL_PROCESS):
+        self.run_id = run_id
+        self.process = process
+        self.stages = []
+
+    @contextmanager
+    def stage(self, stage: str, source_system: str = None):
+        metrics = StageMetrics(stage, source_system)
+        self.stages.append(metrics)
+        start = time.perf_counter()
+        try:
+            yield metrics
+            metrics.status = 'SUCCESS'
+        except Exception as e:
+            metrics.status = 'FAILED'
+            metrics.error = str(e)
+            raise
+        finally:
+            metrics.seconds = time.perf_counter() - start
+            metrics.end_time = datetime.now()
+            metrics.peak_rss_mb = peak_rss_mb()
+            logger.info(
+                f"Stage {stage}{f' ({source_system})' if source_system else ''}: {metrics.seconds:.3f}s, "
+                f"{metrics.rows_in} rows in, {metrics.rows_out} out, {metrics.rows_per_second:,.0f} rows/s, "
+                f"peak RSS {metrics.peak_rss_mb:.0f} MB"
+            )
+
+    def record(self, stage: str, source_system: str = None, seconds: float = 0.0, **values) -> StageMetrics:
+        """Record a stage that was timed elsewhere (e.g. concurrent extraction per source)"""
+        metrics = StageMetrics(stage, source_system)
+        metrics.seconds = seconds
+        metrics.status = values.pop('status', 'SUCCESS')
+        metrics.error = values.pop('error', None)
+        for key, value in values.items():
+            setattr(metrics, key, value)
+        metrics.end_time = datetime.now()
+        metrics.peak_rss_mb = peak_rss_mb()
+        self.stages.append(metrics)
+        return metrics
+
+    def total(self, stage_prefix: str, field: str) -> int:
+        return sum(getattr(s, field) for s in self.stages if s.stage.startswith(stage_prefix))
+
+    def summary(self) -> list:
+        return [s.as_dict() for s in self.stages]
+
+    def persist(self, db):
+        """Write one etl_log row per stage; instrumentation failures never fail the run"""
+        if not self.stages:
+            return
+        # Imported here so the API can import ETL_PROCESS without loading pandas
+        import pandas as pd
+        rows = pd.DataFrame([{
+            'etl_process': self.process,
+            'run_id': self.run_id,
+            'stage': s.stage,
+            'source_system': s.source_system,
+            'start_time': s.start_time,
+            'end_time': s.end_time,
+            'status': s.status,
+            'records_processed': s.rows_in,
+            'records_inserted': s.rows_out,
+            'records_updated': s.rows_updated,
+            'bytes_processed': s.bytes,
+            'duration_seconds': round(s.seconds, 4),
+            'rows_per_second': round(s.rows_per_second, 1),
+            'peak_rss_mb': round(s.peak_rss_mb, 1) if s.peak_rss_mb is not None else None,
+            'retry_sleep_seconds': round(s.retry_sleep_seconds, 3),
+            'rate_limit_sleep_seconds': round(s.rate_limit_sleep_seconds, 3),
+            'error_message': s.error
+        } for s in self.stages])
+        try:
+            db.bulk_insert('etl_log', rows)
+        except Exception as e:
+            logger.warning(f"Could not persist stage metrics to etl_log: {e}")
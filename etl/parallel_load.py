@@ -0,0 +1,134 @@
+"""Parallel fact loading across worker processes, one month partition per shard
+
+Facts are split by month into Parquet shards in the run's staging directory. A process pool builds
+the next version of each month's partition over its own connection, retrying failed shards, and the
+builds are swapped into the partitioned table in a single transaction: either every month lands or
+the warehouse is left as it was.
+"""
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from etl.staging import StagingArea
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SHARD_SOURCE = 'shards'
+
+class ShardLoadError(Exception):
+    pass
+
+def _build_shard(connection_params: dict, staging_root, run_id: str, table: str, month: int,
+                 key_columns: list, match_columns: list) -> dict:
+    """Worker process entry point: build one month partition over a connection of its own"""
+    from models.database import DatabaseManager
+
+    staging = StagingArea(staging_root)
+    entity = f"{table}_{month}"
+    df = staging.read(run_id, SHARD_SOURCE, entity) if staging.has(run_id, SHARD_SOURCE, entity) else None
+    db = DatabaseManager(connection_params)
+    try:
+        start = time.perf_counter()
+        result = db.build_partition(table, month, df, key_columns, match_columns)
+        result['seconds'] = time.perf_counter() - start
+        return result
+    finally:
+        db.close()
+
+class ParallelFactLoader:
+    def __init__(self, db, staging: StagingArea, run_id: str, table: str, key_columns: list,
+                 match_columns: list, workers: int = None, retries: int = None):
+        self.db = db
+        self.staging = staging
+        self.run_id = run_id
+        self.table = table
+        self.key_columns = key_columns
+        self.match_columns = match_columns
+        self.workers = workers or config.LOAD_WORKERS
+        self.retries = config.LOAD_SHARD_RETRIES if retries is None else retries
+        self._keys = []
+        self._months = set()
+        self.staging.remove(run_id, SHARD_SOURCE)
+
+    def add(self, facts: pd.DataFrame):
+        """Append a fact batch to the shard of each month it covers"""
+        for month, rows in facts.groupby(facts['date_key'].astype('int64') // 100):
+            self.staging.append(self.run_id, SHARD_SOURCE, f"{self.table}_{month}", rows)
+            self._months.add(int(month))
+        self._keys.append(facts[self.key_columns])
+
+    def load(self) -> dict:
+        """Build and swap in every affected partition; returns upsert counts and the date keys of
+        stored rows that moved to another date (their old dates need their summaries refreshed)"""
+        result = {'staged': 0, 'inserted': 0, 'updated': 0, 'conflicted': 0, 'moved_date_keys': []}
+        if not self._keys:
+            return result
+
+        keys_table = self.db.stage_keys(self.table, pd.concat(self._keys, ignore_index=True), self.match_columns)
+        self._keys = []
+        # Stored rows whose natural key arrives with another date live in partitions that need a rebuild too
+        moved = [row[0] for row in self.db.execute_query(
+            f"SELECT DISTINCT t.date_key FROM {self.table} t JOIN {keys_table} k "
+            f"ON {' AND '.join(f't.{c} = k.{c}' for c in self.match_columns)} WHERE t.date_key <> k.date_key"
+        )]
+        months = sorted(self._months | {date_key // 100 for date_key in moved})
+
+        try:
+            shards = self._build(months)
+            self.db.swap_partitions(self.table, months)
+        except Exception:
+            self.db.drop_partition_builds(self.table, months)
+            raise
+        finally:
+            self.staging.remove(self.run_id, SHARD_SOURCE)
+
+        for shard in shards.values():
+            for key in ('staged', 'inserted', 'updated', 'conflicted'):
+                result[key] += shard[key]
+        result['moved_date_keys'] = sorted(moved)
+        logger.info(
+            f"Loaded {len(months)} partitions of {self.table} with {min(self.workers, len(months))} workers: "
+            f"{result['inserted']} inserted, {result['updated']} updated"
+        )
+        return result
+
+    def _build(self, months: list) -> dict:
+        """Build every month, retrying failed shards in fresh pools (a crashed worker breaks its pool)"""
+        results, remaining = {}, list(months)
+        for attempt in range(1, self.retries + 2):
+            failures = self._build_round(remaining, results)
+            if not failures:
+                return results
+            month, error = next(iter(failures.items()))
+            if attempt > self.retries:
+                raise ShardLoadError(
+                    f"{len(failures)} partitions of {self.table} failed after {attempt} attempts, "
+                    f"{self.table}_{month}: {error}"
+                ) from error
+            logger.warning(f"Retrying {len(failures)} partitions of {self.table} (attempt {attempt + 1}), "
+                           f"{self.table}_{month}: {error}")
+            remaining = sorted(failures)
+        return results
+
+    def _build_round(self, months: list, results: dict) -> dict:
+        failures = {}
+        # spawn, not fork: children must not share the parent's pooled connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(months)), mp_context=context) as pool:
+            futures = {
+                pool.submit(_build_shard, self.db.connection_params, self.staging.root, self.run_id,
+                            self.table, month, self.key_columns, self.match_columns): month
+                for month in months
+            }
+            for future in as_completed(futures):
+                month = futures[future]
+                try:
+                    results[month] = future.result()
+                except Exception as e:
+                    failures[month] = e
+                    continue
+                logger.info(f"Built {self.table}_{month}: {results[month]['staged']} rows "
+                            f"in {results[month]['seconds']:.2f}s")
+        return failures
@@ -1,110 +1,356 @@
 """Main ETL Pipeline"""
 from datetime import datetime
-from connector.salesforce_connector import MockSalesforceConnector
-from connector.stripe_connector import MockStripeConnector
-from connector.google_sheets_connector import MockGoogleSheetsConnector
-from models.database import db_manager
+import pandas as pd
+from connectors.salesforce_connector import MockSalesforceConnector
+from connectors.stripe_connector import MockStripeConnector
+from connectors.google_sheets_connector import MockGoogleSheetsConnector
+from models.warehouse import get_warehouse
+from etl.watermarks import WatermarkStore
+from etl.extract import ConcurrentExtractor, ConnectorSessions, cancellable
+from etl.transform import build_facts, lookup_keys
+from connectors.schemas import apply_schema
+from etl.dimension_cache import DimensionKeyCache
+from etl.aggregates import SalesSummaries
+from etl.staging import StagingArea
+from etl.parallel_load import ParallelFactLoader
+from etl.instrumentation import RunMetrics
+from models.generation import bump_load_generation
+from config.settings import config
 from config.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+WATERMARK_COLUMNS = {
+    ('Salesforce', 'accounts'): 'last_modified_date',
+    ('Salesforce', 'opportunities'): 'last_modified_date',
+    ('Stripe', 'charges'): 'created'
+}
+
+FACT_SOURCES = [('Salesforce', 'opportunities'), ('Stripe', 'charges')]
+
+# Natural key of fact_sales; includes date_key because Postgres partitions the table on it. Listing
+# it first makes the upsert insert rows grouped by partition.
+FACT_KEY_COLUMNS = ['date_key', 'source_system', 'source_id']
+
 class SalesDataPipeline:
-    def __init__(self):
+    def __init__(self, db=None, load_workers: int = None, sessions: ConnectorSessions = None):
+        """sessions keeps source connectors open across runs of a long-lived pipeline"""
+        self.db = db or get_warehouse()
+        self.load_workers = load_workers or config.LOAD_WORKERS
+        self.sessions = sessions
+        self.watermarks = WatermarkStore(self.db)
+        self.keys = DimensionKeyCache(self.db)
+        self.summaries = SalesSummaries(self.db)
+        self.staging = StagingArea()
+        self.metrics = RunMetrics()
         self.stats = {
             'extracted': 0,
-            'loaded': 0
+            'loaded': 0,
+            'stages': []
         }
     
     def run_full_pipeline(self):
+        return self._run(incremental=False)
+    
+    def run_incremental_pipeline(self, sources: list = None):
+        """Extract and load records changed since the last run, from the given sources (all by default)"""
+        return self._run(incremental=True, sources=sources)
+    
+    def run_load_only(self, run_id: str = None):
+        """Load an already staged run (the latest by default) without extracting"""
+        return self._run(incremental=False, load_only=True, run_id=run_id)
+    
+    def _run(self, incremental: bool, load_only: bool = False, run_id: str = None, sources: list = None):
+        mode = 'load-only' if load_only else ('incremental' if incremental else 'full')
         start_time = datetime.now()
         logger.info("=" * 80)
-        logger.info(f"Starting Sales Data Pipeline - {start_time}")
+        logger.info(f"Starting Sales Data Pipeline ({mode}) - {start_time}")
         logger.info("=" * 80)
+        self.metrics = RunMetrics(run_id)
         
         try:
-            # Extract from Salesforce
-            logger.info("Extracting from Salesforce...")
-            with MockSalesforceConnector() as sf:
-                accounts = sf.get_accounts()
-                opportunities = sf.get_opportunities()
-            
-            # Extract from Stripe
-            logger.info("Extracting from Stripe...")
-            with MockStripeConnector() as stripe:
-                charges = stripe.get_charges()
-            
-            # Extract from Google Sheets
-            logger.info("Extracting from Google Sheets...")
-            with MockGoogleSheetsConnector() as gs:
-                products = gs.get_products()
-                territories = gs.get_territories()
-            
-            # Load Customers
-            logger.info("Loading customers...")
-            db_manager.bulk_insert('dim_customer', accounts)
+            self.db.initialize_schema()
+            since = {}
+            if load_only:
+                run_id = run_id or self.staging.latest_run()
+                manifest = self.staging.manifest(run_id)
+                logger.info(f"Loading staged run {run_id}, skipping extraction")
+                extraction = {
+                    'wall_time': 0.0,
+                    'timings': {},
+                    'entity_timings': {},
+                    'errors': manifest.get('extract_errors', {})
+                }
+            else:
+                if incremental:
+                    since = {key: self.watermarks.get(*key) for key in WATERMARK_COLUMNS}
+                    logger.info(f"Watermarks: {since}")
+                
+                # Extract from all sources concurrently, streaming each extract to Parquet as it
+                # arrives so a failed load can be retried without re-extracting
+                run_id = self.staging.new_run()
+                self.metrics.run_id = run_id
+                plan = self._extraction_plan(since, run_id)
+                if sources is not None:
+                    plan = {source: plan[source] for source in sources}
+                logger.info(f"Extracting from {', '.join(plan)}...")
+                extraction = ConcurrentExtractor(sessions=self.sessions).run(plan)
+                self._record_extraction(extraction)
+                if not extraction['data']:
+                    raise RuntimeError(f"All sources failed to extract: {extraction['errors']}")
+                
+                self.staging.commit(run_id, list(extraction.pop('data').values()),
+                                    {'mode': mode, 'extract_errors': extraction['errors']})
+                manifest = self.staging.manifest(run_id)
             
-            # Load Products
-            logger.info("Loading products...")
-            db_manager.bulk_insert('dim_product', products)
+            self.metrics.run_id = run_id
+            staged = {(e['source'], e['entity']): e for e in manifest['entities']}
+            self._load(run_id, staged, defer_indexes=not incremental)
             
-            # Load Territories
-            logger.info("Loading territories...")
-            terr_df = territories[['territory_name', 'region']].drop_duplicates()
-            db_manager.bulk_insert('dim_territory', terr_df)
+            # Advance watermarks only for entities that were extracted and loaded
+            watermarks = {}
+            for (source_system, entity), column in WATERMARK_COLUMNS.items():
+                mark = None
+                if (source_system, entity) in staged:
+                    df = self.staging.read(run_id, source_system, entity, columns=[column])
+                    mark = self.watermarks.advance(source_system, entity, df, column)
+                watermarks[f"{source_system}.{entity}"] = str(mark or since.get((source_system, entity)))
             
-            # Load Sales Reps
-            logger.info("Loading sales reps...")
-            rep_df = territories[['sales_rep_name', 'region']].drop_duplicates()
-            db_manager.bulk_insert('dim_sales_rep', rep_df)
+            self.keys.save()
             
-            # Load Sales Facts
-            logger.info("Loading sales facts...")
-            facts = self._prepare_facts(opportunities, charges)
-            db_manager.bulk_insert('fact_sales', facts)
+            # Invalidate API response caches now that the warehouse has changed
+            bump_load_generation(self.db)
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             
+            status = 'PARTIAL' if extraction['errors'] else 'SUCCESS'
+            
             logger.info("=" * 80)
-            logger.info(f"Pipeline completed successfully in {duration:.2f} seconds")
+            logger.info(f"Pipeline completed ({status}) in {duration:.2f} seconds")
             logger.info("=" * 80)
             
-            return {'status': 'SUCCESS', 'duration': duration}
+            self._finish_metrics()
+            return {
+                'status': status,
+                'mode': mode,
+                'run_id': run_id,
+                'duration': duration,
+                'watermarks': watermarks,
+                'extract_wall_time': extraction['wall_time'],
+                'extract_timings': extraction['timings'],
+                'extract_entity_timings': extraction['entity_timings'],
+                'extract_errors': extraction['errors'],
+                'entity_memory': self._entity_memory(staged),
+                'stages': self.stats['stages']
+            }
             
         except Exception as e:
             logger.error(f"Pipeline failed: {e}")
-            return {'status': 'FAILED', 'error': str(e)}
+            # The load may have rolled back keys the cache already holds; reload them next run
+            self.keys.clear()
+            self._finish_metrics()
+            return {'status': 'FAILED', 'mode': mode, 'run_id': run_id, 'error': str(e),
+                    'stages': self.stats['stages']}
     
-    def _prepare_facts(self, opportunities, charges):
-        import pandas as pd
+    def _record_extraction(self, extraction: dict):
+        rows = {}
+        for (source, _), staged in extraction['data'].items():
+            rows[source] = rows.get(source, 0) + staged['rows']
+        for source, seconds in extraction['timings'].items():
+            request_stats = extraction['request_stats'].get(source, {})
+            self.metrics.record(
+                'extract', source, seconds,
+                status='FAILED' if source in extraction['errors'] else 'SUCCESS',
+                error=extraction['errors'].get(source),
+                rows_in=rows.get(source, 0),
+                rows_out=rows.get(source, 0),
+                bytes=request_stats.get('bytes_received', 0),
+                retry_sleep_seconds=request_stats.get('retry_sleep_seconds', 0.0),
+                rate_limit_sleep_seconds=request_stats.get('rate_limit_sleep_seconds', 0.0)
+            )
+    
+    @staticmethod
+    def _entity_memory(staged: dict) -> dict:
+        """In-memory size of each staged extract as it was extracted, to track the dtype savings"""
+        memory = {}
+        for (source, entity), e in staged.items():
+            if e.get('memory_bytes') is not None:
+                memory[f"{source}.{entity}"] = {
+                    'rows': e['rows'],
+                    'memory_bytes': e['memory_bytes'],
+                    'bytes_per_row': round(e['memory_bytes'] / e['rows'], 1) if e['rows'] else 0.0
+                }
+        return memory
+    
+    def _finish_metrics(self):
+        self.stats = {
+            'extracted': self.metrics.total('extract', 'rows_out'),
+            'loaded': self.metrics.total('load_', 'rows_out') + self.metrics.total('load_', 'rows_updated'),
+            'stages': self.metrics.summary()
+        }
+        self.metrics.persist(self.db)
+    
+    def _load(self, run_id: str, staged: dict, defer_indexes: bool = False):
+        # Full loads let the backend rebuild secondary indexes once instead of maintaining them per row
+        with self.db.bulk_load(defer_indexes=defer_indexes):
+            date_keys = self._load_tables(run_id, staged)
+        
+        # Refresh summary tables for the dates this load touched
+        if date_keys is not None:
+            logger.info("Refreshing sales summaries...")
+            with self.metrics.stage('refresh_summaries') as stage:
+                stage.add(rows_in=len(date_keys), rows_out=self.summaries.refresh(sorted(date_keys)))
+    
+    def _load_tables(self, run_id: str, staged: dict):
+        """Load dimensions and facts; returns the fact date keys touched, or None if no facts were staged"""
+        def read(source, entity):
+            if (source, entity) not in staged:
+                return None
+            return apply_schema(entity, self.staging.read(run_id, source, entity))
+        
+        accounts = read('Salesforce', 'accounts')
+        products = read('Google Sheets', 'products')
+        territories = read('Google Sheets', 'territories')
         
-        # Prepare opportunity facts
-        opp_facts = opportunities.copy()
-        opp_facts['date_key'] = opp_facts['close_date'].apply(
-            lambda x: int(pd.to_datetime(x).strftime('%Y%m%d')) if pd.notna(x) else None
-        )
+        # Load Customers
+        if accounts is not None:
+            logger.info("Loading customers...")
+            with self.metrics.stage('load_dim_customer', 'Salesforce') as stage:
+                stage.add_upsert(len(accounts), self.keys.upsert_members('customer', accounts))
+        
+        # Load Products
+        if products is not None:
+            logger.info("Loading products...")
+            with self.metrics.stage('load_dim_product', 'Google Sheets') as stage:
+                stage.add_upsert(len(products), self.keys.upsert_members('product', products))
         
-        # Get customer keys
-        customer_map = db_manager.query_to_dataframe(
-            "SELECT customer_key, customer_id FROM dim_customer"
-        )
+        if territories is not None:
+            # Load Territories
+            logger.info("Loading territories...")
+            with self.metrics.stage('load_dim_territory', 'Google Sheets') as stage:
+                terr_df = territories[['territory_name', 'region']].drop_duplicates()
+                stage.add_upsert(len(terr_df), self.keys.upsert_members('territory', terr_df))
+            
+            # Load Sales Reps
+            logger.info("Loading sales reps...")
+            with self.metrics.stage('load_dim_sales_rep', 'Google Sheets') as stage:
+                rep_df = territories[['sales_rep_name', 'region', 'territory_name']].drop_duplicates('sales_rep_name')
+                rep_df = rep_df.assign(
+                    territory_key=lookup_keys(rep_df['territory_name'], self.keys.key_map('territory'))
+                ).drop(columns='territory_name')
+                stage.add_upsert(len(rep_df), self.keys.upsert_members('sales_rep', rep_df))
         
-        opp_facts = opp_facts.merge(customer_map, on='customer_id', how='left')
+        # Load Sales Facts in memory-mapped chunks so large extracts need not fit in RAM
+        fact_sources = [key for key in FACT_SOURCES if key in staged]
+        if not fact_sources:
+            return None
+        if self.load_workers > 1 and self.db.partitioned:
+            return self._load_facts_parallel(run_id, staged, fact_sources)
+        logger.info("Loading sales facts...")
+        date_keys = set()
+        for source_system, entity in fact_sources:
+            with self.metrics.stage('load_facts', source_system) as stage:
+                stage.add(nbytes=staged[(source_system, entity)]['bytes'])
+                for batch in self.staging.iter_batches(run_id, source_system, entity):
+                    facts = self._prepare_facts(
+                        batch if entity == 'opportunities' else None,
+                        batch if entity == 'charges' else None
+                    )
+                    stage.add(rows_in=len(batch))
+                    if facts.empty:
+                        continue
+                    self.keys.ensure_dates(facts['date_key'])
+                    # Moved facts are deleted and re-inserted in one transaction, so a failure in
+                    # between cannot lose them and readers never see them missing
+                    with self.db.atomic():
+                        self.db.ensure_partitions('fact_sales', facts['date_key'].unique())
+                        current = self._current_fact_keys(facts)
+                        date_keys.update(self.summaries.affected_date_keys(facts, current))
+                        self._delete_moved_facts(facts, current)
+                        result = self.db.upsert('fact_sales', facts, FACT_KEY_COLUMNS)
+                    stage.add(rows_out=result['inserted'], rows_updated=result['updated'])
+        return date_keys
+    
+    def _load_facts_parallel(self, run_id: str, staged: dict, fact_sources: list) -> set:
+        """Shard facts by month and build the partitions in worker processes, swapped in together"""
+        logger.info(f"Loading sales facts with {self.load_workers} workers...")
+        loader = ParallelFactLoader(self.db, self.staging, run_id, 'fact_sales', FACT_KEY_COLUMNS,
+                                    ['source_system', 'source_id'], workers=self.load_workers)
+        date_keys = set()
+        for source_system, entity in fact_sources:
+            with self.metrics.stage('load_facts', source_system) as stage:
+                stage.add(nbytes=staged[(source_system, entity)]['bytes'])
+                for batch in self.staging.iter_batches(run_id, source_system, entity):
+                    facts = self._prepare_facts(
+                        batch if entity == 'opportunities' else None,
+                        batch if entity == 'charges' else None
+                    )
+                    stage.add(rows_in=len(batch))
+                    if facts.empty:
+                        continue
+                    self.keys.ensure_dates(facts['date_key'])
+                    date_keys.update(facts['date_key'].astype(int).unique().tolist())
+                    loader.add(facts)
         
-        facts = pd.DataFrame({
-            'date_key': opp_facts['date_key'],
-            'customer_key': opp_facts['customer_key'],
-            'amount': opp_facts['amount'],
-            'is_won': opp_facts['is_won'],
-            'is_closed': opp_facts['is_closed'],
-            'transaction_date': opp_facts['close_date'],
-            'source_system': 'Salesforce'
-        })
+        with self.metrics.stage('load_fact_partitions') as stage:
+            result = loader.load()
+            stage.add(rows_in=result['staged'], rows_out=result['inserted'], rows_updated=result['updated'])
+        date_keys.update(result['moved_date_keys'])
+        return date_keys
+    
+    def _current_fact_keys(self, facts: pd.DataFrame) -> pd.DataFrame:
+        """Keys of the stored facts that share a source id with the incoming batch"""
+        current = [
+            self.db.lookup('fact_sales', FACT_KEY_COLUMNS, 'source_id', source_ids.unique(),
+                           source_system=source_system)
+            for source_system, source_ids in facts.groupby('source_system')['source_id']
+        ]
+        return pd.concat(current, ignore_index=True) if current else pd.DataFrame(columns=FACT_KEY_COLUMNS)
+    
+    def _delete_moved_facts(self, facts: pd.DataFrame, current: pd.DataFrame) -> int:
+        """Delete stored facts whose date changed, so the upsert re-inserts them in their new partition"""
+        moved = current.merge(facts[FACT_KEY_COLUMNS], how='left', on=FACT_KEY_COLUMNS, indicator=True)
+        moved = moved[moved['_merge'] == 'left_only']
+        deleted = 0
+        for source_system, rows in moved.groupby('source_system'):
+            ids, id_params = self.db.any_of('source_id', rows['source_id'].tolist())
+            dates, date_params = self.db.any_of('date_key', rows['date_key'].astype(int).unique().tolist())
+            deleted += self.db.execute(
+                f"DELETE FROM fact_sales WHERE source_system = %s AND {dates} AND {ids}",
+                (source_system,) + date_params + id_params
+            )
+        if deleted:
+            logger.info(f"Moved {deleted} facts to a new date")
+        return deleted
+    
+    def _extraction_plan(self, since: dict, run_id: str):
+        def staged(source, entity, extract):
+            return lambda connector: self.staging.write(run_id, source, entity, cancellable(extract(connector)))
         
-        facts = facts.dropna(subset=['date_key', 'customer_key'])
-        return facts
+        return {
+            'Salesforce': (MockSalesforceConnector, {
+                'accounts': staged('Salesforce', 'accounts', lambda sf: sf.iter_accounts(
+                    modified_since=since.get(('Salesforce', 'accounts')))),
+                'opportunities': staged('Salesforce', 'opportunities', lambda sf: sf.iter_opportunities(
+                    modified_since=since.get(('Salesforce', 'opportunities'))))
+            }),
+            'Stripe': (MockStripeConnector, {
+                'charges': staged('Stripe', 'charges', lambda stripe: stripe.iter_charges(
+                    created_since=since.get(('Stripe', 'charges'))))
+            }),
+            'Google Sheets': (MockGoogleSheetsConnector, {
+                'products': staged('Google Sheets', 'products', lambda gs: gs.iter_products()),
+                'territories': staged('Google Sheets', 'territories', lambda gs: gs.iter_territories())
+            })
+        }
+    
+    def _prepare_facts(self, opportunities, charges):
+        return build_facts(opportunities, charges, self.keys.key_maps())
 
 if __name__ == "__main__":
+    from config.settings import load_env
+    load_env()
     pipeline = SalesDataPipeline()
     result = pipeline.run_full_pipeline()
     print(f"\nPipeline result: {result}")
@@ -0,0 +1,32 @@
+"""Pipeline run lock shared by one-shot runs, the scheduler daemon and health checks"""
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+from config.settings import config
+
+class PipelineLocked(Exception):
+    pass
+
+@contextmanager
+def pipeline_lock(path: Path = None):
+    """Hold the pipeline lock file for the duration of a run; raises PipelineLocked if another
+    process holds it. The lock is released by the OS if the holder dies."""
+    path = Path(path or config.PIPELINE_LOCK_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise PipelineLocked(f"Another pipeline run holds {path}") from None
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def pipeline_running(path: Path = None) -> bool:
+    """Whether another process currently holds the pipeline lock"""
+    try:
+        with pipeline_lock(path):
+            return False
+    except PipelineLocked:
+        return True
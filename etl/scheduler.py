@@ -0,0 +1,155 @@
+"""Long-running scheduler for frequent incremental pipeline runs
+
+One process keeps the pipeline, its warehouse connection pool, dimension key cache and connector
+sessions alive between runs, so a micro-batch only pays for the records that changed. Each source
+runs on its own jittered interval; sources that fall due together share one run, and a file lock
+keeps runs from overlapping with other daemons or one-shot runs of run_pipeline.py. A source whose
+run fails stays due and is retried after a backoff that doubles up to its interval.
+"""
+import time
+import signal
+import threading
+from pathlib import Path
+import schedule
+from etl.pipeline import SalesDataPipeline
+from etl.extract import ConnectorSessions
+from etl.run_lock import PipelineLocked, pipeline_lock
+from models.warehouse import get_warehouse
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SOURCE_INTERVALS = {
+    'Salesforce': 'SCHEDULE_SALESFORCE_SECONDS',
+    'Stripe': 'SCHEDULE_STRIPE_SECONDS',
+    'Google Sheets': 'SCHEDULE_GOOGLE_SHEETS_SECONDS'
+}
+
+POLL_SECONDS = 1.0
+LOCK_RETRY_SECONDS = 5.0
+# First retry of a failed source; each further failure doubles it, up to the source's interval
+FAILURE_RETRY_SECONDS = 30.0
+
+def source_intervals() -> dict:
+    """Configured seconds between runs per source; sources set to 0 are not scheduled"""
+    intervals = {source: getattr(config, setting) for source, setting in SOURCE_INTERVALS.items()}
+    return {source: seconds for source, seconds in intervals.items() if seconds > 0}
+
+class PipelineScheduler:
+    def __init__(self, db=None, intervals: dict = None, jitter: float = None, load_workers: int = 1,
+                 lock_path: Path = None):
+        """load_workers defaults to 1: micro-batches touch few rows, and rebuilding whole month
+        partitions in worker processes only pays off for large loads"""
+        self.db = db or get_warehouse()
+        self.intervals = source_intervals() if intervals is None else intervals
+        self.jitter = config.SCHEDULE_JITTER if jitter is None else jitter
+        self.lock_path = lock_path
+        self.sessions = ConnectorSessions()
+        self.pipeline = SalesDataPipeline(self.db, load_workers=load_workers, sessions=self.sessions)
+        self.scheduler = schedule.Scheduler()
+        self.runs = 0
+        self._due = set()
+        self._retry_at = 0.0
+        # Consecutive failed runs per source, and when a failed source may run again
+        self._failures = {}
+        self._backoff_until = {}
+        self._stop = threading.Event()
+
+        unknown = set(self.intervals) - set(SOURCE_INTERVALS)
+        if unknown:
+            raise ValueError(f"Unknown sources {sorted(unknown)}; expected some of {list(SOURCE_INTERVALS)}")
+        for source, seconds in self.intervals.items():
+            # every(low).to(high) draws a fresh random interval after each run, so sources (and
+            # several daemons) drift apart instead of hitting the APIs in lockstep
+            low = max(1, round(seconds * (1 - self.jitter)))
+            high = max(low, round(seconds * (1 + self.jitter)))
+            job = self.scheduler.every(low)
+            if high > low:
+                job = job.to(high)
+            job.seconds.do(self._due.add, source)
+
+    def run_forever(self, run_now: bool = True):
+        """Run until SIGTERM/SIGINT; a run in progress finishes before the process exits"""
+        self._install_signal_handlers()
+        logger.info("Scheduler started: " + ", ".join(
+            f"{source} every {seconds}s" for source, seconds in self.intervals.items()
+        ) + f" (jitter {self.jitter:.0%})")
+        if run_now:
+            self._due.update(self.intervals)
+        try:
+            while not self._stop.is_set():
+                self.scheduler.run_pending()
+                if self.ready():
+                    self.run_due()
+                self._stop.wait(POLL_SECONDS)
+        finally:
+            self.close()
+        logger.info(f"Scheduler stopped after {self.runs} runs")
+
+    def ready(self) -> list:
+        """Sources that are due and not waiting out a lock retry or a failure backoff"""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return []
+        return [source for source in self.intervals
+                if source in self._due and self._backoff_until.get(source, 0.0) <= now]
+
+    def run_due(self):
+        """One incremental run for every ready source; returns the pipeline result, or None if no
+        source is ready or another run holds the lock (the sources stay due and are retried shortly)"""
+        sources = self.ready()
+        if not sources:
+            return None
+        try:
+            with pipeline_lock(self.lock_path):
+                self._due.difference_update(sources)
+                result = self.pipeline.run_incremental_pipeline(sources)
+        except PipelineLocked as e:
+            logger.info(f"{e}; retrying {', '.join(sources)} in {LOCK_RETRY_SECONDS:.0f}s")
+            self._retry_at = time.monotonic() + LOCK_RETRY_SECONDS
+            return None
+
+        self.runs += 1
+        message = f"Scheduled run of {', '.join(sources)}: {result['status']}"
+        if result['status'] == 'FAILED':
+            logger.error(f"{message}: {result['error']}")
+            failed = sources
+        else:
+            logger.info(f"{message} in {result['duration']:.2f}s")
+            failed = [source for source in sources if source in result.get('extract_errors', {})]
+        self._record_outcome(sources, failed)
+        return result
+
+    def _record_outcome(self, sources: list, failed: list):
+        """Put failed sources back in the due set behind a backoff; succeeded ones run on schedule"""
+        now = time.monotonic()
+        for source in sources:
+            if source not in failed:
+                self._failures.pop(source, None)
+                self._backoff_until.pop(source, None)
+                continue
+            self._failures[source] = self._failures.get(source, 0) + 1
+            delay = min(FAILURE_RETRY_SECONDS * 2 ** (self._failures[source] - 1), self.intervals[source])
+            self._backoff_until[source] = now + delay
+            self._due.add(source)
+            logger.warning(f"{source} failed {self._failures[source]} time(s) in a row; retrying in {delay:.0f}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        def handle(signum, frame):
+            logger.info(f"Received {signal.Signals(signum).name}, stopping after the current run")
+            self.stop()
+            # A second Ctrl-C interrupts the run instead of waiting for it
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        signal.signal(signal.SIGTERM, handle)
+        signal.signal(signal.SIGINT, handle)
+
+    def close(self):
+        self.scheduler.clear()
+        self.sessions.close()
+        self.pipeline.keys.save()
+        self.db.close()
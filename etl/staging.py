@@ -0,0 +1,186 @@
+"""Columnar Parquet staging area between extract and load
+
+Each pipeline run stages its extracts under DATA_DIR/staging/<run_id>/<source>/<entity>/part-NNNNN.parquet.
+A manifest.json written last marks the run complete, so a load can be retried from disk without
+re-extracting.
+"""
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from connectors.schemas import STRING, memory_bytes
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MANIFEST = 'manifest.json'
+
+# Read staged text back as Arrow-backed strings rather than materializing Python objects
+_ARROW_STRINGS = {pa.string(): STRING, pa.large_string(): STRING}.get
+
+class StagingError(Exception):
+    pass
+
+def _slug(name: str) -> str:
+    return name.lower().replace(' ', '_')
+
+class StagingArea:
+    def __init__(self, root: Path = None, rows_per_file: int = None, batch_rows: int = None):
+        self.root = Path(root or config.STAGING_DIR)
+        self.rows_per_file = rows_per_file or config.STAGING_ROWS_PER_FILE
+        self.batch_rows = batch_rows or config.STAGING_BATCH_ROWS
+
+    def new_run(self) -> str:
+        run_id = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        (self.root / run_id).mkdir(parents=True, exist_ok=False)
+        return run_id
+
+    def _entity_dir(self, run_id: str, source: str, entity: str) -> Path:
+        return self.root / run_id / _slug(source) / _slug(entity)
+
+    def write(self, run_id: str, source: str, entity: str, data) -> dict:
+        """Stage a DataFrame or an iterable of DataFrame chunks; chunks are appended as row groups
+        so an extract never has to be held in memory whole"""
+        path = self._entity_dir(run_id, source, entity)
+        path.mkdir(parents=True, exist_ok=True)
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+
+        files, size, rows, memory = [], 0, 0, 0
+        writer, file_rows, empty = None, 0, None
+
+        def close():
+            nonlocal size
+            writer.close()
+            size += (path / files[-1]).stat().st_size
+
+        try:
+            for chunk in chunks:
+                if chunk.empty:
+                    if empty is None:
+                        empty = chunk
+                    continue
+                memory += memory_bytes(chunk)
+                piece = chunk
+                while len(piece):
+                    if writer is not None and file_rows >= self.rows_per_file:
+                        close()
+                        writer = None
+                    if writer is None:
+                        files.append(f"part-{len(files):05d}.parquet")
+                        file_rows = 0
+                    take = piece.iloc[:self.rows_per_file - file_rows]
+                    table = pa.Table.from_pandas(take, schema=writer.schema if writer else None,
+                                                 preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path / files[-1], table.schema, compression='snappy')
+                    writer.write_table(table)
+                    file_rows += len(take)
+                    rows += len(take)
+                    piece = piece.iloc[len(take):]
+            if writer is not None:
+                close()
+            elif empty is not None:
+                # Keep the schema of an empty extract so a load-only run can still read it
+                files.append("part-00000.parquet")
+                pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), path / files[-1], compression='snappy')
+                size += (path / files[-1]).stat().st_size
+        except BaseException:
+            # A failed or cancelled extract leaves no part files, not even the one being written
+            if writer is not None:
+                try:
+                    writer.close()
+                except Exception:
+                    pass
+            for name in files:
+                (path / name).unlink(missing_ok=True)
+            raise
+
+        logger.info(f"Staged {rows} {source}.{entity} rows in {len(files)} file(s) ({size / 1e6:.1f} MB, "
+                    f"{memory / rows if rows else 0:.0f} bytes/row in memory)")
+        return {'source': source, 'entity': entity, 'rows': rows, 'files': files, 'bytes': size,
+                'memory_bytes': memory}
+
+    def append(self, run_id: str, source: str, entity: str, df: pd.DataFrame) -> Path:
+        """Write df as the next part file of an entity, for data produced piecemeal across batches"""
+        path = self._entity_dir(run_id, source, entity)
+        path.mkdir(parents=True, exist_ok=True)
+        file = path / f"part-{len(self._files(run_id, source, entity)):05d}.parquet"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), file, compression='snappy')
+        return file
+
+    def remove(self, run_id: str, source: str):
+        shutil.rmtree(self.root / run_id / _slug(source), ignore_errors=True)
+
+    def commit(self, run_id: str, entities: list, metadata: dict = None):
+        manifest = {
+            'run_id': run_id,
+            'committed': datetime.now().isoformat(),
+            'entities': entities,
+            **(metadata or {})
+        }
+        tmp = self.root / run_id / f"{MANIFEST}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2, default=str))
+        tmp.replace(self.root / run_id / MANIFEST)
+        self.prune()
+
+    def manifest(self, run_id: str = None) -> dict:
+        run_id = run_id or self.latest_run()
+        path = self.root / run_id / MANIFEST
+        if not path.exists():
+            raise StagingError(f"Staged run {run_id} is incomplete or missing")
+        return json.loads(path.read_text())
+
+    def runs(self) -> list:
+        """Committed run ids, oldest first"""
+        if not self.root.exists():
+            return []
+        return sorted(p.parent.name for p in self.root.glob(f"*/{MANIFEST}"))
+
+    def latest_run(self) -> str:
+        runs = self.runs()
+        if not runs:
+            raise StagingError(f"No staged runs under {self.root}")
+        return runs[-1]
+
+    def _files(self, run_id: str, source: str, entity: str) -> list:
+        path = self._entity_dir(run_id, source, entity)
+        return sorted(path.glob('part-*.parquet'))
+
+    def has(self, run_id: str, source: str, entity: str) -> bool:
+        return bool(self._files(run_id, source, entity))
+
+    def read(self, run_id: str, source: str, entity: str, columns: list = None) -> pd.DataFrame:
+        tables = [
+            pq.read_table(file, columns=columns, memory_map=True)
+            for file in self._files(run_id, source, entity)
+        ]
+        if not tables:
+            raise StagingError(f"Nothing staged for {source}.{entity} in run {run_id}")
+        # Concatenating the Arrow tables unifies per-file dictionaries into one categorical per column,
+        # where concatenating DataFrames would widen differing categories to object
+        table = pa.concat_tables(tables, promote_options='default') if len(tables) > 1 else tables[0]
+        return table.to_pandas(types_mapper=_ARROW_STRINGS)
+
+    def iter_batches(self, run_id: str, source: str, entity: str, columns: list = None, batch_rows: int = None):
+        """Yield DataFrames of at most batch_rows rows, reading each part file memory-mapped"""
+        for file in self._files(run_id, source, entity):
+            parquet = pq.ParquetFile(file, memory_map=True)
+            if parquet.metadata.num_rows == 0:
+                continue
+            for batch in parquet.iter_batches(batch_size=batch_rows or self.batch_rows, columns=columns):
+                yield batch.to_pandas(types_mapper=_ARROW_STRINGS)
+
+    def prune(self, keep: int = None):
+        keep = config.STAGING_KEEP_RUNS if keep is None else keep
+        committed = self.runs()
+        for run_id in committed[:-max(keep, 1)]:
+            shutil.rmtree(self.root / run_id, ignore_errors=True)
+        # Runs that never committed (a failed extract) are dropped once a newer run has committed
+        latest = committed[-1] if committed else None
+        for path in self.root.iterdir() if self.root.exists() else []:
+            if latest and path.is_dir() and path.name < latest and not (path / MANIFEST).exists():
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,67 @@
+"""Vectorized fact transforms"""
+import pandas as pd
+from connectors.schemas import apply_schema
+
+FACT_COLUMNS = [
+    'date_key', 'customer_key', 'product_key', 'sales_rep_key', 'territory_key',
+    'amount', 'is_won', 'is_closed', 'transaction_date', 'source_system', 'source_id'
+]
+
+KEY_COLUMNS = ['date_key', 'customer_key', 'product_key', 'sales_rep_key', 'territory_key']
+
+def date_keys(dates: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(dates)
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype('Int64')
+
+def lookup_keys(values: pd.Series, key_map: pd.Series) -> pd.Series:
+    """Hash-join natural keys against a Series indexed by natural key holding surrogate keys"""
+    if key_map is None or key_map.empty:
+        return pd.Series(pd.NA, index=values.index, dtype='Int64')
+    return values.map(key_map).astype('Int64')
+
+def opportunity_facts(opportunities: pd.DataFrame, key_maps: dict) -> pd.DataFrame:
+    rep_keys = lookup_keys(opportunities['owner_name'], key_maps.get('sales_rep'))
+    return pd.DataFrame({
+        'date_key': date_keys(opportunities['close_date']),
+        'customer_key': lookup_keys(opportunities['customer_id'], key_maps.get('customer')),
+        'product_key': lookup_keys(opportunities['product_id'], key_maps.get('product')),
+        'sales_rep_key': rep_keys,
+        'territory_key': lookup_keys(rep_keys, key_maps.get('sales_rep_territory')),
+        'amount': opportunities['amount'],
+        'is_won': opportunities['is_won'].astype(bool),
+        'is_closed': opportunities['is_closed'].astype(bool),
+        'transaction_date': opportunities['close_date'],
+        'source_system': 'Salesforce',
+        'source_id': opportunities['opportunity_id']
+    })
+
+def charge_facts(charges: pd.DataFrame, key_maps: dict) -> pd.DataFrame:
+    status = charges['status']
+    return pd.DataFrame({
+        'date_key': date_keys(charges['created']),
+        'customer_key': lookup_keys(charges['customer_id'], key_maps.get('customer')),
+        'product_key': pd.Series(pd.NA, index=charges.index, dtype='Int64'),
+        'sales_rep_key': pd.Series(pd.NA, index=charges.index, dtype='Int64'),
+        'territory_key': pd.Series(pd.NA, index=charges.index, dtype='Int64'),
+        'amount': charges['amount'],
+        'is_won': charges['paid'].astype(bool) & (status == 'succeeded'),
+        'is_closed': status.isin(['succeeded', 'failed']),
+        'transaction_date': charges['created'],
+        'source_system': 'Stripe',
+        'source_id': charges['charge_id']
+    })
+
+def build_facts(opportunities: pd.DataFrame, charges: pd.DataFrame, key_maps: dict) -> pd.DataFrame:
+    opportunities = apply_schema('opportunities', opportunities)
+    charges = apply_schema('charges', charges)
+    parts = []
+    if opportunities is not None and not opportunities.empty:
+        parts.append(opportunity_facts(opportunities, key_maps))
+    if charges is not None and not charges.empty:
+        parts.append(charge_facts(charges, key_maps))
+    if not parts:
+        return pd.DataFrame(columns=FACT_COLUMNS)
+
+    facts = pd.concat(parts, ignore_index=True)
+    facts = facts[facts['date_key'].notna() & facts['customer_key'].notna()]
+    return facts.reset_index(drop=True)
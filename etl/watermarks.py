@@ -0,0 +1,38 @@
+"""Incremental extraction high-water marks"""
+import pandas as pd
+from models.warehouse import get_warehouse
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class WatermarkStore:
+    def __init__(self, db=None):
+        self.db = db or get_warehouse()
+    
+    def get(self, source_system: str, entity: str):
+        result = self.db.execute_query(
+            "SELECT high_water_mark FROM etl_watermark WHERE source_system = %s AND entity = %s",
+            (source_system, entity)
+        )
+        return result[0][0] if result else None
+    
+    def set(self, source_system: str, entity: str, high_water_mark):
+        self.db.execute(
+            """
+            INSERT INTO etl_watermark (source_system, entity, high_water_mark, updated_date)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (source_system, entity) DO UPDATE
+            SET high_water_mark = CASE WHEN EXCLUDED.high_water_mark > etl_watermark.high_water_mark
+                                       THEN EXCLUDED.high_water_mark ELSE etl_watermark.high_water_mark END,
+                updated_date = EXCLUDED.updated_date
+            """,
+            (source_system, entity, high_water_mark)
+        )
+        logger.info(f"Watermark {source_system}.{entity} -> {high_water_mark}")
+    
+    def advance(self, source_system: str, entity: str, df: pd.DataFrame, column: str):
+        if df.empty or df[column].isna().all():
+            return None
+        high_water_mark = pd.Timestamp(df[column].max()).to_pydatetime()
+        self.set(source_system, entity, high_water_mark)
+        return high_water_mark
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Load test the API: p50/p99 latency and requests/sec, sync baseline vs async service"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import httpx
+import numpy as np
+from fastapi import FastAPI, HTTPException
+
+PATHS = ['/api/v1/sales/metrics', '/api/v1/customers']
+
+# The pre-async routes: sync handlers on the blocking psycopg2 pool, run in the threadpool
+sync_app = FastAPI(title="Sales Analytics API (sync baseline)")
+
+@sync_app.get("/api/v1/sales/metrics")
+def sync_sales_metrics():
+    from models.database import db_manager
+    try:
+        row = db_manager.execute_query("""
+            SELECT COALESCE(SUM(transaction_count), 0), COALESCE(SUM(total_amount), 0),
+                   COALESCE(SUM(won_amount), 0),
+                   (SELECT refreshed_at FROM agg_refresh WHERE summary_name = 'sales')
+            FROM agg_sales_monthly
+        """)[0]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"total_transactions": int(row[0]), "total_revenue": float(row[1]), "won_revenue": float(row[2]),
+            "as_of": row[3].isoformat() if row[3] else None}
+
+@sync_app.get("/api/v1/customers")
+def sync_customers():
+    from models.database import db_manager
+    try:
+        rows = db_manager.execute_query("SELECT customer_name, industry, city, state FROM dim_customer LIMIT 10")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return [{"customer_name": r[0], "industry": r[1], "city": r[2], "state": r[3]} for r in rows]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(app_path: str, port: int) -> subprocess.Popen:
+    # Disable the response cache so every request exercises the database path
+    env = {**os.environ, 'API_CACHE_TTL': '0'}
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', app_path, '--port', str(port), '--log-level', 'warning'],
+        env=env
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"{app_path} did not start on port {port}")
+
+class KeepAliveConnection:
+    """Minimal HTTP/1.1 client, one connection per worker, so the load generator stays cheap"""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode('latin-1').split("\r\n")
+        headers = dict(line.lower().split(': ', 1) for line in lines[1:] if ': ' in line)
+        await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection') == 'close':
+            await self.close()
+        return int(lines[0].split()[1])
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+async def run_load(base_url: str, concurrency: int, duration: float) -> dict:
+    url = httpx.URL(base_url)
+    latencies, statuses = [], {}
+    connections = [KeepAliveConnection(url.host, url.port or 80) for _ in range(concurrency)]
+
+    # Warm the server's pools before measuring
+    await asyncio.gather(*(conn.get(PATHS[i % len(PATHS)]) for i, conn in enumerate(connections)))
+    deadline = time.perf_counter() + duration
+
+    async def worker(i: int):
+        conn, n = connections[i], i
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await conn.get(PATHS[n % len(PATHS)])
+            except (OSError, asyncio.IncompleteReadError) as e:
+                status = type(e).__name__
+                await conn.close()
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            n += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for conn in connections:
+        await conn.close()
+
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'statuses': statuses
+    }
+
+def report(label: str, result: dict):
+    print(f"{label:<18} {result['requests']:>8,} req  {result['rps']:>9.1f} req/s  "
+          f"p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  {result['statuses']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', help="Test an already running server instead of starting sync and async ones")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per run")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"API LOAD TEST ({args.concurrency} concurrent clients, {args.duration:.0f}s per run)")
+    print("=" * 80)
+
+    if args.url:
+        report(args.url, asyncio.run(run_load(args.url, args.concurrency, args.duration)))
+        return 0
+
+    results = {}
+    for label, app_path in [('sync (before)', 'load_test_api:sync_app'), ('async (after)', 'api.api_service:app')]:
+        port = free_port()
+        proc = start_server(app_path, port)
+        try:
+            results[label] = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.concurrency, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait()
+        report(label, results[label])
+
+    before, after = results['sync (before)'], results['async (after)']
+    for metric, unit in (('rps', 'req/s'), ('p50_ms', 'ms'), ('p99_ms', 'ms')):
+        change = (after[metric] - before[metric]) / before[metric] * 100
+        print(f"{metric:<7} {before[metric]:>9.2f} -> {after[metric]:>9.2f} {unit:<6} ({change:+.1f}%)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Async database access for the API (asyncpg pool)"""
+import asyncio
+import asyncpg
+from config.settings import config
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class PoolExhausted(Exception):
+    """No connection became free within the acquire timeout, or too many requests are already queued"""
+
+class StatementTimeout(Exception):
+    pass
+
+async def _skip_reset(conn):
+    # The API only runs plain reads and never changes session state, so skip the
+    # per-release RESET ALL / UNLISTEN round trip asyncpg issues by default
+    pass
+
+class AsyncDatabaseManager:
+    def __init__(self, min_size: int = None, max_size: int = None, acquire_timeout: float = None,
+                 statement_timeout: float = None, max_waiting: int = None):
+        self.connection_params = {
+            'host': config.DB_HOST,
+            'port': config.DB_PORT,
+            'database': config.DB_NAME,
+            'user': config.DB_USER,
+            'password': config.DB_PASSWORD or None
+        }
+        self.min_size = config.DB_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = max_size or config.DB_POOL_MAX_SIZE
+        self.acquire_timeout = config.DB_POOL_ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+        self.statement_timeout = config.DB_STATEMENT_TIMEOUT if statement_timeout is None else statement_timeout
+        self.max_waiting = config.DB_POOL_MAX_WAITING if max_waiting is None else max_waiting
+        self._pool = None
+        self._pool_lock = None
+        self._waiting = 0
+        self._counters = {'acquires': 0, 'rejected': 0, 'acquire_timeouts': 0, 'statement_timeouts': 0}
+
+    async def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        reset=_skip_reset,
+                        # Server-side backstop for statements whose client-side timeout is lost
+                        server_settings={'statement_timeout': str(int(self.statement_timeout * 1000))},
+                        **self.connection_params
+                    )
+        return self._pool
+
+    async def _acquire(self, pool: asyncpg.Pool):
+        if self._waiting >= self.max_waiting:
+            self._counters['rejected'] += 1
+            raise PoolExhausted(f"{self._waiting} requests already waiting for a connection")
+
+        self._waiting += 1
+        try:
+            conn = await pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._counters['acquire_timeouts'] += 1
+            raise PoolExhausted(f"No connection available within {self.acquire_timeout}s")
+        finally:
+            self._waiting -= 1
+
+        self._counters['acquires'] += 1
+        return conn
+
+    async def fetch(self, query: str, *args, timeout: float = None):
+        pool = await self.pool()
+        conn = await self._acquire(pool)
+        try:
+            return await conn.fetch(query, *args, timeout=timeout or self.statement_timeout)
+        except (asyncio.TimeoutError, asyncpg.exceptions.QueryCanceledError) as e:
+            self._counters['statement_timeouts'] += 1
+            raise StatementTimeout(f"Query exceeded {timeout or self.statement_timeout}s") from e
+        finally:
+            await pool.release(conn)
+
+    async def fetchrow(self, query: str, *args, timeout: float = None):
+        rows = await self.fetch(query, *args, timeout=timeout)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args, timeout: float = None):
+        row = await self.fetchrow(query, *args, timeout=timeout)
+        return row[0] if row else None
+
+    async def stream(self, query: str, *args, batch_rows: int = None) -> 'RowStream':
+        """Acquire a connection now and return an async iterator of row batches from a server-side cursor
+
+        Acquiring up front lets callers turn PoolExhausted into a 503 before a streamed response starts.
+        The connection goes back to the pool when the stream is exhausted or closed, so callers must
+        aclose() a stream they may abandon, whether or not it was ever iterated.
+        """
+        pool = await self.pool()
+        conn = await self._acquire(pool)
+        return RowStream(self, pool, conn, query, args, batch_rows or config.API_STREAM_BATCH_ROWS)
+
+    def pool_stats(self) -> dict:
+        stats = {'waiting': self._waiting, **self._counters}
+        if self._pool is None:
+            return {'size': 0, 'idle': 0, 'in_use': 0, 'max_size': self.max_size, **stats}
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {'size': size, 'idle': idle, 'in_use': size - idle, 'max_size': self.max_size, **stats}
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+class RowStream:
+    """Row batches from a server-side cursor on a connection held until the stream ends or is closed"""
+
+    def __init__(self, manager: AsyncDatabaseManager, pool, conn, query: str, args: tuple, batch_rows: int):
+        self._manager = manager
+        self._pool = pool
+        self._conn = conn
+        self._batches = self._fetch(query, args, batch_rows)
+
+    async def _fetch(self, query, args, batch_rows):
+        async with self._conn.transaction(readonly=True):
+            cursor = await self._conn.cursor(query, *args)
+            while True:
+                try:
+                    rows = await cursor.fetch(batch_rows, timeout=self._manager.statement_timeout)
+                except (asyncio.TimeoutError, asyncpg.exceptions.QueryCanceledError) as e:
+                    self._manager._counters['statement_timeouts'] += 1
+                    raise StatementTimeout(f"Cursor fetch exceeded {self._manager.statement_timeout}s") from e
+                if not rows:
+                    break
+                yield rows
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._conn is None:
+            raise StopAsyncIteration
+        try:
+            return await self._batches.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        """End the cursor's transaction and release the connection; safe to call more than once"""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            await self._batches.aclose()
+        finally:
+            await self._pool.release(conn)
+
+async_db_manager = AsyncDatabaseManager()
@@ -0,0 +1,215 @@
+"""Thread-safe PostgreSQL connection pool
+
+Physical connections are opened and closed outside the pool lock, so a slow close (a server that
+has gone away, say) never stalls threads checking connections in and out.
+"""
+import time
+import threading
+from collections import deque
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from config.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class PoolTimeout(PoolError):
+    pass
+
+class ConnectionPool:
+    def __init__(self, connection_params: dict, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, idle_timeout: float = 300.0,
+                 health_check_interval: float = 0.0):
+        """Idle connections are pinged when checked out. health_check_interval > 0 skips the ping for
+        connections returned less than that many seconds ago, trading a missed dead connection for one
+        round trip less per checkout."""
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.connection_params = connection_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'connections_created': 0,
+            'connections_closed': 0,
+            'health_check_failures': 0,
+            'evicted': 0
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connection_params)
+        with self._cond:
+            self._counters['connections_created'] += 1
+        return conn
+
+    def _close(self, conn):
+        """Close a connection already removed from the pool; call without holding the lock"""
+        with self._cond:
+            self._counters['connections_closed'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _evict_idle(self, now: float) -> list:
+        """Remove connections idle past idle_timeout (lock held); returns them for the caller to close"""
+        evicted = []
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._counters['evicted'] += 1
+            evicted.append(conn)
+        return evicted
+
+    def getconn(self, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        evicted = []
+
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+
+                    now = time.monotonic()
+                    evicted += self._evict_idle(now)
+
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        conn, last_used = None, now
+                        self._size += 1
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {timeout:.1f}s waiting for a connection "
+                            f"({self._in_use}/{self.max_size} in use, {self._waiting} waiting)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                waited = time.monotonic() - start
+                self._in_use += 1
+                self._counters['checkouts'] += 1
+                if waited > 0.001:
+                    self._counters['waits'] += 1
+                    self._counters['wait_seconds'] += waited
+                    self._counters['max_wait_seconds'] = max(self._counters['max_wait_seconds'], waited)
+        finally:
+            for idle in evicted:
+                self._close(idle)
+
+        try:
+            recently_used = time.monotonic() - last_used < self.health_check_interval
+            if conn is not None and (conn.closed or (not recently_used and not self._is_healthy(conn))):
+                logger.warning("Discarding unhealthy pooled connection")
+                with self._cond:
+                    self._counters['health_check_failures'] += 1
+                self._close(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        if not conn.closed and not discard:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            close = conn.closed or discard or self._closed
+            if close:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if close:
+            self._close(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            counters = dict(self._counters)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'checkouts': counters['checkouts'],
+                'timeouts': counters['timeouts'],
+                'waits': counters['waits'],
+                'total_wait_ms': round(counters['wait_seconds'] * 1000, 3),
+                'avg_wait_ms': round(counters['wait_seconds'] * 1000 / counters['waits'], 3) if counters['waits'] else 0.0,
+                'max_wait_ms': round(counters['max_wait_seconds'] * 1000, 3),
+                'connections_created': counters['connections_created'],
+                'connections_closed': counters['connections_closed'],
+                'health_check_failures': counters['health_check_failures'],
+                'evicted': counters['evicted']
+            }
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
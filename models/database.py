@@ -1,37 +1,166 @@
 """Database utilities"""
+import re
+import threading
 import psycopg2
 import pandas as pd
 from contextlib import contextmanager
 from config.settings import config
 from config.logger import setup_logger
+from models.connection_pool import ConnectionPool
+from models.warehouse import (WarehouseBackend, ADDED_COLUMNS, ADDED_UNIQUE_KEYS, SUMMARY_KEYS, month_bounds,
+                              summary_key_defaults)
 
 logger = setup_logger(__name__)
 
-class DatabaseManager:
-    def __init__(self):
-        self.connection_params = {
-            'host': config.DB_HOST,
-            'port': config.DB_PORT,
-            'database': config.DB_NAME,
-            'user': config.DB_USER,
-            'password': config.DB_PASSWORD
-        }
+COPY_NULL = '\\N'
+SCHEMA_SQL = config.BASE_DIR / 'schema.sql'
+# The fact_sales table and its indexes in schema.sql, recreated when partitioning an older warehouse
+FACT_SALES_DDL = re.compile(r"CREATE (?:TABLE fact_sales \(|INDEX \w+ ON fact_sales\b)[^;]*;")
+# Tables and indexes in schema.sql: groups are (table name,) for a table or (index name, its table)
+SCHEMA_OBJECT_DDL = re.compile(r"CREATE (?:TABLE (\w+) \(|INDEX (\w+) ON (\w+))[^;]*;")
+
+class DataFrameCSVStream:
+    """File-like reader that encodes a DataFrame as CSV one chunk at a time for COPY FROM STDIN"""
+    
+    def __init__(self, df: pd.DataFrame, chunk_size: int):
+        self._df = df
+        self._chunk_size = chunk_size
+        self._offset = 0
+        self._buffer = memoryview(b'')
+        self._pos = 0
+        self.rows = 0
+    
+    def _next_chunk(self):
+        if self._offset >= len(self._df):
+            return False
+        chunk = self._df.iloc[self._offset:self._offset + self._chunk_size]
+        self._offset += len(chunk)
+        self.rows += len(chunk)
+        self._buffer = memoryview(chunk.to_csv(header=False, index=False, na_rep=COPY_NULL).encode())
+        self._pos = 0
+        return True
+    
+    def read(self, size: int = -1):
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(1 << 20), b''))
+        if self._pos >= len(self._buffer) and not self._next_chunk():
+            return b''
+        data = self._buffer[self._pos:self._pos + size].tobytes()
+        self._pos += len(data)
+        return data
+
+class DatabaseManager(WarehouseBackend):
+    dialect = 'postgres'
+    partitioned = True
+    
+    def __init__(self, connection_params: dict = None):
+        self._connection_params = dict(connection_params) if connection_params else None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # partitioned table -> YYYYMM months that already have a partition
+        self._partitions = {}
+        self._partition_lock = threading.Lock()
+        # Connection of the atomic() block a thread is in, which its other operations join
+        self._local = threading.local()
+    
+    @property
+    def connection_params(self) -> dict:
+        # Read on first use rather than when db_manager is created at import, so settings loaded
+        # by an entry point's load_env() apply
+        if self._connection_params is None:
+            self._connection_params = {
+                'host': config.DB_HOST,
+                'port': config.DB_PORT,
+                'database': config.DB_NAME,
+                'user': config.DB_USER,
+                'password': config.DB_PASSWORD
+            }
+        return self._connection_params
+    
+    @property
+    def pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        self.connection_params,
+                        min_size=config.DB_POOL_MIN_SIZE,
+                        max_size=config.DB_POOL_MAX_SIZE,
+                        timeout=config.DB_POOL_TIMEOUT,
+                        idle_timeout=config.DB_POOL_IDLE_TIMEOUT,
+                        health_check_interval=config.DB_POOL_HEALTH_CHECK_INTERVAL
+                    )
+        return self._pool
     
     @contextmanager
     def get_connection(self):
-        conn = None
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Inside atomic(): commit or roll back with the enclosing block
+            yield conn
+            return
+        conn = self.pool.getconn()
+        discard = False
         try:
-            conn = psycopg2.connect(**self.connection_params)
             yield conn
             conn.commit()
         except Exception as e:
-            if conn:
+            try:
                 conn.rollback()
+            except psycopg2.Error:
+                discard = True
             logger.error(f"Database error: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            self.pool.putconn(conn, discard=discard)
+    
+    @contextmanager
+    def transaction(self):
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                yield cur
+    
+    @contextmanager
+    def atomic(self):
+        if getattr(self._local, 'conn', None) is not None:
+            yield self
+            return
+        try:
+            with self.get_connection() as conn:
+                self._local.conn = conn
+                try:
+                    yield self
+                finally:
+                    self._local.conn = None
+        except Exception:
+            # Partitions created in the block were rolled back with it
+            with self._partition_lock:
+                self._partitions.clear()
+            raise
+    
+    @contextmanager
+    def autocommit(self):
+        """Cursor outside a transaction block, for statements such as DETACH PARTITION CONCURRENTLY"""
+        if getattr(self._local, 'conn', None) is not None:
+            raise RuntimeError("autocommit() cannot run inside an atomic() block")
+        with self.get_connection() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    yield cur
+            finally:
+                conn.autocommit = False
+    
+    def pool_stats(self) -> dict:
+        if self._pool is None:
+            return {'size': 0, 'idle': 0, 'in_use': 0, 'waiting': 0}
+        return self._pool.stats()
+    
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
     
     def execute_query(self, query: str, params: tuple = None):
         with self.get_connection() as conn:
@@ -39,23 +168,465 @@ class DatabaseManager:
                 cur.execute(query, params)
                 return cur.fetchall()
     
+    def execute(self, query: str, params: tuple = None):
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return cur.rowcount
+    
     def bulk_insert(self, table: str, df: pd.DataFrame):
+        return self.copy_insert(table, df)['inserted']
+    
+    def upsert(self, table: str, df: pd.DataFrame, key_columns: list, returning: list = None):
+        update_columns = [c for c in df.columns if c not in key_columns]
+        return self.copy_insert(table, df, conflict_columns=key_columns, update_columns=update_columns,
+                                returning=returning)
+    
+    def truncate(self, cursor, tables: list):
+        cursor.execute(f"TRUNCATE {', '.join(tables)}")
+    
+    def any_of(self, column: str, values: list) -> tuple:
+        return f"{column} = ANY(%s)", (list(values),)
+    
+    def initialize_schema(self):
+        """Apply schema.sql to a database that does not have the warehouse tables yet, or bring a
+        warehouse created by an older schema.sql up to date with it"""
+        if self.execute_query("SELECT to_regclass('fact_sales') IS NOT NULL")[0][0]:
+            self._add_missing_columns()
+            self._create_missing_objects()
+            self._add_unique_keys()
+            if self._known_partitions('fact_sales') is None:
+                self._partition_facts()
+            self._add_summary_keys()
+            return False
+        self.execute(SCHEMA_SQL.read_text())
+        self._partitions.clear()
+        logger.info("Created warehouse schema from schema.sql")
+        return True
+    
+    def _partition_facts(self):
+        """Move a fact_sales created by a schema.sql before partitioning into the partitioned table,
+        keeping every row and its sales_key, in one transaction"""
+        legacy = 'fact_sales_unpartitioned'
+        schema = SCHEMA_SQL.read_text()
+        # Facts are upserted on their source record; rows loaded before they carried one would be
+        # loaded a second time rather than matched
+        has_source_id = self.execute_query(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'fact_sales' AND column_name = 'source_id'"
+        )[0][0]
+        unkeyed = self.execute_query(
+            "SELECT COUNT(*) FROM fact_sales" + (" WHERE source_id IS NULL" if has_source_id else "")
+        )[0][0]
+        if unkeyed:
+            raise RuntimeError(
+                f"fact_sales has {unkeyed} rows without a source_id, loaded before facts were keyed by their "
+                f"source record, which upserts would duplicate; set their source_id (adding the column if "
+                f"needed) or delete them and reload with 'run_pipeline.py backfill'"
+            )
+        ddl = [match.group(0) for match in FACT_SALES_DDL.finditer(schema)]
+        with self.transaction() as cur:
+            cur.execute("SELECT COUNT(*), COUNT(date_key) FROM fact_sales")
+            rows, dated = cur.fetchone()
+            logger.info(f"Partitioning fact_sales: moving {rows} rows to monthly partitions")
+            cur.execute(f"ALTER TABLE fact_sales RENAME TO {legacy}")
+            # Free the names the partitioned table's sequence, constraints and indexes will take
+            cur.execute(f"ALTER SEQUENCE IF EXISTS fact_sales_sales_key_seq RENAME TO {legacy}_sales_key_seq")
+            cur.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+                (legacy,)
+            )
+            for (constraint,) in cur.fetchall():
+                cur.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {constraint}")
+            cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", (legacy,))
+            for (index,) in cur.fetchall():
+                cur.execute(f"DROP INDEX {index}")
+            for statement in ddl:
+                cur.execute(statement)
+            
+            cur.execute(f"SELECT DISTINCT date_key / 100 FROM {legacy} WHERE date_key IS NOT NULL")
+            months = sorted(month for (month,) in cur.fetchall())
+            for month in months:
+                cur.execute(f"CREATE TABLE fact_sales_{month} PARTITION OF fact_sales FOR VALUES FROM (%s) TO (%s)",
+                            month_bounds(month))
+            cur.execute(f"SELECT * FROM {legacy} LIMIT 0")
+            legacy_columns = {column[0] for column in cur.description}
+            cur.execute("SELECT * FROM fact_sales LIMIT 0")
+            columns = ', '.join(column[0] for column in cur.description if column[0] in legacy_columns)
+            cur.execute(f"INSERT INTO fact_sales ({columns}) SELECT {columns} FROM {legacy} "
+                        f"WHERE date_key IS NOT NULL ORDER BY date_key")
+            cur.execute("SELECT setval(pg_get_serial_sequence('fact_sales', 'sales_key'), "
+                        f"GREATEST((SELECT MAX(sales_key) FROM {legacy}), 1))")
+            if dated == rows:
+                cur.execute(f"DROP TABLE {legacy}")
+            else:
+                # date_key is the partition key and cannot be NULL; keep those rows for inspection
+                cur.execute(f"DELETE FROM {legacy} WHERE date_key IS NOT NULL")
+                logger.warning(f"{rows - dated} fact_sales rows without a date_key were left in {legacy}")
+        with self._partition_lock:
+            self._partitions.pop('fact_sales', None)
+        logger.info(f"Partitioned fact_sales into {len(months)} monthly partitions")
+    
+    def _create_missing_objects(self):
+        """Create the tables and indexes schema.sql has gained since the warehouse was created, with
+        the rows schema.sql seeds new tables with (fact_sales is brought up to date by partitioning)"""
+        schema = SCHEMA_SQL.read_text()
+        for match in SCHEMA_OBJECT_DDL.finditer(schema):
+            table, index, indexed = match.groups()
+            if 'fact_sales' in (table, indexed):
+                continue
+            if self.execute_query("SELECT to_regclass(%s) IS NOT NULL", (table or index,))[0][0]:
+                continue
+            with self.transaction() as cur:
+                cur.execute(match.group(0))
+                if table:
+                    for seed in re.findall(rf"INSERT INTO {table} \([^;]*;", schema):
+                        cur.execute(seed)
+            logger.info(f"Created {table or index}")
+    
+    def _add_unique_keys(self):
+        """Add the unique keys of ADDED_UNIQUE_KEYS, first merging members that share a natural key
+        into the one with the lowest surrogate key and pointing references at it"""
+        for table, key, natural in ADDED_UNIQUE_KEYS:
+            if self.execute_query(
+                "SELECT 1 FROM pg_constraint c WHERE c.conrelid = to_regclass(%s) AND c.contype IN ('p', 'u') "
+                "AND ARRAY(SELECT attname::text FROM pg_attribute "
+                "WHERE attrelid = c.conrelid AND attnum = ANY(c.conkey) ORDER BY attname) = %s",
+                (table, sorted(natural))
+            ):
+                continue
+            references = self.execute_query(
+                "SELECT c.conrelid::regclass::text, a.attname FROM pg_constraint c "
+                "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1] "
+                "WHERE c.contype = 'f' AND c.confrelid = to_regclass(%s) AND c.conparentid = 0",
+                (table,)
+            )
+            with self.transaction() as cur:
+                cur.execute(f"CREATE TEMP TABLE {table}_merged ON COMMIT DROP AS "
+                            f"SELECT {key}, keep FROM (SELECT {key}, MIN({key}) OVER "
+                            f"(PARTITION BY {', '.join(natural)}) AS keep FROM {table}) members "
+                            f"WHERE {key} <> keep")
+                for referencing, column in references:
+                    cur.execute(f"UPDATE {referencing} r SET {column} = m.keep FROM {table}_merged m "
+                                f"WHERE r.{column} = m.{key}")
+                cur.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table}_merged)")
+                merged = cur.rowcount
+                cur.execute(f"ALTER TABLE {table} ADD UNIQUE ({', '.join(natural)})")
+            if merged:
+                logger.warning(f"Merged {merged} duplicate {table} members")
+            logger.info(f"Added a unique key on {table} ({', '.join(natural)})")
+    
+    def _add_missing_columns(self):
+        existing = set(self.execute_query(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = ANY(%s)",
+            (list({table for table, _, _ in ADDED_COLUMNS}),)
+        ))
+        tables = {table for table, _ in existing}
+        for table, column, column_type in ADDED_COLUMNS:
+            # Tables the warehouse lacks altogether are created from schema.sql with every column
+            if table in tables and (table, column) not in existing:
+                self.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+                logger.info(f"Added {table}.{column}")
+    
+    def _add_summary_keys(self):
+        """Give summary tables created without a primary key one, keeping a single row per key"""
+        for table, keys in SUMMARY_KEYS.items():
+            if self.execute_query("SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+                                  (table,)):
+                continue
+            if not self.execute_query("SELECT to_regclass(%s) IS NOT NULL", (table,))[0][0]:
+                continue
+            defaults = summary_key_defaults(table)
+            with self.transaction() as cur:
+                cur.execute(
+                    f"UPDATE {table} SET {', '.join(f'{c} = COALESCE({c}, {d})' for c, d in defaults.items())} "
+                    f"WHERE {' OR '.join(f'{c} IS NULL' for c in keys)}"
+                )
+                # Concurrent refreshes could insert the same key twice; the copies are identical
+                cur.execute(f"DELETE FROM {table} a USING {table} b WHERE a.ctid > b.ctid AND "
+                            f"{' AND '.join(f'a.{c} = b.{c}' for c in keys)}")
+                duplicates = cur.rowcount
+                # The key's leading column had its own index, which the primary key replaces
+                cur.execute(f"DROP INDEX IF EXISTS idx_{table}_{keys[0].removesuffix('_key')}")
+                cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({', '.join(keys)})")
+            if duplicates:
+                logger.warning(f"Removed {duplicates} duplicate {table} rows; run rebuild-summaries to recompute them")
+            logger.info(f"Added a primary key to {table}")
+    
+    def _partition_months(self, table: str):
+        """Months with a partition named {table}_YYYYMM, or None if table is not partitioned"""
+        rows = self.execute_query(
+            """
+            SELECT c.relkind = 'p', ARRAY(
+                SELECT p.relname FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid
+                WHERE i.inhparent = c.oid
+            )
+            FROM pg_class c WHERE c.oid = to_regclass(%s)
+            """,
+            (table,)
+        )
+        if not rows or not rows[0][0]:
+            return None
+        pattern = re.compile(rf"{re.escape(table)}_(\d{{6}})$")
+        return {int(match.group(1)) for match in map(pattern.match, rows[0][1]) if match}
+    
+    def _known_partitions(self, table: str):
+        with self._partition_lock:
+            if table not in self._partitions:
+                self._partitions[table] = self._partition_months(table)
+            return self._partitions[table]
+    
+    def ensure_partitions(self, table: str, date_keys) -> int:
+        months = {int(date_key) // 100 for date_key in date_keys}
+        known = self._known_partitions(table)
+        with self._partition_lock:
+            missing = sorted(months - known) if known is not None else []
+            if not missing:
+                return 0
+            with self.transaction() as cur:
+                for month in missing:
+                    name = f"{table}_{month}"
+                    # Creating the table first and attaching it takes only SHARE UPDATE EXCLUSIVE on the
+                    # parent, so API reads are not blocked the way CREATE TABLE ... PARTITION OF would
+                    cur.execute(f"CREATE TABLE IF NOT EXISTS {name} "
+                                f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                    cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                                month_bounds(month))
+            known.update(missing)
+        logger.info(f"Created {len(missing)} partitions of {table} ({missing[0]} to {missing[-1]})")
+        return len(missing)
+    
+    def detach_partitions(self, table: str, before_month: int, drop: bool = False) -> list:
+        """Detach partitions of months before before_month without blocking queries on the table.
+        
+        Detached partitions are moved to DB_ARCHIVE_SCHEMA, or dropped when drop is set.
+        """
+        with self._partition_lock:
+            months = self._partition_months(table)
+            if months is None:
+                raise ValueError(f"{table} is not partitioned")
+            names = [f"{table}_{month}" for month in sorted(months) if month < before_month]
+            with self.autocommit() as cur:
+                if names and not drop:
+                    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {config.DB_ARCHIVE_SCHEMA}")
+                for name in names:
+                    # CONCURRENTLY waits for running queries instead of taking ACCESS EXCLUSIVE on the table
+                    cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY")
+                    if drop:
+                        cur.execute(f"DROP TABLE {name}")
+                    else:
+                        cur.execute(f"ALTER TABLE {name} SET SCHEMA {config.DB_ARCHIVE_SCHEMA}")
+                    logger.info(f"Detached {name} ({'dropped' if drop else 'archived'})")
+            self._partitions.pop(table, None)
+        return names
+    
+    # --- parallel partition builds ---
+    
+    def stage_keys(self, table: str, keys: pd.DataFrame, match_columns: list) -> str:
+        """Store the natural keys of a parallel load in an unlogged table that every worker can read"""
+        name = f"{table}_load_keys"
+        with self.transaction() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+            cur.execute(f"CREATE UNLOGGED TABLE {name} AS SELECT {', '.join(keys.columns)} FROM {table} WITH NO DATA")
+            cur.copy_expert(
+                f"COPY {name} ({', '.join(keys.columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                DataFrameCSVStream(keys, config.DB_COPY_CHUNK_ROWS)
+            )
+            cur.execute(f"CREATE INDEX ON {name} ({', '.join(match_columns)})")
+            cur.execute(f"ANALYZE {name}")
+        return name
+    
+    def build_partition(self, table: str, month: int, df: pd.DataFrame, key_columns: list,
+                        match_columns: list) -> dict:
+        """Build the next version of one monthly partition as the standalone table {table}_YYYYMM_load.
+        
+        Stored rows whose match_columns appear in the staged load keys are dropped (they are replaced
+        or moved to another date), then df is added; rows matching a stored row on key_columns keep
+        its other columns, such as the surrogate key. Nothing is visible until swap_partitions.
+        """
+        name, build = f"{table}_{month}", f"{table}_{month}_load"
+        start, end = month_bounds(month)
+        staged = 0 if df is None else len(df)
+        result = {'staged': staged, 'inserted': 0, 'updated': 0, 'conflicted': 0}
+        
+        def joined(left, right, columns):
+            return ' AND '.join(f"{left}.{c} = {right}.{c}" for c in columns)
+        
+        with self.transaction() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {build}")
+            cur.execute(f"CREATE TABLE {build} (LIKE {table} INCLUDING ALL)")
+            # Matching the partition bounds lets ATTACH PARTITION skip its validation scan
+            cur.execute(f"ALTER TABLE {build} ADD CONSTRAINT {build}_bounds "
+                        f"CHECK (date_key >= {start} AND date_key < {end})")
+            cur.execute(f"SELECT * FROM {table} LIMIT 0")
+            table_columns = [column[0] for column in cur.description]
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+            stored = cur.fetchone()[0]
+            
+            if stored:
+                cur.execute(
+                    f"INSERT INTO {build} ({', '.join(table_columns)}) "
+                    f"SELECT {', '.join(table_columns)} FROM {name} p WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {table}_load_keys k WHERE {joined('k', 'p', match_columns)})"
+                )
+            if staged:
+                self._copy_to_temp(cur, '_incoming', table, df)
+                columns = list(df.columns)
+                keys = ', '.join(key_columns)
+                incoming = f"(SELECT DISTINCT ON ({keys}) {', '.join(columns)} FROM _incoming) i"
+                if stored:
+                    updates = [c for c in columns if c not in key_columns]
+                    cur.execute(
+                        f"SELECT COUNT(*) FROM {incoming} JOIN {name} p ON {joined('i', 'p', key_columns)} "
+                        f"WHERE ({', '.join(f'p.{c}' for c in updates)}) "
+                        f"IS DISTINCT FROM ({', '.join(f'i.{c}' for c in updates)})"
+                    )
+                    result['updated'] = cur.fetchone()[0]
+                    # Replaced rows keep the stored values of columns the load does not supply
+                    cur.execute(
+                        f"INSERT INTO {build} ({', '.join(table_columns)}) "
+                        f"SELECT {', '.join(f'i.{c}' if c in columns else f'p.{c}' for c in table_columns)} "
+                        f"FROM {incoming} JOIN {name} p ON {joined('i', 'p', key_columns)}"
+                    )
+                    new_rows = f"WHERE NOT EXISTS (SELECT 1 FROM {name} p WHERE {joined('p', 'i', key_columns)})"
+                else:
+                    new_rows = ""
+                cur.execute(f"INSERT INTO {build} ({', '.join(columns)}) "
+                            f"SELECT {', '.join(columns)} FROM {incoming} {new_rows}")
+                result['inserted'] = cur.rowcount
+            
+            # Foreign keys are validated here, in the worker, so attaching the build does not revalidate them
+            cur.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                (table,)
+            )
+            for constraint, definition in cur.fetchall():
+                cur.execute(f"ALTER TABLE {build} ADD CONSTRAINT {constraint} {definition}")
+            cur.execute(f"ANALYZE {build}")
+        
+        result['conflicted'] = staged - result['inserted'] - result['updated']
+        return result
+    
+    def swap_partitions(self, table: str, months: list):
+        """Replace the partition of each month with its build in one transaction, so all or none land.
+        
+        DETACH/ATTACH hold an exclusive lock on the table until commit, but only for catalog updates:
+        the builds already carry matching indexes, foreign keys and a bounds check.
+        """
+        with self._partition_lock:
+            known = self._partition_months(table) or set()
+            with self.transaction() as cur:
+                for month in sorted(months):
+                    name, build = f"{table}_{month}", f"{table}_{month}_load"
+                    if month in known:
+                        cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                        cur.execute(f"DROP TABLE {name}")
+                    cur.execute(f"ALTER TABLE {build} RENAME TO {name}")
+                    cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                                month_bounds(month))
+                    cur.execute(f"ALTER TABLE {name} DROP CONSTRAINT {build}_bounds")
+                    cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass",
+                                (name,))
+                    for (index,) in cur.fetchall():
+                        if index.startswith(build):
+                            cur.execute(f"ALTER INDEX {index} RENAME TO {name}{index[len(build):]}")
+                cur.execute(f"DROP TABLE IF EXISTS {table}_load_keys")
+            self._partitions.pop(table, None)
+        logger.info(f"Swapped in {len(months)} partitions of {table}")
+    
+    def drop_partition_builds(self, table: str, months: list):
+        with self.transaction() as cur:
+            for month in months:
+                cur.execute(f"DROP TABLE IF EXISTS {table}_{month}_load")
+            cur.execute(f"DROP TABLE IF EXISTS {table}_load_keys")
+    
+    def _copy_to_temp(self, cur, name: str, table: str, df: pd.DataFrame, chunk_size: int = None):
+        """COPY df into a temp table with the types of the same columns of table, dropped on commit"""
+        columns = ', '.join(df.columns)
+        stream = DataFrameCSVStream(df, chunk_size or config.DB_COPY_CHUNK_ROWS)
+        # An earlier load of the same table in an enclosing atomic() block has not dropped its own yet
+        cur.execute(f"DROP TABLE IF EXISTS {name}")
+        cur.execute(f"CREATE TEMP TABLE {name} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+        cur.copy_expert(f"COPY {name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", stream)
+        return stream
+    
+    def copy_insert(self, table: str, df: pd.DataFrame, conflict_columns: list = None,
+                    update_columns: list = None, returning: list = None, chunk_size: int = None):
         if df.empty:
             logger.warning(f"No data to insert into {table}")
-            return 0
+            result = {'staged': 0, 'inserted': 0, 'updated': 0, 'conflicted': 0}
+            if returning:
+                result['rows'] = []
+            return result
         
         columns = ', '.join(df.columns)
-        placeholders = ', '.join(['%s'] * len(df.columns))
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) ON CONFLICT DO NOTHING"
+        staging = f"_stage_{table}"
+        partitioned = bool(conflict_columns) and self._known_partitions(table) is not None
         
-        values = [tuple(row) for row in df.values]
+        select = f"SELECT {columns} FROM {staging}"
+        if conflict_columns:
+            keys = ', '.join(conflict_columns)
+            select = f"SELECT DISTINCT ON ({keys}) {columns} FROM {staging}"
+            conflict = f"ON CONFLICT ({keys}) DO NOTHING"
+            if update_columns:
+                assignments = ', '.join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+                current = ', '.join(f"{table}.{c}" for c in update_columns)
+                incoming = ', '.join(f"EXCLUDED.{c}" for c in update_columns)
+                conflict = (
+                    f"ON CONFLICT ({keys}) DO UPDATE SET {assignments} "
+                    f"WHERE ({current}) IS DISTINCT FROM ({incoming})"
+                )
+        else:
+            conflict = "ON CONFLICT DO NOTHING"
         
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.executemany(query, values)
-                rows_inserted = cur.rowcount
-                logger.info(f"Inserted {rows_inserted} rows into {table}")
-                return rows_inserted
+                stream = self._copy_to_temp(cur, staging, table, df, chunk_size)
+                if returning:
+                    cur.execute(
+                        f"INSERT INTO {table} ({columns}) {select} {conflict} "
+                        f"RETURNING (xmax = 0) AS inserted, {', '.join(returning)}"
+                    )
+                    returned = cur.fetchall()
+                    rows_inserted = sum(1 for row in returned if row[0])
+                    rows_updated = len(returned) - rows_inserted
+                elif partitioned:
+                    # Partitioned tables cannot return xmax, so keys not yet present are counted first.
+                    # A LIMIT 1 probe per key prunes to one partition; NOT EXISTS would merge the whole table.
+                    key_join = ' AND '.join(f"t.{k} = s.{k}" for k in conflict_columns)
+                    cur.execute(
+                        f"SELECT COUNT(*) FROM (SELECT DISTINCT {keys} FROM {staging}) s "
+                        f"WHERE (SELECT 1 FROM {table} t WHERE {key_join} LIMIT 1) IS NULL"
+                    )
+                    new_keys = cur.fetchone()[0]
+                    cur.execute(f"INSERT INTO {table} ({columns}) {select} {conflict}")
+                    rows_inserted = min(new_keys, cur.rowcount)
+                    rows_updated = cur.rowcount - rows_inserted
+                else:
+                    cur.execute(
+                        f"WITH merged AS ("
+                        f"INSERT INTO {table} ({columns}) {select} {conflict} "
+                        f"RETURNING (xmax = 0) AS inserted"
+                        f") SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) "
+                        f"FROM merged"
+                    )
+                    rows_inserted, rows_updated = cur.fetchone()
+        
+        result = {
+            'staged': stream.rows,
+            'inserted': rows_inserted,
+            'updated': rows_updated,
+            'conflicted': stream.rows - rows_inserted - rows_updated
+        }
+        if returning:
+            result['rows'] = [row[1:] for row in returned]
+        logger.info(
+            f"Inserted {rows_inserted} rows into {table} "
+            f"({rows_updated} updated, {result['conflicted']} unchanged or conflicting)"
+        )
+        return result
     
     def query_to_dataframe(self, query: str, params: tuple = None):
         with self.get_connection() as conn:
@@ -0,0 +1,19 @@
+"""Load generation counter bumped by the pipelines after each successful load"""
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS load_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+SEED_SQL = "INSERT INTO load_generation (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING"
+SELECT_SQL = "SELECT generation FROM load_generation WHERE id = 1"
+BUMP_SQL = "UPDATE load_generation SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+
+def read_load_generation(db) -> int:
+    rows = db.execute_query(SELECT_SQL)
+    return int(rows[0][0]) if rows else 0
+
+def bump_load_generation(db):
+    db.execute(BUMP_SQL)
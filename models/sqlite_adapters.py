@@ -0,0 +1,9 @@
+"""sqlite3 parameter adapters for the standard library date types, stored as ISO text
+
+Kept apart from the SQLite backend so the simple API can register them without importing pandas.
+"""
+import sqlite3
+from datetime import date, datetime
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
@@ -0,0 +1,287 @@
+"""SQLite warehouse backend: the star schema in a local file, loaded with batched executemany"""
+import re
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from config.settings import config
+from config.logger import setup_logger
+from models import sqlite_adapters  # noqa: F401 - datetime and date adapters
+from models.warehouse import WarehouseBackend, ADDED_COLUMNS, SUMMARY_KEYS, summary_key_defaults
+
+logger = setup_logger(__name__)
+
+SCHEMA_SQL = config.BASE_DIR / 'schema_sqlite.sql'
+INDEX_DDL = re.compile(r"CREATE INDEX IF NOT EXISTS (\w+) ON (\w+)\s*\([^;]*\)")
+# Tables written by bulk loads; their secondary indexes are rebuilt once afterwards
+BULK_TABLE_PREFIXES = ('dim_', 'fact_')
+FACT_KEY = {'source_system', 'source_id', 'date_key'}
+
+# Explicit adapters: timestamps stored as ISO text, numpy scalars as Python numbers
+sqlite3.register_adapter(pd.Timestamp, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.bool_, int)
+
+def column_values(series: pd.Series) -> list:
+    """Python values sqlite3 can bind: booleans as 0/1, timestamps as text, missing values as None"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # datetime_as_string is several times faster than Series.dt.strftime
+        if series.dt.tz is not None:
+            series = series.dt.tz_localize(None)
+        text = np.datetime_as_string(series.to_numpy(dtype='datetime64[s]'), unit='s').tolist()
+        return [None if missing else value.replace('T', ' ')
+                for value, missing in zip(text, series.isna().to_numpy())]
+    if pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy(dtype=np.int64, na_value=0).astype(object)
+    else:
+        values = series.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if missing.any():
+        values[missing] = None
+    return values.tolist()
+
+def _sql(query: str) -> str:
+    return query.replace('%s', '?')
+
+class _Cursor:
+    """sqlite3 cursor accepting the %s placeholders used across the ETL"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params: tuple = None):
+        self._cursor.execute(_sql(query), params or ())
+        return self
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+class SQLiteDatabaseManager(WarehouseBackend):
+    dialect = 'sqlite'
+
+    def __init__(self, path: str = None, batch_rows: int = None, cache_mb: int = None):
+        self.path = str(path or config.SQLITE_PATH)
+        self.batch_rows = batch_rows or config.SQLITE_BATCH_ROWS
+        self.cache_mb = cache_mb or config.SQLITE_CACHE_MB
+        self._conn = None
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One writer connection; isolation_level=None so transactions are managed explicitly
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            # WAL lets API readers keep reading while the pipeline writes, and persists in the file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self.conn
+            outer = self._depth == 0
+            if outer:
+                conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield conn
+            except Exception:
+                if outer:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                if outer:
+                    conn.execute("COMMIT")
+            finally:
+                self._depth -= 1
+
+    @contextmanager
+    def transaction(self):
+        with self._transaction() as conn:
+            yield _Cursor(conn.cursor())
+
+    @contextmanager
+    def atomic(self):
+        with self._transaction():
+            yield self
+
+    def execute(self, query: str, params: tuple = None) -> int:
+        with self._transaction() as conn:
+            return conn.execute(_sql(query), params or ()).rowcount
+
+    def execute_query(self, query: str, params: tuple = None) -> list:
+        with self._lock:
+            return self.conn.execute(_sql(query), params or ()).fetchall()
+
+    def query_to_dataframe(self, query: str, params: tuple = None) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(_sql(query), self.conn, params=params)
+
+    def any_of(self, column: str, values: list) -> tuple:
+        # One JSON parameter instead of a placeholder per value, so list length is unbounded
+        return f"{column} IN (SELECT value FROM json_each(%s))", (json.dumps(list(values), default=str),)
+
+    def initialize_schema(self):
+        with self._lock:
+            exists = self.conn.execute("PRAGMA table_info(fact_sales)").fetchall()
+            if exists and FACT_KEY not in self._unique_keys('fact_sales'):
+                raise RuntimeError(
+                    f"{self.path} has an older fact_sales schema; "
+                    f"delete it so the warehouse schema can be created"
+                )
+            # SQLite cannot add a primary key, so summary tables created without one are recreated
+            unkeyed = [table for table in SUMMARY_KEYS if self._columns(table) and not self._primary_key(table)]
+            for table in unkeyed:
+                self.conn.execute(f"ALTER TABLE {table} RENAME TO {table}_unkeyed")
+            self.conn.executescript(SCHEMA_SQL.read_text())
+            for table, column, column_type in ADDED_COLUMNS:
+                if column not in self._columns(table):
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            for table in unkeyed:
+                self._copy_summary(f"{table}_unkeyed", table)
+        return not exists
+
+    def _columns(self, table: str) -> list:
+        return [info[1] for info in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def _primary_key(self, table: str) -> list:
+        return [info[1] for info in self.conn.execute(f"PRAGMA table_info({table})") if info[5]]
+
+    def _copy_summary(self, source: str, table: str):
+        """Move the rows of an unkeyed summary table into table, keeping one row per key"""
+        defaults = summary_key_defaults(table)
+        columns = self._columns(table)
+        select = ', '.join(f"COALESCE({c}, {defaults[c]})" if c in defaults else c for c in columns)
+        with self._transaction() as conn:
+            copied = conn.execute(f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                                  f"SELECT {select} FROM {source}").rowcount
+            duplicates = conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0] - copied
+            conn.execute(f"DROP TABLE {source}")
+        if duplicates:
+            logger.warning(f"Removed {duplicates} duplicate {table} rows; run rebuild-summaries to recompute them")
+        logger.info(f"Added a primary key to {table}")
+
+    def _unique_keys(self, table: str) -> list:
+        return [
+            {column[2] for column in self.conn.execute(f"PRAGMA index_info('{index[1]}')")}
+            for index in self.conn.execute(f"PRAGMA index_list({table})") if index[2]
+        ]
+
+    def _secondary_indexes(self) -> dict:
+        return {
+            match.group(1): match.group(0)
+            for match in INDEX_DDL.finditer(SCHEMA_SQL.read_text())
+            if match.group(2).startswith(BULK_TABLE_PREFIXES)
+        }
+
+    @contextmanager
+    def bulk_load(self, defer_indexes: bool = False):
+        """One transaction with load-time pragmas; secondary indexes are rebuilt once at the end"""
+        with self._lock:
+            self.conn.execute(f"PRAGMA cache_size=-{self.cache_mb * 1024}")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
+            self.conn.execute("PRAGMA synchronous=OFF")
+            try:
+                with self._transaction() as conn:
+                    indexes = self._secondary_indexes() if defer_indexes else {}
+                    for name in indexes:
+                        conn.execute(f"DROP INDEX IF EXISTS {name}")
+                    yield self
+                    start = time.perf_counter()
+                    for ddl in indexes.values():
+                        conn.execute(ddl)
+                    if indexes:
+                        logger.info(f"Rebuilt {len(indexes)} indexes in {time.perf_counter() - start:.2f}s")
+            finally:
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _insert_batches(self, conn, sql: str, df: pd.DataFrame):
+        for start in range(0, len(df), self.batch_rows):
+            batch = df.iloc[start:start + self.batch_rows]
+            conn.executemany(sql, zip(*(column_values(batch[column]) for column in batch.columns)))
+
+    def _insert_sql(self, table: str, columns: list) -> str:
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def bulk_insert(self, table: str, df: pd.DataFrame) -> int:
+        if df.empty:
+            return 0
+        with self._transaction() as conn:
+            self._insert_batches(conn, self._insert_sql(table, list(df.columns)), df)
+        return len(df)
+
+    def upsert(self, table: str, df: pd.DataFrame, key_columns: list, returning: list = None) -> dict:
+        """Stage df in a temp table with executemany, then merge with INSERT ... ON CONFLICT.
+
+        SQLite cannot tell inserts from updates in RETURNING, so new keys are counted before the merge;
+        'rows' holds the returning columns for every staged key, written or not.
+        """
+        result = {'staged': 0, 'inserted': 0, 'updated': 0, 'conflicted': 0}
+        if df.empty:
+            logger.warning(f"No data to insert into {table}")
+            if returning:
+                result['rows'] = []
+            return result
+
+        columns = list(df.columns)
+        column_list = ', '.join(columns)
+        keys = ', '.join(key_columns)
+        key_join = ' AND '.join(f"t.{k} = s.{k}" for k in key_columns)
+        updates = [c for c in columns if c not in key_columns]
+        stage = f"_stage_{table}"
+        if updates:
+            assignments = ', '.join(f"{c} = excluded.{c}" for c in updates)
+            changed = ' OR '.join(f"{table}.{c} IS NOT excluded.{c}" for c in updates)
+            action = f"DO UPDATE SET {assignments} WHERE {changed}"
+        else:
+            action = "DO NOTHING"
+
+        with self._transaction() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS temp.{stage}")
+            conn.execute(f"CREATE TEMP TABLE {stage} AS SELECT {column_list} FROM {table} WHERE 0")
+            self._insert_batches(conn, self._insert_sql(f"temp.{stage}", columns), df)
+            new_keys = conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT DISTINCT {keys} FROM temp.{stage}) s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {key_join})"
+            ).fetchone()[0]
+            before = conn.total_changes
+            # WHERE true keeps ON CONFLICT from parsing as a join constraint
+            conn.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM temp.{stage} "
+                         f"WHERE true ON CONFLICT ({keys}) {action}")
+            written = conn.total_changes - before
+            if returning:
+                result['rows'] = conn.execute(
+                    f"SELECT {', '.join(f't.{c}' for c in returning)} FROM {table} t "
+                    f"JOIN (SELECT DISTINCT {keys} FROM temp.{stage}) s ON {key_join}"
+                ).fetchall()
+            conn.execute(f"DROP TABLE temp.{stage}")
+
+        result['staged'] = len(df)
+        result['inserted'] = min(new_keys, written)
+        result['updated'] = written - result['inserted']
+        result['conflicted'] = len(df) - written
+        logger.info(
+            f"Inserted {result['inserted']} rows into {table} "
+            f"({result['updated']} updated, {result['conflicted']} unchanged or conflicting)"
+        )
+        return result
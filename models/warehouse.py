@@ -0,0 +1,157 @@
+"""Warehouse backend interface shared by the Postgres and SQLite implementations
+
+The pipeline, dimension cache, watermarks and summaries only use these operations, so the same
+load path runs against either engine. SQL passed to execute/execute_query/transaction uses %s
+placeholders; backends translate them to their own parameter style.
+"""
+from contextlib import contextmanager
+import pandas as pd
+from config.settings import config
+
+BACKENDS = ('postgres', 'sqlite')
+
+# Columns added to warehouse tables after their schema first shipped: (table, column, type). The
+# schema files create them; initialize_schema adds them to warehouses created before.
+ADDED_COLUMNS = [
+    ('dim_customer', 'row_hash', 'BIGINT'),
+    ('dim_product', 'row_hash', 'BIGINT'),
+    ('etl_log', 'run_id', 'VARCHAR(50)'),
+    ('etl_log', 'stage', 'VARCHAR(50)'),
+    ('etl_log', 'records_updated', 'INTEGER'),
+    ('etl_log', 'bytes_processed', 'BIGINT'),
+    ('etl_log', 'duration_seconds', 'DECIMAL(12, 4)'),
+    ('etl_log', 'rows_per_second', 'DECIMAL(14, 1)'),
+    ('etl_log', 'peak_rss_mb', 'DECIMAL(10, 1)'),
+    ('etl_log', 'retry_sleep_seconds', 'DECIMAL(10, 3)'),
+    ('etl_log', 'rate_limit_sleep_seconds', 'DECIMAL(10, 3)')
+]
+
+# Unique keys that upserts conflict on and warehouses created before them lack:
+# (table, surrogate key column, natural key columns)
+ADDED_UNIQUE_KEYS = [
+    ('dim_sales_rep', 'sales_rep_key', ('sales_rep_name',))
+]
+
+# Summary tables and the primary keys that warehouses created before them lack. Their dimension key
+# columns hold 0 rather than NULL for facts without a member.
+SUMMARY_KEYS = {
+    'agg_sales_daily': ('date_key', 'customer_key', 'product_key', 'territory_key', 'source_system'),
+    'agg_sales_monthly': ('month_key', 'source_system')
+}
+
+def summary_key_defaults(table: str) -> dict:
+    """Value stored in place of NULL for each key column of a summary table"""
+    return {column: "''" if column == 'source_system' else '0' for column in SUMMARY_KEYS[table]}
+
+class WarehouseBackend:
+    dialect = None
+    # True when fact_sales is partitioned by month and partitions can be built in parallel and swapped in
+    partitioned = False
+
+    # --- statements ---
+
+    def execute(self, query: str, params: tuple = None) -> int:
+        """Run one statement in its own transaction and return the affected row count"""
+        raise NotImplementedError
+
+    def execute_query(self, query: str, params: tuple = None) -> list:
+        raise NotImplementedError
+
+    def query_to_dataframe(self, query: str, params: tuple = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @contextmanager
+    def transaction(self):
+        """Yield a cursor whose statements commit together (execute(query, params), rowcount)"""
+        raise NotImplementedError
+        yield
+
+    @contextmanager
+    def atomic(self):
+        """Scope in which every operation of this thread, upserts included, commits or rolls back together"""
+        raise NotImplementedError
+        yield
+
+    # --- bulk load and upsert ---
+
+    @contextmanager
+    def bulk_load(self, defer_indexes: bool = False):
+        """Scope for a large load; engines may tune durability and defer secondary index maintenance"""
+        yield self
+
+    def bulk_insert(self, table: str, df: pd.DataFrame) -> int:
+        raise NotImplementedError
+
+    def upsert(self, table: str, df: pd.DataFrame, key_columns: list, returning: list = None) -> dict:
+        """Insert new keys and update changed rows; returns staged/inserted/updated/conflicted counts,
+        plus 'rows' (values of the returning columns for written rows) when returning is given"""
+        raise NotImplementedError
+
+    def upsert_chunks(self, table: str, chunks, key_columns: list) -> dict:
+        totals = {'staged': 0, 'inserted': 0, 'updated': 0, 'conflicted': 0}
+        for chunk in chunks:
+            result = self.upsert(table, chunk, key_columns)
+            for key in totals:
+                totals[key] += result[key]
+        return totals
+
+    def truncate(self, cursor, tables: list):
+        for table in tables:
+            cursor.execute(f"DELETE FROM {table}")
+
+    # --- key lookup ---
+
+    def any_of(self, column: str, values: list) -> tuple:
+        """SQL fragment and params matching column against a list of any length"""
+        raise NotImplementedError
+
+    def lookup(self, table: str, columns: list, key_column: str, values: list, **filters) -> pd.DataFrame:
+        """Rows of table whose key_column is in values, optionally narrowed by column = value filters"""
+        clause, params = self.any_of(key_column, list(values))
+        where = [clause] + [f"{column} = %s" for column in filters]
+        return self.query_to_dataframe(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)}",
+            params=params + tuple(filters.values())
+        )
+
+    # --- partitioning ---
+
+    def ensure_partitions(self, table: str, date_keys) -> int:
+        """Create any missing monthly partitions of table for date_keys (YYYYMMDD); returns how many"""
+        return 0
+
+    def detach_partitions(self, table: str, before_month: int, drop: bool = False) -> list:
+        """Detach monthly partitions older than before_month (YYYYMM), archiving or dropping them"""
+        raise NotImplementedError(f"{self.dialect} warehouse tables are not partitioned")
+
+    # --- schema and lifecycle ---
+
+    def initialize_schema(self):
+        raise NotImplementedError
+
+    def pool_stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+def month_bounds(month: int) -> tuple:
+    """date_key range [start, end) of a YYYYMM month, used as its partition bounds"""
+    following = month + 1 if month % 100 < 12 else (month // 100 + 1) * 100 + 1
+    return month * 100, following * 100
+
+_warehouses = {}
+
+def get_warehouse(name: str = None) -> WarehouseBackend:
+    """Shared backend instance for WAREHOUSE_BACKEND (or the named backend)"""
+    name = (name or config.WAREHOUSE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown warehouse backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name not in _warehouses:
+        if name == 'postgres':
+            from models.database import db_manager
+            _warehouses[name] = db_manager
+        else:
+            from models.sqlite_database import SQLiteDatabaseManager
+            _warehouses[name] = SQLiteDatabaseManager()
+    return _warehouses[name]
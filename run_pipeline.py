@@ -1,36 +1,193 @@
 #!/usr/bin/env python3
-"""Main runner script for the Sales API Pipeline"""
+"""Sales API Pipeline command line
+
+    run_pipeline.py [run] [--daemon]   incremental extract and load (or keep running on a schedule)
+    run_pipeline.py backfill           full extract and reload of every source
+    run_pipeline.py load-only [RUN_ID] load a staged run without extracting
+    run_pipeline.py health             warehouse reachability and the latest run, as JSON
+
+Subcommands import the pipeline (pandas, the database drivers and connectors) only when they need
+it, so --help and health checks start quickly; .env is loaded once arguments have been parsed.
+"""
 import sys
+import argparse
 from datetime import datetime
-from etl.pipeline import SalesDataPipeline
+from config.settings import load_env
+
+def print_stages(stages):
+    print("\nStages:")
+    print(f"  {'stage':<20} {'source':<14} {'seconds':>8} {'rows in':>9} {'rows out':>9} "
+          f"{'rows/s':>10} {'MB':>8} {'RSS MB':>7} {'sleep s':>8}")
+    for s in stages:
+        sleep = s['retry_sleep_seconds'] + s['rate_limit_sleep_seconds']
+        print(f"  {s['stage']:<20} {s['source_system'] or '':<14} {s['seconds']:>8.3f} {s['rows_in']:>9,} "
+              f"{s['rows_out'] + s['rows_updated']:>9,} {s['rows_per_second']:>10,.0f} "
+              f"{s['bytes'] / 1e6:>8.2f} {s['peak_rss_mb'] or 0:>7.0f} {sleep:>8.2f}")
 
-def main():
+def run_pipeline(args, mode: str) -> int:
+    from etl.pipeline import SalesDataPipeline
+    from etl.run_lock import pipeline_lock
+    from models.warehouse import get_warehouse
+    
+    db = get_warehouse(args.backend)
     print("=" * 80)
-    print("SALES API PIPELINE")
+    print(f"SALES API PIPELINE ({db.dialect})")
     print("=" * 80)
     print(f"Started: {datetime.now()}")
     print("=" * 80)
     print()
     
     try:
-        pipeline = SalesDataPipeline()
-        result = pipeline.run_full_pipeline()
+        pipeline = SalesDataPipeline(db, load_workers=args.workers)
+        with pipeline_lock():
+            if mode == 'load-only':
+                result = pipeline.run_load_only(args.run_id)
+            elif mode == 'incremental':
+                result = pipeline.run_incremental_pipeline()
+            else:
+                result = pipeline.run_full_pipeline()
         
         print("\n" + "=" * 80)
         print("PIPELINE RESULTS")
         print("=" * 80)
         print(f"Status: {result['status']}")
         
-        if result['status'] == 'SUCCESS':
+        if result['status'] in ('SUCCESS', 'PARTIAL'):
+            print(f"Staged run: {result['run_id']}")
             print(f"Duration: {result['duration']:.2f} seconds")
-            return 0
+            print(f"Extract wall time: {result['extract_wall_time']:.2f} seconds")
+            for source, seconds in result['extract_timings'].items():
+                print(f"  {source}: {seconds:.2f} seconds")
+            for source, error in result['extract_errors'].items():
+                print(f"  {source} failed: {error}")
+            if result['entity_memory']:
+                print("Extracted in memory:")
+                for entity, memory in result['entity_memory'].items():
+                    print(f"  {entity}: {memory['rows']:,} rows, {memory['memory_bytes'] / 1e6:.2f} MB "
+                          f"({memory['bytes_per_row']:.0f} bytes/row)")
+            print_stages(result['stages'])
+            return 0 if result['status'] == 'SUCCESS' else 1
         else:
             print(f"Error: {result.get('error', 'Unknown error')}")
+            if result.get('run_id'):
+                print(f"Extracts are staged; retry with: {sys.argv[0]} load-only {result['run_id']}")
             return 1
             
     except Exception as e:
         print(f"\n❌ Pipeline failed: {e}")
         return 1
 
+def cmd_run(args) -> int:
+    if args.daemon:
+        from etl.scheduler import PipelineScheduler
+        from models.warehouse import get_warehouse
+        PipelineScheduler(get_warehouse(args.backend), load_workers=args.workers or 1).run_forever()
+        return 0
+    return run_pipeline(args, 'incremental')
+
+def cmd_backfill(args) -> int:
+    return run_pipeline(args, 'full')
+
+def cmd_load_only(args) -> int:
+    return run_pipeline(args, 'load-only')
+
+def cmd_health(args) -> int:
+    import json
+    from etl.health import check_health
+    report = check_health(args.backend)
+    print(json.dumps(report, indent=2))
+    return 0 if report['status'] == 'healthy' else 1
+
+def cmd_rebuild_summaries(args) -> int:
+    from etl.aggregates import SalesSummaries
+    from etl.run_lock import PipelineLocked, pipeline_lock
+    from models.warehouse import get_warehouse
+    try:
+        # A pipeline run refreshes the same summary rows
+        with pipeline_lock():
+            rows = SalesSummaries(get_warehouse(args.backend)).rebuild()
+    except PipelineLocked as e:
+        print(f"❌ {e}; try again once it has finished")
+        return 1
+    print(f"Rebuilt sales summaries ({rows} daily rows)")
+    return 0
+
+def cmd_archive(args) -> int:
+    from models.generation import bump_load_generation
+    from models.warehouse import get_warehouse
+    db = get_warehouse(args.backend)
+    detached = db.detach_partitions('fact_sales', args.before, drop=args.drop)
+    if detached:
+        bump_load_generation(db)
+    print(f"{'Dropped' if args.drop else 'Archived'} {len(detached)} partitions: {', '.join(detached) or '-'}")
+    return 0
+
+def month_arg(value: str) -> int:
+    """YYYY-MM as a YYYYMM month number"""
+    try:
+        month = datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}") from None
+    return month.year * 100 + month.month
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--backend', metavar='NAME',
+                        help="Warehouse to use, postgres or sqlite (default: WAREHOUSE_BACKEND)")
+    workers = argparse.ArgumentParser(add_help=False)
+    workers.add_argument('--workers', type=int, metavar='N',
+                         help="Load facts with N worker processes building month partitions (default: LOAD_WORKERS)")
+    
+    parser = argparse.ArgumentParser(description="Run the Sales API Pipeline",
+                                     epilog="Without a COMMAND, runs 'run' with the options given")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+    
+    run = commands.add_parser('run', parents=[common, workers],
+                              help="Extract and load records changed since the last run")
+    run.add_argument('--daemon', action='store_true',
+                     help="Keep running incremental micro-batches on the SCHEDULE_* per-source intervals "
+                          "until SIGTERM/SIGINT (loads facts serially unless --workers is given)")
+    run.set_defaults(handler=cmd_run)
+    
+    backfill = commands.add_parser('backfill', parents=[common, workers],
+                                   help="Extract every source in full and reload the warehouse")
+    backfill.set_defaults(handler=cmd_backfill)
+    
+    load_only = commands.add_parser('load-only', parents=[common, workers],
+                                    help="Skip extraction and load a staged run")
+    load_only.add_argument('run_id', nargs='?', metavar='RUN_ID', help="Staged run to load (default: the latest)")
+    load_only.set_defaults(handler=cmd_load_only)
+    
+    health = commands.add_parser('health', parents=[common],
+                                 help="Check the warehouse and the latest run; exits 1 when unhealthy")
+    health.set_defaults(handler=cmd_health)
+    
+    summaries = commands.add_parser('rebuild-summaries', parents=[common],
+                                    help="Rebuild the sales summary tables from fact_sales")
+    summaries.set_defaults(handler=cmd_rebuild_summaries)
+    
+    archive = commands.add_parser('archive', parents=[common],
+                                  help="Detach old fact_sales partitions into DB_ARCHIVE_SCHEMA; "
+                                       "summary tables keep their history")
+    archive.add_argument('--before', type=month_arg, metavar='YYYY-MM', required=True,
+                         help="Detach partitions for months before this one")
+    archive.add_argument('--drop', action='store_true', help="Drop the detached partitions instead of archiving them")
+    archive.set_defaults(handler=cmd_archive)
+    return parser
+
+def main(argv: list = None) -> int:
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # `run_pipeline.py` and `run_pipeline.py --daemon` keep working as they did before subcommands
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ['run', *argv]
+    args = parser.parse_args(argv)
+    load_env()
+    try:
+        return args.handler(args)
+    except (ValueError, NotImplementedError) as e:
+        # An unknown --backend, or a command the backend does not support
+        parser.error(str(e))
+
 if __name__ == "__main__":
     sys.exit(main())
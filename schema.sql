@@ -9,6 +9,11 @@ DROP TABLE IF EXISTS dim_date CASCADE;
 DROP TABLE IF EXISTS dim_sales_rep CASCADE;
 DROP TABLE IF EXISTS dim_territory CASCADE;
 DROP TABLE IF EXISTS etl_log CASCADE;
+DROP TABLE IF EXISTS etl_watermark CASCADE;
+DROP TABLE IF EXISTS agg_sales_daily CASCADE;
+DROP TABLE IF EXISTS agg_sales_monthly CASCADE;
+DROP TABLE IF EXISTS agg_refresh CASCADE;
+DROP TABLE IF EXISTS load_generation CASCADE;
 
 -- Customer Dimension
 CREATE TABLE dim_customer (
@@ -23,7 +28,9 @@ CREATE TABLE dim_customer (
     state VARCHAR(50),
     country VARCHAR(50),
     created_date TIMESTAMP,
-    last_modified_date TIMESTAMP
+    last_modified_date TIMESTAMP,
+    -- Hash of the attributes as last written, to skip unchanged members
+    row_hash BIGINT
 );
 
 -- Product Dimension
@@ -35,7 +42,8 @@ CREATE TABLE dim_product (
     unit_price DECIMAL(10, 2),
     is_active BOOLEAN DEFAULT TRUE,
     created_date TIMESTAMP,
-    last_modified_date TIMESTAMP
+    last_modified_date TIMESTAMP,
+    row_hash BIGINT
 );
 
 -- Date Dimension
@@ -63,16 +71,19 @@ CREATE TABLE dim_territory (
 -- Sales Rep Dimension
 CREATE TABLE dim_sales_rep (
     sales_rep_key SERIAL PRIMARY KEY,
-    sales_rep_name VARCHAR(255) NOT NULL,
+    sales_rep_name VARCHAR(255) UNIQUE NOT NULL,
     territory_key INTEGER,
     region VARCHAR(100),
     is_active BOOLEAN DEFAULT TRUE
 );
 
 -- Sales Fact Table
+-- Range partitioned by month on date_key (fact_sales_YYYYMM, bounds YYYYMM00 to the next month's);
+-- the loader creates partitions as dates arrive and old months can be detached and archived.
+-- Unique keys on a partitioned table must include the partition key, hence date_key in both.
 CREATE TABLE fact_sales (
-    sales_key SERIAL PRIMARY KEY,
-    date_key INTEGER,
+    sales_key SERIAL,
+    date_key INTEGER NOT NULL,
     customer_key INTEGER,
     product_key INTEGER,
     sales_rep_key INTEGER,
@@ -83,27 +94,87 @@ CREATE TABLE fact_sales (
     is_closed BOOLEAN DEFAULT FALSE,
     transaction_date TIMESTAMP NOT NULL,
     source_system VARCHAR(50),
+    source_id VARCHAR(50),
+    PRIMARY KEY (sales_key, date_key),
+    UNIQUE (source_system, source_id, date_key),
     FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
     FOREIGN KEY (customer_key) REFERENCES dim_customer(customer_key),
     FOREIGN KEY (product_key) REFERENCES dim_product(product_key),
     FOREIGN KEY (sales_rep_key) REFERENCES dim_sales_rep(sales_rep_key),
     FOREIGN KEY (territory_key) REFERENCES dim_territory(territory_key)
-);
+) PARTITION BY RANGE (date_key);
 
 -- ETL Log Table
 CREATE TABLE etl_log (
     log_id SERIAL PRIMARY KEY,
     etl_process VARCHAR(100) NOT NULL,
+    run_id VARCHAR(50),
+    stage VARCHAR(50),
     source_system VARCHAR(50),
     start_time TIMESTAMP NOT NULL,
     end_time TIMESTAMP,
     status VARCHAR(20),
     records_processed INTEGER,
     records_inserted INTEGER,
+    records_updated INTEGER,
+    bytes_processed BIGINT,
+    duration_seconds DECIMAL(12, 4),
+    rows_per_second DECIMAL(14, 1),
+    peak_rss_mb DECIMAL(10, 1),
+    retry_sleep_seconds DECIMAL(10, 3),
+    rate_limit_sleep_seconds DECIMAL(10, 3),
     error_message TEXT,
     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- ETL Watermark Table (incremental extraction high-water marks)
+CREATE TABLE etl_watermark (
+    source_system VARCHAR(50) NOT NULL,
+    entity VARCHAR(100) NOT NULL,
+    high_water_mark TIMESTAMP NOT NULL,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_system, entity)
+);
+
+-- Sales Summary Tables (maintained incrementally by the ETL after each fact load;
+-- a dimension key of 0 means the facts had no member)
+CREATE TABLE agg_sales_daily (
+    date_key INTEGER NOT NULL,
+    customer_key INTEGER NOT NULL,
+    product_key INTEGER NOT NULL,
+    territory_key INTEGER NOT NULL,
+    source_system VARCHAR(50) NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    total_amount DECIMAL(18, 2) NOT NULL,
+    won_count INTEGER NOT NULL,
+    won_amount DECIMAL(18, 2) NOT NULL,
+    PRIMARY KEY (date_key, customer_key, product_key, territory_key, source_system)
+);
+
+CREATE TABLE agg_sales_monthly (
+    month_key INTEGER NOT NULL,
+    source_system VARCHAR(50) NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    total_amount DECIMAL(18, 2) NOT NULL,
+    won_count INTEGER NOT NULL,
+    won_amount DECIMAL(18, 2) NOT NULL,
+    PRIMARY KEY (month_key, source_system)
+);
+
+CREATE TABLE agg_refresh (
+    summary_name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    rows_refreshed INTEGER
+);
+
+-- Load Generation (bumped after every successful load; API caches key on it)
+CREATE TABLE load_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO load_generation (id, generation) VALUES (1, 0);
+
 -- Populate Date Dimension
 INSERT INTO dim_date (date_key, full_date, day_of_week, day_name, day_of_month, month, month_name, quarter, year, is_weekend)
 SELECT 
@@ -119,10 +190,20 @@ SELECT
     EXTRACT(DOW FROM date_series) IN (0, 6)
 FROM generate_series('2023-01-01'::DATE, '2027-12-31'::DATE, '1 day'::INTERVAL) AS date_series;
 
--- Create indexes
-CREATE INDEX idx_fact_sales_date ON fact_sales(date_key);
-CREATE INDEX idx_fact_sales_customer ON fact_sales(customer_key);
-CREATE INDEX idx_fact_sales_product ON fact_sales(product_key);
+-- Create indexes (indexes on fact_sales are created on every partition)
+-- Keyset pages filter on one column and order by sales_key
+CREATE INDEX idx_fact_sales_customer ON fact_sales(customer_key, sales_key);
+CREATE INDEX idx_fact_sales_product ON fact_sales(product_key, sales_key);
+CREATE INDEX idx_fact_sales_source ON fact_sales(source_system, sales_key);
+-- Covers the summary refresh aggregate so it can be answered from the index of each touched partition
+CREATE INDEX idx_fact_sales_rollup ON fact_sales(date_key)
+    INCLUDE (customer_key, product_key, territory_key, source_system, amount, is_won);
+-- Block range index on the timestamp: tiny, and selective as incremental loads append in time order
+CREATE INDEX idx_fact_sales_transaction_brin ON fact_sales USING brin (transaction_date);
+CREATE INDEX idx_dim_customer_industry ON dim_customer(industry, customer_key);
+CREATE INDEX idx_dim_customer_state ON dim_customer(state, customer_key);
+CREATE INDEX idx_dim_customer_created ON dim_customer(created_date);
+CREATE INDEX idx_etl_log_stage ON etl_log(etl_process, stage, log_id);
 
 -- Success message
 SELECT 'Schema created successfully! Date dimension populated with ' || COUNT(*) || ' dates.' 
@@ -0,0 +1,167 @@
+-- Sales Analytics Data Warehouse Schema (SQLite)
+-- Same star schema as schema.sql, for local runs and performance testing.
+-- Tables are created only if missing; dim_date is filled by the pipeline as dates are loaded.
+
+PRAGMA journal_mode = WAL;
+
+-- Customer Dimension
+CREATE TABLE IF NOT EXISTS dim_customer (
+    customer_key INTEGER PRIMARY KEY,
+    customer_id TEXT UNIQUE NOT NULL,
+    customer_name TEXT NOT NULL,
+    customer_type TEXT,
+    industry TEXT,
+    email TEXT,
+    phone TEXT,
+    city TEXT,
+    state TEXT,
+    country TEXT,
+    created_date TEXT,
+    last_modified_date TEXT,
+    -- Hash of the attributes as last written, to skip unchanged members
+    row_hash INTEGER
+);
+
+-- Product Dimension
+CREATE TABLE IF NOT EXISTS dim_product (
+    product_key INTEGER PRIMARY KEY,
+    product_id TEXT UNIQUE NOT NULL,
+    product_name TEXT NOT NULL,
+    product_category TEXT,
+    unit_price REAL,
+    is_active INTEGER DEFAULT 1,
+    created_date TEXT,
+    last_modified_date TEXT,
+    row_hash INTEGER
+);
+
+-- Date Dimension
+CREATE TABLE IF NOT EXISTS dim_date (
+    date_key INTEGER PRIMARY KEY,
+    full_date TEXT UNIQUE NOT NULL,
+    day_of_week INTEGER,
+    day_name TEXT,
+    day_of_month INTEGER,
+    month INTEGER,
+    month_name TEXT,
+    quarter INTEGER,
+    year INTEGER,
+    is_weekend INTEGER
+);
+
+-- Territory Dimension
+CREATE TABLE IF NOT EXISTS dim_territory (
+    territory_key INTEGER PRIMARY KEY,
+    territory_name TEXT UNIQUE NOT NULL,
+    region TEXT,
+    is_active INTEGER DEFAULT 1
+);
+
+-- Sales Rep Dimension
+CREATE TABLE IF NOT EXISTS dim_sales_rep (
+    sales_rep_key INTEGER PRIMARY KEY,
+    sales_rep_name TEXT UNIQUE NOT NULL,
+    territory_key INTEGER,
+    region TEXT,
+    is_active INTEGER DEFAULT 1
+);
+
+-- Sales Fact Table
+CREATE TABLE IF NOT EXISTS fact_sales (
+    sales_key INTEGER PRIMARY KEY,
+    date_key INTEGER NOT NULL REFERENCES dim_date(date_key),
+    customer_key INTEGER REFERENCES dim_customer(customer_key),
+    product_key INTEGER REFERENCES dim_product(product_key),
+    sales_rep_key INTEGER REFERENCES dim_sales_rep(sales_rep_key),
+    territory_key INTEGER REFERENCES dim_territory(territory_key),
+    amount REAL NOT NULL,
+    quantity INTEGER DEFAULT 1,
+    is_won INTEGER DEFAULT 0,
+    is_closed INTEGER DEFAULT 0,
+    transaction_date TEXT NOT NULL,
+    source_system TEXT,
+    source_id TEXT,
+    -- Same natural key as the partitioned Postgres table, which must include date_key
+    UNIQUE (source_system, source_id, date_key)
+);
+
+-- ETL Log Table
+CREATE TABLE IF NOT EXISTS etl_log (
+    log_id INTEGER PRIMARY KEY,
+    etl_process TEXT NOT NULL,
+    run_id TEXT,
+    stage TEXT,
+    source_system TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    status TEXT,
+    records_processed INTEGER,
+    records_inserted INTEGER,
+    records_updated INTEGER,
+    bytes_processed INTEGER,
+    duration_seconds REAL,
+    rows_per_second REAL,
+    peak_rss_mb REAL,
+    retry_sleep_seconds REAL,
+    rate_limit_sleep_seconds REAL,
+    error_message TEXT,
+    created_date TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ETL Watermark Table (incremental extraction high-water marks)
+CREATE TABLE IF NOT EXISTS etl_watermark (
+    source_system TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    high_water_mark TEXT NOT NULL,
+    updated_date TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_system, entity)
+);
+
+-- Sales Summary Tables (maintained incrementally by the ETL after each fact load;
+-- a dimension key of 0 means the facts had no member)
+CREATE TABLE IF NOT EXISTS agg_sales_daily (
+    date_key INTEGER NOT NULL,
+    customer_key INTEGER NOT NULL,
+    product_key INTEGER NOT NULL,
+    territory_key INTEGER NOT NULL,
+    source_system TEXT NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    total_amount REAL NOT NULL,
+    won_count INTEGER NOT NULL,
+    won_amount REAL NOT NULL,
+    PRIMARY KEY (date_key, customer_key, product_key, territory_key, source_system)
+);
+
+CREATE TABLE IF NOT EXISTS agg_sales_monthly (
+    month_key INTEGER NOT NULL,
+    source_system TEXT NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    total_amount REAL NOT NULL,
+    won_count INTEGER NOT NULL,
+    won_amount REAL NOT NULL,
+    PRIMARY KEY (month_key, source_system)
+);
+
+CREATE TABLE IF NOT EXISTS agg_refresh (
+    summary_name TEXT PRIMARY KEY,
+    refreshed_at TEXT NOT NULL,
+    rows_refreshed INTEGER
+);
+
+-- Load Generation (bumped after every successful load; API caches key on it)
+CREATE TABLE IF NOT EXISTS load_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO load_generation (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Create indexes (secondary indexes are dropped and rebuilt around full bulk loads)
+CREATE INDEX IF NOT EXISTS idx_fact_sales_date ON fact_sales(date_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_customer ON fact_sales(customer_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_product ON fact_sales(product_key);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_source ON fact_sales(source_system, sales_key);
+CREATE INDEX IF NOT EXISTS idx_dim_customer_industry ON dim_customer(industry, customer_key);
+CREATE INDEX IF NOT EXISTS idx_dim_customer_state ON dim_customer(state, customer_key);
+CREATE INDEX IF NOT EXISTS idx_dim_customer_created ON dim_customer(created_date);
+CREATE INDEX IF NOT EXISTS idx_etl_log_stage ON etl_log(etl_process, stage, log_id);
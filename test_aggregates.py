@@ -0,0 +1,137 @@
+"""Sales summary tables: one row per key, and warehouses created before the keys are migrated"""
+import os
+import sys
+import sqlite3
+import tempfile
+from pathlib import Path
+from etl.aggregates import SalesSummaries
+from etl.run_lock import pipeline_lock
+from config.settings import config
+from models.sqlite_database import SQLiteDatabaseManager, SCHEMA_SQL
+import run_pipeline
+from test_partitioned_warehouse import throwaway_warehouse
+
+# agg_sales_daily and agg_sales_monthly as schema_sqlite.sql created them before they had primary keys
+UNKEYED_SUMMARIES = """
+    CREATE TABLE agg_sales_daily (date_key INTEGER NOT NULL, customer_key INTEGER, product_key INTEGER,
+        territory_key INTEGER, source_system TEXT, transaction_count INTEGER NOT NULL, total_amount REAL NOT NULL,
+        won_count INTEGER NOT NULL, won_amount REAL NOT NULL);
+    CREATE TABLE agg_sales_monthly (month_key INTEGER NOT NULL, source_system TEXT,
+        transaction_count INTEGER NOT NULL, total_amount REAL NOT NULL, won_count INTEGER NOT NULL,
+        won_amount REAL NOT NULL);
+    CREATE INDEX idx_agg_sales_daily_date ON agg_sales_daily(date_key);
+    CREATE INDEX idx_agg_sales_monthly_month ON agg_sales_monthly(month_key);
+"""
+
+def insert_facts(db):
+    db.execute("INSERT OR IGNORE INTO dim_date (date_key, full_date) VALUES (20240115, '2024-01-15')")
+    # Stripe charges have no product or territory
+    for source_id, amount in (('ch_1', 100), ('ch_2', 50)):
+        db.execute(
+            "INSERT INTO fact_sales (date_key, amount, is_won, transaction_date, source_system, source_id) "
+            "VALUES (20240115, %s, 1, '2024-01-15', 'Stripe', %s)",
+            (amount, source_id)
+        )
+
+def test_facts_without_members_summarised_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+        db.initialize_schema()
+        try:
+            insert_facts(db)
+            summaries = SalesSummaries(db)
+            summaries.rebuild()
+            summaries.refresh([20240115])
+            daily = db.execute_query("SELECT customer_key, product_key, territory_key, transaction_count, "
+                                     "total_amount FROM agg_sales_daily")
+            monthly = db.execute_query("SELECT month_key, source_system, total_amount FROM agg_sales_monthly")
+            try:
+                db.execute("INSERT INTO agg_sales_monthly VALUES (202401, 'Stripe', 1, 1, 1, 1)")
+                duplicate = True
+            except sqlite3.IntegrityError:
+                duplicate = False
+        finally:
+            db.close()
+    assert daily == [(0, 0, 0, 2, 150)]
+    assert monthly == [(202401, 'Stripe', 150)]
+    assert not duplicate
+
+def test_unkeyed_summaries_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'warehouse.db'
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA_SQL.read_text().split('-- Sales Summary Tables')[0] + UNKEYED_SUMMARIES)
+        # A row written twice by overlapping refreshes
+        for _ in range(2):
+            conn.execute("INSERT INTO agg_sales_daily VALUES (20240115, NULL, NULL, NULL, 'Stripe', 2, 150, 2, 150)")
+        conn.execute("INSERT INTO agg_sales_monthly VALUES (202401, 'Stripe', 2, 150, 2, 150)")
+        conn.commit()
+        conn.close()
+        db = SQLiteDatabaseManager(path)
+        try:
+            assert db.initialize_schema() is False
+            daily = db.execute_query("SELECT customer_key, total_amount FROM agg_sales_daily")
+            monthly = db.execute_query("SELECT month_key, total_amount FROM agg_sales_monthly")
+            keys = {table: db._primary_key(table) for table in ('agg_sales_daily', 'agg_sales_monthly')}
+            leftover = db.execute_query("SELECT name FROM sqlite_master WHERE name LIKE '%unkeyed%'")
+        finally:
+            db.close()
+    assert daily == [(0, 150)]
+    assert monthly == [(202401, 150)]
+    assert keys['agg_sales_monthly'] == ['month_key', 'source_system']
+    assert len(keys['agg_sales_daily']) == 5
+    assert leftover == []
+
+def test_unkeyed_summaries_migrated_postgres():
+    with throwaway_warehouse('etl_test_summaries') as db:
+        db.execute("DROP TABLE agg_sales_daily, agg_sales_monthly")
+        db.execute(UNKEYED_SUMMARIES.replace('REAL', 'DECIMAL(18, 2)').replace('TEXT', 'VARCHAR(50)'))
+        for _ in range(2):
+            db.execute("INSERT INTO agg_sales_daily VALUES (20240115, NULL, NULL, NULL, 'Stripe', 2, 150, 2, 150)")
+        assert db.initialize_schema() is False
+        daily = db.execute_query("SELECT customer_key, total_amount FROM agg_sales_daily")
+        keys = db.execute_query(
+            "SELECT conrelid::regclass::text, array_length(conkey, 1) FROM pg_constraint "
+            "WHERE contype = 'p' AND conrelid::regclass::text LIKE 'agg_sales_%' ORDER BY 1"
+        )
+        SalesSummaries(db).rebuild()
+    assert daily == [(0, 150)]
+    assert keys == [('agg_sales_daily', 5), ('agg_sales_monthly', 2)]
+
+def test_rebuild_waits_for_pipeline():
+    with tempfile.TemporaryDirectory() as tmp:
+        lock = Path(tmp) / 'pipeline.lock'
+        previous = os.environ.get('PIPELINE_LOCK_FILE')
+        os.environ['PIPELINE_LOCK_FILE'] = str(lock)
+        try:
+            with pipeline_lock(lock):
+                status = run_pipeline.main(['rebuild-summaries', '--backend', 'sqlite'])
+        finally:
+            if previous is None:
+                os.environ.pop('PIPELINE_LOCK_FILE')
+            else:
+                os.environ['PIPELINE_LOCK_FILE'] = previous
+            config.reload()
+    assert status == 1
+
+def main():
+    print("=" * 80)
+    print("SALES SUMMARY TEST")
+    print("=" * 80)
+
+    try:
+        test_facts_without_members_summarised_once()
+        print("✅ Summaries have one row per key, with 0 for facts without a member")
+        test_unkeyed_summaries_migrated()
+        print("✅ Summary tables created without keys are migrated and deduplicated")
+        test_unkeyed_summaries_migrated_postgres()
+        print("✅ Postgres summary tables created without keys are migrated")
+        test_rebuild_waits_for_pipeline()
+        print("✅ rebuild-summaries does not run while the pipeline holds its lock")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""API response cache: hits and misses, ETag revalidation, invalidation by load generation, TTL and LRU"""
+import sys
+import time
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from api.cache import ResponseCache
+
+class Generation:
+    """A load generation the test bumps, counting how often the cache reads it"""
+    def __init__(self):
+        self.value = 1
+        self.reads = 0
+        self.error = None
+
+    def __call__(self):
+        self.reads += 1
+        if self.error:
+            raise self.error
+        return self.value
+
+def make_client(generation, **kwargs):
+    """A client for an app whose /sales body changes on every computation, so a hit is visible"""
+    cache = ResponseCache(generation, **{'max_entries': 10, 'ttl': 60, 'generation_poll_interval': 0, **kwargs})
+    app = FastAPI()
+    computed = []
+
+    @app.get("/sales")
+    def sales(request: Request):
+        def compute():
+            computed.append(dict(request.query_params))
+            return {'computation': len(computed)}
+        return cache.respond(request, compute)
+
+    @app.get("/async-sales")
+    async def async_sales(request: Request):
+        async def compute():
+            computed.append(dict(request.query_params))
+            return {'computation': len(computed)}
+        return await cache.respond_async(request, compute)
+
+    return TestClient(app), cache, computed
+
+def test_hit_after_miss():
+    client, cache, computed = make_client(Generation())
+    first = client.get("/sales", params={'region': 'West'})
+    second = client.get("/sales", params={'region': 'West'})
+    other = client.get("/sales", params={'region': 'East'})
+    assert (first.headers['X-Cache'], second.headers['X-Cache'], other.headers['X-Cache']) == ('MISS', 'HIT', 'MISS')
+    assert first.json() == second.json() == {'computation': 1}
+    assert first.headers['ETag'] == second.headers['ETag'] != other.headers['ETag']
+    assert len(computed) == 2
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+def test_if_none_match_returns_304():
+    client, cache, computed = make_client(Generation())
+    etag = client.get("/sales").headers['ETag']
+    assert etag.startswith('W/"1-')
+    revalidated = client.get("/sales", headers={'If-None-Match': etag})
+    listed = client.get("/sales", headers={'If-None-Match': f'W/"0-stale", {etag}'})
+    wildcard = client.get("/sales", headers={'If-None-Match': '*'})
+    stale = client.get("/sales", headers={'If-None-Match': 'W/"0-stale"'})
+    assert revalidated.status_code == listed.status_code == wildcard.status_code == 304
+    assert revalidated.content == b'' and revalidated.headers['ETag'] == etag
+    assert stale.status_code == 200 and stale.json() == {'computation': 1}
+    assert len(computed) == 1
+
+def test_new_generation_invalidates():
+    generation = Generation()
+    client, cache, computed = make_client(generation)
+    before = client.get("/sales")
+    generation.value = 2
+    after = client.get("/sales", headers={'If-None-Match': before.headers['ETag']})
+    # The old ETag no longer matches, so the client gets the recomputed body
+    assert after.status_code == 200 and after.headers['X-Cache'] == 'MISS'
+    assert after.json() == {'computation': 2}
+    assert after.headers['ETag'].startswith('W/"2-')
+    assert cache.stats()['generation'] == 2 and cache.stats()['entries'] == 1
+
+def test_generation_polled_at_interval():
+    generation = Generation()
+    client, cache, computed = make_client(generation, generation_poll_interval=60)
+    client.get("/sales")
+    generation.value = 2
+    cached = client.get("/sales")
+    # Until the poll interval passes, the cache keeps serving the generation it last read
+    assert generation.reads == 1
+    assert cached.headers['X-Cache'] == 'HIT'
+    cache._generation_checked -= 60
+    assert client.get("/sales").headers['X-Cache'] == 'MISS'
+    assert generation.reads == 2
+
+def test_unreadable_generation_bypasses_cache():
+    generation = Generation()
+    client, cache, computed = make_client(generation)
+    client.get("/sales")
+    generation.error = RuntimeError("warehouse unreachable")
+    responses = [client.get("/sales") for _ in range(2)]
+    assert [r.headers['X-Cache'] for r in responses] == ['MISS', 'MISS']
+    assert [r.json()['computation'] for r in responses] == [2, 3]
+
+def test_ttl_and_lru_eviction():
+    client, cache, computed = make_client(Generation(), max_entries=2, ttl=0.05)
+    for region in ('West', 'East', 'North'):
+        client.get("/sales", params={'region': region})
+    # West was least recently used and is evicted past max_entries
+    assert cache.stats()['entries'] == 2
+    assert client.get("/sales", params={'region': 'North'}).headers['X-Cache'] == 'HIT'
+    assert client.get("/sales", params={'region': 'West'}).headers['X-Cache'] == 'MISS'
+    time.sleep(0.06)
+    assert client.get("/sales", params={'region': 'West'}).headers['X-Cache'] == 'MISS'
+
+def test_async_reader_and_compute():
+    generation = Generation()
+
+    async def read_generation():
+        return generation()
+
+    client, cache, computed = make_client(read_generation)
+    first = client.get("/async-sales")
+    second = client.get("/async-sales", headers={'If-None-Match': first.headers['ETag']})
+    generation.value = 2
+    third = client.get("/async-sales")
+    assert first.headers['X-Cache'] == 'MISS' and second.status_code == 304
+    assert third.headers['X-Cache'] == 'MISS' and third.json() == {'computation': 2}
+
+def main():
+    print("=" * 80)
+    print("API RESPONSE CACHE TEST")
+    print("=" * 80)
+
+    try:
+        test_hit_after_miss()
+        print("✅ Repeated requests are served from the cache, keyed by query")
+        test_if_none_match_returns_304()
+        print("✅ A matching If-None-Match gets 304 Not Modified")
+        test_new_generation_invalidates()
+        print("✅ A new load generation invalidates cached responses and their ETags")
+        test_generation_polled_at_interval()
+        print("✅ The load generation is read at most once per poll interval")
+        test_unreadable_generation_bypasses_cache()
+        print("✅ An unreadable load generation bypasses the cache")
+        test_ttl_and_lru_eviction()
+        print("✅ Entries expire after the TTL and are evicted least recently used first")
+        test_async_reader_and_compute()
+        print("✅ Async generation readers and computations are cached the same way")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Streamed API exports give their pooled connection back however the response ends (needs Postgres)"""
+import sys
+import asyncio
+from api import api_service
+from api.pagination import KeysetQuery
+from models.async_database import AsyncDatabaseManager
+
+ROWS = KeysetQuery("SELECT g AS n FROM generate_series(1, 100000) g", 'n')
+
+async def export_until_disconnect(manager: AsyncDatabaseManager, disconnect_after: int) -> dict:
+    """Serve an export, disconnecting the client after disconnect_after body messages (0: before the
+    body starts); returns the pool stats once the response has finished"""
+    api_service.async_db_manager = manager
+    response = await api_service._export(ROWS, ['n'], None, None, 'csv', 'rows')
+    sent = []
+    received = asyncio.Event()
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and message.get('more_body'):
+            sent.append(message)
+            if len(sent) >= disconnect_after:
+                received.set()
+            # A slow client, so the disconnect arrives mid-stream
+            await asyncio.sleep(0.01)
+
+    async def receive():
+        if disconnect_after:
+            await received.wait()
+        return {'type': 'http.disconnect'}
+
+    # A connection that never comes back would hang the next export; fail instead
+    await asyncio.wait_for(response({'type': 'http', 'method': 'GET', 'path': '/export'}, receive, send), 30)
+    return manager.pool_stats()
+
+async def run(disconnect_after: int) -> dict:
+    manager = AsyncDatabaseManager(min_size=1, max_size=2, acquire_timeout=1)
+    try:
+        # More aborted exports than the pool has connections
+        for _ in range(4):
+            stats = await export_until_disconnect(manager, disconnect_after)
+            assert stats['in_use'] == 0, f"{stats['in_use']} connections still checked out: {stats}"
+        return stats
+    finally:
+        await manager.close()
+
+def test_disconnect_after_header():
+    stats = asyncio.run(run(disconnect_after=1))
+    assert stats['acquires'] == 4
+
+def test_disconnect_before_body():
+    stats = asyncio.run(run(disconnect_after=0))
+    assert stats['acquires'] == 4
+
+def main():
+    print("=" * 80)
+    print("API EXPORT STREAM TEST")
+    print("=" * 80)
+
+    try:
+        test_disconnect_after_header()
+        print("✅ Exports cancelled after the header release their connection")
+        test_disconnect_before_body()
+        print("✅ Exports cancelled before the body release their connection")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Simple (SQLite) API: page and stream batch sizes come from config, and connections are closed on errors"""
+import sys
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from fastapi.testclient import TestClient
+import api_simple
+from api.pagination import KeysetQuery
+from config.settings import config
+from models.sqlite_database import SQLiteDatabaseManager
+
+class TrackingConnection(sqlite3.Connection):
+    opened = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = False
+        TrackingConnection.opened.append(self)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+@contextmanager
+def simple_api(**settings):
+    """The simple API over a SQLite warehouse of five customers, with config settings overridden"""
+    saved = {name: getattr(config, name) for name in ['SQLITE_PATH', *settings]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'warehouse.db'
+        db = SQLiteDatabaseManager(path)
+        db.initialize_schema()
+        db.execute("INSERT INTO dim_customer (customer_id, customer_name) VALUES "
+                   "('C1', 'Acme'), ('C2', 'Globex'), ('C3', 'Initech'), ('C4', 'Umbrella'), ('C5', 'Hooli')")
+        db.close()
+        for name, value in {'SQLITE_PATH': str(path), **settings}.items():
+            setattr(config, name, value)
+        try:
+            yield TestClient(api_simple.app)
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+
+def test_page_size_capped_by_config():
+    with simple_api(API_MAX_PAGE_SIZE=2) as client:
+        body = client.get("/api/v1/customers", params={'limit': 5}).json()
+    assert [c['customer_id'] for c in body['customers']] == ['C1', 'C2']
+    assert body['next_cursor'] == body['customers'][-1]['customer_key']
+
+def test_stream_batches_sized_by_config():
+    with simple_api(API_STREAM_BATCH_ROWS=2):
+        sql, params = KeysetQuery("SELECT customer_key FROM dim_customer", 'customer_key', 'qmark').sql()
+        batches = [len(rows) for rows in api_simple._batches(sql, params)]
+    assert batches == [2, 2, 1]
+
+def test_page_closes_connection_on_error():
+    real_get_db = api_simple.get_db
+    api_simple.get_db = lambda: sqlite3.connect(config.SQLITE_PATH, factory=TrackingConnection)
+    TrackingConnection.opened = []
+    try:
+        with simple_api():
+            broken = KeysetQuery("SELECT customer_key FROM no_such_table", 'customer_key', 'qmark')
+            try:
+                api_simple._page(broken, ['customer_key'], None, 10, 'customers')
+                raised = False
+            except sqlite3.OperationalError:
+                raised = True
+    finally:
+        api_simple.get_db = real_get_db
+    assert raised
+    assert len(TrackingConnection.opened) == 1 and TrackingConnection.opened[0].closed
+
+def main():
+    print("=" * 80)
+    print("SIMPLE API TEST")
+    print("=" * 80)
+
+    try:
+        test_page_size_capped_by_config()
+        print("✅ Pages are capped at API_MAX_PAGE_SIZE")
+        test_stream_batches_sized_by_config()
+        print("✅ Exports fetch API_STREAM_BATCH_ROWS rows at a time")
+        test_page_closes_connection_on_error()
+        print("✅ A failed page query closes its connection")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Async connector concurrency against a local stub API, which counts the requests it has in flight"""
+import sys
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from connectors.base_connector import BaseAPIConnector
+from connectors.async_base_connector import AsyncBaseAPIConnector
+from connectors.pagination import CursorPagination
+
+REQUESTS = 50
+LATENCY = 0.02
+TOTAL_CHARGES = 250
+
+class StubAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reset_peak(self):
+        with self.lock:
+            self.peak_in_flight = self.in_flight
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+        try:
+            time.sleep(LATENCY)
+            self._respond()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _respond(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/v1/charges':
+            start = int(query.get('starting_after', -1)) + 1
+            limit = int(query.get('limit', 100))
+            data = [{'id': i, 'amount': i * 100} for i in range(start, min(start + limit, TOTAL_CHARGES))]
+            body = {'data': data, 'has_more': start + limit < TOTAL_CHARGES}
+        else:
+            body = {'path': url.path, 'ok': True}
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class StubConnector(BaseAPIConnector):
+    def authenticate(self) -> bool:
+        return True
+
+class AsyncStubConnector(AsyncBaseAPIConnector):
+    async def authenticate(self) -> bool:
+        return True
+
+def start_stub_server():
+    server = StubAPIServer(('127.0.0.1', 0), StubAPIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def run_sync(base_url: str):
+    with StubConnector(base_url, rate_limit_calls=10000) as api:
+        for i in range(REQUESTS):
+            api.get(f"v1/items/{i}")
+
+async def run_async(base_url: str, concurrency: int = None):
+    async with AsyncStubConnector(base_url, rate_limit_calls=10000) as api:
+        results = await api.get_many([(f"v1/items/{i}", None) for i in range(REQUESTS)], concurrency=concurrency)
+    assert len(results) == REQUESTS
+    assert all(result['ok'] for result in results)
+
+async def collect_async_pages(base_url: str):
+    async with AsyncStubConnector(base_url, rate_limit_calls=10000) as api:
+        return [record async for record in api.iter_records('v1/charges', CursorPagination(limit=100))]
+
+def test_async_pagination():
+    server, base_url = start_stub_server()
+    try:
+        records = asyncio.run(collect_async_pages(base_url))
+    finally:
+        server.shutdown()
+    assert [r['id'] for r in records] == list(range(TOTAL_CHARGES))
+
+def test_async_concurrency():
+    # Overlap is asserted rather than elapsed time, which depends on how busy the machine is
+    server, base_url = start_stub_server()
+    try:
+        run_sync(base_url)
+        sync_peak = server.peak_in_flight
+        server.reset_peak()
+        asyncio.run(run_async(base_url, concurrency=10))
+        bounded_peak = server.peak_in_flight
+        server.reset_peak()
+        asyncio.run(run_async(base_url))
+        async_peak = server.peak_in_flight
+    finally:
+        server.shutdown()
+
+    print(f"\n   peak requests in flight: sync {sync_peak}, async {async_peak}, async (10) {bounded_peak}")
+    assert sync_peak == 1
+    assert 1 < bounded_peak <= 10
+    assert async_peak > 10
+
+def main():
+    print("=" * 80)
+    print("ASYNC CONNECTOR CONCURRENCY TEST")
+    print("=" * 80)
+
+    try:
+        test_async_pagination()
+        print("✅ Async cursor pagination")
+        test_async_concurrency()
+        print("✅ Async connector overlaps requests up to its concurrency limit")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
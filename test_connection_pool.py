@@ -0,0 +1,186 @@
+"""Connection pool behaviour with a fake psycopg2.connect: reuse order, idle eviction, health checks,
+exhaustion, and physical connections closed outside the pool lock"""
+import sys
+import time
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import extensions
+from models.connection_pool import ConnectionPool, PoolTimeout
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+class FakeConnection:
+    pool = None
+
+    def __init__(self, number: int):
+        self.number = number
+        self.closed = 0
+        self.broken = False
+        self.closed_under_lock = None
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        # Another thread can take the pool lock only if this close is not holding it
+        acquired = []
+
+        def probe():
+            got = self.pool._cond.acquire(timeout=0.5)
+            acquired.append(got)
+            if got:
+                self.pool._cond.release()
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        self.closed_under_lock = not acquired[0]
+        self.closed = 1
+
+@contextmanager
+def fake_pool(**kwargs):
+    """A pool whose connections are FakeConnections, numbered in order of creation"""
+    created = []
+
+    def connect(**params):
+        created.append(FakeConnection(len(created)))
+        return created[-1]
+
+    real_connect = psycopg2.connect
+    psycopg2.connect = connect
+    try:
+        pool = ConnectionPool({}, **kwargs)
+        FakeConnection.pool = pool
+        yield pool, created
+    finally:
+        psycopg2.connect = real_connect
+
+def test_lifo_reuse():
+    with fake_pool(min_size=0, max_size=3) as (pool, created):
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+        # The most recently returned connection is handed out first, so the rest can go idle
+        reused = pool.getconn()
+        stats = pool.stats()
+    assert reused is second
+    assert len(created) == 2
+    assert stats['checkouts'] == 3
+
+def test_idle_connections_evicted():
+    with fake_pool(min_size=1, max_size=3, idle_timeout=0.05) as (pool, created):
+        connections = [pool.getconn() for _ in range(3)]
+        for conn in connections:
+            pool.putconn(conn)
+        time.sleep(0.1)
+        pool.putconn(pool.getconn())
+        stats = pool.stats()
+    # Eviction stops at min_size, and evicted connections are closed outside the lock
+    closed = [conn for conn in created if conn.closed]
+    assert stats['evicted'] == 2 and stats['size'] == 1
+    assert len(closed) == 2
+    assert not any(conn.closed_under_lock for conn in closed)
+
+def test_unhealthy_connection_replaced():
+    with fake_pool(min_size=1, max_size=1) as (pool, created):
+        created[0].broken = True
+        conn = pool.getconn()
+        stats = pool.stats()
+    assert conn is created[1]
+    assert created[0].closed and not created[0].closed_under_lock
+    assert stats['health_check_failures'] == 1
+    assert stats['size'] == 1
+
+def test_connection_dead_since_checkin_replaced():
+    with fake_pool(min_size=1, max_size=1) as (pool, created):
+        pool.putconn(pool.getconn())
+        # The server drops the connection a moment after it was returned
+        created[0].broken = True
+        conn = pool.getconn()
+        stats = pool.stats()
+    assert conn is created[1]
+    assert stats['health_check_failures'] == 1
+
+def test_recently_used_connection_not_pinged():
+    with fake_pool(min_size=1, max_size=1, health_check_interval=60) as (pool, created):
+        pool.putconn(pool.getconn())
+        created[0].broken = True
+        # Within the interval the ping is skipped, as configured, so the dead connection is handed out
+        conn = pool.getconn()
+        stats = pool.stats()
+    assert conn is created[0]
+    assert stats['health_check_failures'] == 0
+
+def test_timeout_when_exhausted():
+    with fake_pool(min_size=0, max_size=1) as (pool, created):
+        held = pool.getconn()
+        start = time.monotonic()
+        try:
+            pool.getconn(timeout=0.05)
+            timed_out = False
+        except PoolTimeout:
+            timed_out = True
+        waited = time.monotonic() - start
+        pool.putconn(held)
+        stats = pool.stats()
+    assert timed_out
+    assert waited >= 0.05
+    assert stats['timeouts'] == 1 and stats['in_use'] == 0
+
+def test_discard_and_closeall_close_outside_lock():
+    with fake_pool(min_size=0, max_size=2) as (pool, created):
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first, discard=True)
+        pool.putconn(second)
+        pool.closeall()
+        stats = pool.stats()
+    assert all(conn.closed and not conn.closed_under_lock for conn in created)
+    assert stats['size'] == 0 and stats['connections_closed'] == 2
+
+def main():
+    print("=" * 80)
+    print("CONNECTION POOL TEST")
+    print("=" * 80)
+
+    try:
+        test_lifo_reuse()
+        print("✅ The most recently returned connection is reused first")
+        test_idle_connections_evicted()
+        print("✅ Idle connections beyond min_size are evicted")
+        test_unhealthy_connection_replaced()
+        print("✅ A connection failing its health check is replaced")
+        test_connection_dead_since_checkin_replaced()
+        print("✅ Every checkout is validated, however recently the connection was used")
+        test_recently_used_connection_not_pinged()
+        print("✅ A health check interval skips the ping for recently used connections")
+        test_timeout_when_exhausted()
+        print("✅ Checkout times out when the pool is exhausted")
+        test_discard_and_closeall_close_outside_lock()
+        print("✅ Connections are closed outside the pool lock")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
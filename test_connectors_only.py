@@ -1,24 +1,41 @@
 """Test just the connectors without database"""
-from connectors.salesforce_connector import MockSalesforceConnector
-from connectors.stripe_connector import MockStripeConnector
-from connectors.google_sheets_connector import MockGoogleSheetsConnector
+import sys
+from config.settings import load_env
 
-print("Testing Salesforce...")
-with MockSalesforceConnector() as sf:
-    accounts = sf.get_accounts()
-    print(f"✅ Got {len(accounts)} accounts")
-    print(accounts.head())
+def fetch_samples() -> dict:
+    # Connectors and pandas are imported only once the environment is loaded
+    from connectors.salesforce_connector import MockSalesforceConnector
+    from connectors.stripe_connector import MockStripeConnector
+    from connectors.google_sheets_connector import MockGoogleSheetsConnector
 
-print("\nTesting Stripe...")
-with MockStripeConnector() as stripe:
-    charges = stripe.get_charges()
-    print(f"✅ Got {len(charges)} charges")
-    print(charges.head())
+    with MockSalesforceConnector() as sf:
+        accounts = sf.get_accounts()
+    with MockStripeConnector() as stripe:
+        charges = stripe.get_charges()
+    with MockGoogleSheetsConnector() as gs:
+        products = gs.get_products()
+    return {'Salesforce accounts': accounts, 'Stripe charges': charges, 'Google Sheets products': products}
 
-print("\nTesting Google Sheets...")
-with MockGoogleSheetsConnector() as gs:
-    products = gs.get_products()
-    print(f"✅ Got {len(products)} products")
-    print(products.head())
+def test_mock_connectors():
+    samples = fetch_samples()
+    assert all(len(frame) for frame in samples.values())
 
-print("\n🎉 All connectors working!")
+def main():
+    load_env()
+    print("=" * 80)
+    print("CONNECTOR TEST")
+    print("=" * 80)
+
+    try:
+        for name, frame in fetch_samples().items():
+            assert len(frame), f"No {name}"
+            print(f"✅ Got {len(frame)} {name}")
+            print(frame.head())
+        print("\n🎉 All connectors working!")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Row-hash change detection: only new or changed dimension members are written"""
+import os
+import sys
+import pickle
+import sqlite3
+import tempfile
+from pathlib import Path
+import pandas as pd
+from connectors.salesforce_connector import MockSalesforceConnector
+from connectors.synthetic import SyntheticDataset
+from etl.dimension_cache import DimensionKeyCache
+from models.sqlite_database import SQLiteDatabaseManager, SCHEMA_SQL
+
+def accounts():
+    return MockSalesforceConnector(synthetic=False).get_accounts()
+
+def test_unchanged_members_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+        db.initialize_schema()
+        try:
+            keys = DimensionKeyCache(db)
+            first = keys.upsert_members('customer', accounts())
+            again = keys.upsert_members('customer', accounts())
+
+            changed = accounts()
+            changed.loc[1, 'customer_name'] = 'TechStart Holdings'
+            update = keys.upsert_members('customer', changed)
+            name = db.execute_query("SELECT customer_name FROM dim_customer WHERE customer_id = 'SF002'")[0][0]
+        finally:
+            db.close()
+    assert first['inserted'] == 3
+    assert again == {'staged': 0, 'inserted': 0, 'updated': 0, 'conflicted': 0}
+    assert (update['staged'], update['inserted'], update['updated']) == (1, 0, 1)
+    assert name == 'TechStart Holdings'
+
+def test_hashes_persist():
+    products = next(SyntheticDataset(1000).iter_products())
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+        db.initialize_schema()
+        try:
+            cache = Path(tmp) / 'dimension_keys'
+            keys = DimensionKeyCache(db, cache)
+            keys.upsert_members('product', products)
+            keys.save()
+            # A later process starts from the saved hashes
+            result = DimensionKeyCache(db, cache).upsert_members('product', products)
+            # A member rewritten elsewhere changes the fingerprint, so the saved hashes are not trusted
+            db.execute("UPDATE dim_product SET row_hash = NULL WHERE product_id = 'PROD0'")
+            rewritten = DimensionKeyCache(db, cache).upsert_members('product', products)
+        finally:
+            db.close()
+    assert result['staged'] == 0
+    assert rewritten['staged'] == rewritten['updated'] == 1
+
+def test_reassigned_territories_invalidate_saved_keys():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+        db.initialize_schema()
+        try:
+            cache = Path(tmp) / 'dimension_keys'
+            keys = DimensionKeyCache(db, cache)
+            keys.upsert_members('territory', pd.DataFrame({'territory_name': ['West', 'East']}))
+            territories = keys.key_map('territory')
+            keys.upsert_members('sales_rep', pd.DataFrame({
+                'sales_rep_name': ['Ann', 'Bob'], 'territory_key': [territories['West'], territories['East']]
+            }))
+            keys.save()
+            # Two reps trade territories: the count, keys and territory total are all unchanged
+            db.execute(f"UPDATE dim_sales_rep SET territory_key = CASE sales_rep_name "
+                       f"WHEN 'Ann' THEN {territories['East']} ELSE {territories['West']} END")
+            reloaded = DimensionKeyCache(db, cache).key_maps()['sales_rep_territory']
+            reps = dict(db.execute_query("SELECT sales_rep_key, territory_key FROM dim_sales_rep"))
+        finally:
+            db.close()
+    assert reloaded.to_dict() == reps
+
+def test_tampered_cache_file_ignored():
+    products = next(SyntheticDataset(1000).iter_products())
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+        db.initialize_schema()
+        try:
+            cache = Path(tmp) / 'dimension_keys'
+            keys = DimensionKeyCache(db, cache)
+            keys.upsert_members('product', products)
+            keys.save()
+            # Cache files are data only; a pickle payload in their place is not executed
+            (cache / 'product.parquet').write_bytes(pickle.dumps(os.system))
+            result = DimensionKeyCache(db, cache).upsert_members('product', products)
+        finally:
+            db.close()
+    # The product keys are read from the warehouse instead, which already holds every member
+    assert result['staged'] == 0
+
+def test_existing_warehouse_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'warehouse.db'
+        # The schema as it was before row hashes
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA_SQL.read_text().replace(',\n    row_hash INTEGER', ''))
+        conn.close()
+        db = SQLiteDatabaseManager(path)
+        try:
+            db.initialize_schema()
+            columns = {table: {row[1] for row in db.execute_query(f"PRAGMA table_info({table})")}
+                       for table in ('dim_customer', 'dim_product')}
+        finally:
+            db.close()
+    assert all('row_hash' in names for names in columns.values())
+
+def main():
+    print("=" * 80)
+    print("DIMENSION CHANGE DETECTION TEST")
+    print("=" * 80)
+
+    try:
+        test_unchanged_members_skipped()
+        print("✅ Unchanged members are skipped and changed ones updated")
+        test_hashes_persist()
+        print("✅ Saved hashes are reused until the dimension changes")
+        test_reassigned_territories_invalidate_saved_keys()
+        print("✅ Saved sales reps are reloaded when their territories change")
+        test_tampered_cache_file_ignored()
+        print("✅ An unreadable cache file is ignored")
+        test_existing_warehouse_migrated()
+        print("✅ Existing warehouses gain the row_hash column")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
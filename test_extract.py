@@ -0,0 +1,109 @@
+"""Concurrent extraction: per-source deadlines, cancellation, and connectors kept open for running tasks"""
+import sys
+import time
+import threading
+from etl.extract import ConcurrentExtractor, ConnectorSessions, cancellable
+
+class FakeConnector:
+    def __init__(self):
+        self.closed = False
+        self.used_after_close = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+    def iter_rows(self, chunks: int, delay: float, produced: list):
+        for n in range(chunks):
+            time.sleep(delay)
+            self.used_after_close |= self.closed
+            produced.append(n)
+            yield n
+
+def plan_for(connectors: dict, produced: dict, slow_chunks: int = 40):
+    def factory(source):
+        def create():
+            connectors[source] = FakeConnector()
+            return connectors[source]
+        return create
+
+    def extract(source, chunks, delay):
+        produced[source] = []
+        return lambda connector: list(cancellable(connector.iter_rows(chunks, delay, produced[source])))
+
+    return {
+        'Fast': (factory('Fast'), {'rows': extract('Fast', 3, 0.01)}),
+        'Slow': (factory('Slow'), {'rows': extract('Slow', slow_chunks, 0.05)}),
+    }
+
+def test_source_deadlines():
+    connectors, produced = {}, {}
+    extractor = ConcurrentExtractor(max_workers=4, timeout=5, timeouts={'Slow': 0.3})
+    start = time.perf_counter()
+    result = extractor.run(plan_for(connectors, produced))
+    elapsed = time.perf_counter() - start
+    # The fast source is not held to the slow one's deadline, nor the slow one to the default
+    assert result['data'][('Fast', 'rows')] == [0, 1, 2]
+    assert 'Slow' in result['errors'] and 'Fast' not in result['errors']
+    assert elapsed < 2, f"run took {elapsed:.2f}s"
+
+    # The timed-out task stops at its next chunk, and only then is its connector closed
+    deadline = time.monotonic() + 5
+    while not connectors['Slow'].closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert connectors['Slow'].closed
+    assert not connectors['Slow'].used_after_close
+    assert len(produced['Slow']) < 40
+    stopped_at = len(produced['Slow'])
+    time.sleep(0.2)
+    assert len(produced['Slow']) == stopped_at
+
+def test_sessions_kept_until_tasks_finish():
+    connectors, produced = {}, {}
+    sessions = ConnectorSessions()
+    extractor = ConcurrentExtractor(max_workers=4, timeout=5, timeouts={'Slow': 0.2}, sessions=sessions)
+    running = threading.active_count()
+    result = extractor.run(plan_for(connectors, produced))
+    slow = connectors['Slow']
+    deadline = time.monotonic() + 5
+    while threading.active_count() > running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 'Slow' in result['errors']
+    assert slow.closed and not slow.used_after_close
+    # The fast source's session stays open for the next run
+    assert not connectors['Fast'].closed
+    sessions.close()
+    assert connectors['Fast'].closed
+
+def test_waiting_tasks_not_started():
+    connectors, produced = {}, {}
+    plan = plan_for(connectors, produced)
+    started = []
+    plan['Slow'][1]['more'] = lambda connector: started.append(True)
+    # One task per source at a time, so 'more' is still waiting for its turn when the deadline passes
+    extractor = ConcurrentExtractor(max_workers=4, source_concurrency=1, timeout=5, timeouts={'Slow': 0.2})
+    extractor.run(plan)
+    time.sleep(0.3)
+    assert not started
+
+def main():
+    print("=" * 80)
+    print("CONCURRENT EXTRACTION TEST")
+    print("=" * 80)
+
+    try:
+        test_source_deadlines()
+        print("✅ Each source has its own deadline and a timed-out task stops")
+        test_sessions_kept_until_tasks_finish()
+        print("✅ Connectors stay open until timed-out tasks have returned")
+        test_waiting_tasks_not_started()
+        print("✅ Waiting tasks of a timed-out source never start")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""HTTP response cache: conditional requests, 304 reuse, per-endpoint TTLs and LRU eviction"""
+import sys
+import json
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from connectors.base_connector import BaseAPIConnector
+from connectors.async_base_connector import AsyncBaseAPIConnector
+from connectors.http_cache import HTTPCache
+
+PRODUCTS = [{'product_id': 'PROD001', 'product_name': 'Enterprise License'}]
+ETAG = '"products-v1"'
+
+class StubSheetsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.hits = {}
+
+class StubSheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.hits[path] = self.server.hits.get(path, 0) + 1
+        if path == '/values/Products' and self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = json.dumps({'values': PRODUCTS, 'path': path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if path == '/values/Products':
+            self.send_header('ETag', ETAG)
+        self.end_headers()
+        self.wfile.write(payload)
+
+class StubConnector(BaseAPIConnector):
+    def authenticate(self) -> bool:
+        return True
+
+class AsyncStubConnector(AsyncBaseAPIConnector):
+    async def authenticate(self) -> bool:
+        return True
+
+def start_stub_server():
+    server = StubSheetsServer(('127.0.0.1', 0), StubSheetsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def test_conditional_requests():
+    server, base_url = start_stub_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HTTPCache(Path(tmp) / 'http_cache.sqlite', default_ttl=0, ttls={})
+            with StubConnector(base_url, rate_limit_calls=10000, cache=cache) as api:
+                first = api.get('values/Products')
+                second = api.get('values/Products')
+                # No validators and no TTL: never cached
+                api.get('values/Orders')
+                api.get('values/Orders')
+    finally:
+        server.shutdown()
+    assert first == second == {'values': PRODUCTS, 'path': '/values/Products'}
+    assert api.stats['requests'] == 4
+    assert api.stats['not_modified'] == 1
+    assert server.hits == {'/values/Products': 2, '/values/Orders': 2}
+
+def test_endpoint_ttl():
+    server, base_url = start_stub_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HTTPCache(Path(tmp) / 'http_cache.sqlite', default_ttl=0, ttls={})
+            with StubConnector(base_url, rate_limit_calls=10000, cache=cache,
+                               cache_ttls={'values/Territories': 3600}) as api:
+                bodies = [api.get('values/Territories') for _ in range(3)]
+    finally:
+        server.shutdown()
+    assert bodies[0] == bodies[2]
+    assert server.hits == {'/values/Territories': 1}
+    assert api.stats['cache_hits'] == 2
+
+async def fetch_async(base_url: str, cache: HTTPCache) -> dict:
+    async with AsyncStubConnector(base_url, rate_limit_calls=10000, cache=cache) as api:
+        for _ in range(3):
+            await api.get('values/Products')
+        return api.stats
+
+def test_async_conditional_requests():
+    server, base_url = start_stub_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            stats = asyncio.run(fetch_async(base_url, HTTPCache(Path(tmp) / 'http_cache.sqlite', default_ttl=0, ttls={})))
+    finally:
+        server.shutdown()
+    assert stats['requests'] == 3
+    assert stats['not_modified'] == 2
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HTTPCache(Path(tmp) / 'http_cache.sqlite', max_bytes=250, default_ttl=60, ttls={})
+        for name in ('a', 'b', 'c'):
+            cache.put(f"http://api/{name}", None, {}, b'x' * 100, ttl=60)
+            if name == 'b':
+                cache.get('http://api/a')
+        assert cache.get('http://api/a') is not None
+        assert cache.get('http://api/b') is None
+        assert cache.get('http://api/c') is not None
+
+def test_credentials_separate_entries():
+    server, base_url = start_stub_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HTTPCache(Path(tmp) / 'http_cache.sqlite', default_ttl=3600, ttls={})
+            for token in ('tenant-a', 'tenant-a', 'tenant-b'):
+                with StubConnector(base_url, rate_limit_calls=10000, cache=cache) as api:
+                    api.session.headers['Authorization'] = f"Bearer {token}"
+                    api.get('values/Territories')
+    finally:
+        server.shutdown()
+    # The second tenant's request is not answered from the first tenant's entry
+    assert server.hits == {'/values/Territories': 2}
+
+def test_running_size_total():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HTTPCache(Path(tmp) / 'http_cache.sqlite', max_bytes=1000, default_ttl=60, ttls={})
+        cache.put('http://api/a', None, {}, b'x' * 100, ttl=60)
+        cache.put('http://api/a', None, {}, b'x' * 40, ttl=60)
+        cache.put('http://api/b', None, {}, b'x' * 10, ttl=60, request_headers={'Authorization': 'Bearer b'})
+        conn = cache._connection()
+        total = conn.execute("SELECT total FROM http_cache_size").fetchone()[0]
+        cache.clear()
+        cleared = conn.execute("SELECT total FROM http_cache_size").fetchone()[0]
+    assert total == 50
+    assert cleared == 0
+
+def main():
+    print("=" * 80)
+    print("HTTP CACHE TEST")
+    print("=" * 80)
+
+    try:
+        test_conditional_requests()
+        print("✅ ETag revalidation reuses the cached body on 304")
+        test_endpoint_ttl()
+        print("✅ Endpoint TTL serves cached bodies without requests")
+        test_async_conditional_requests()
+        print("✅ Async connector revalidates through the same cache")
+        test_lru_eviction()
+        print("✅ Least recently used entries are evicted over the size bound")
+        test_credentials_separate_entries()
+        print("✅ Requests with different credentials do not share entries")
+        test_running_size_total()
+        print("✅ The cache's total size is kept as entries are written and removed")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
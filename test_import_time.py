@@ -0,0 +1,92 @@
+"""Import-time budget for the command line: --help and health must start without the pipeline's heavy
+dependencies. Measured with python -X importtime, excluding what the interpreter imports at startup."""
+import sys
+import subprocess
+from pathlib import Path
+
+CLI = Path(__file__).with_name('run_pipeline.py')
+
+# Modules that cost hundreds of milliseconds together; only pipeline subcommands may load them
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'requests', 'httpx', 'schedule', 'asyncpg')
+
+# Milliseconds of imports beyond interpreter startup
+BUDGETS_MS = {
+    ('--help',): 100,
+    ('health', '--backend', 'sqlite'): 150
+}
+
+def import_times(*args) -> dict:
+    """Module -> (cumulative import microseconds, imported directly rather than by another module)"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *args], capture_output=True, text=True,
+                          cwd=CLI.parent, timeout=60)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = (int(cumulative), not name.startswith('   '))
+    return times
+
+def cli_import_ms(*args) -> tuple:
+    """Milliseconds the CLI spends importing beyond interpreter startup, and every module it imports"""
+    startup = import_times('-c', 'pass')
+    times = import_times(str(CLI), *args)
+    elapsed = sum(us for name, (us, top) in times.items() if top and name not in startup) / 1000
+    return elapsed, set(times)
+
+def check_budget(args: tuple, budget_ms: float):
+    elapsed, modules = cli_import_ms(*args)
+    heavy = sorted(set(HEAVY_MODULES) & modules)
+    assert not heavy, f"run_pipeline.py {' '.join(args)} imports {', '.join(heavy)}"
+    # Best of three, so a cold disk cache or a busy machine does not fail the budget
+    elapsed = min([elapsed] + [cli_import_ms(*args)[0] for _ in range(2)])
+    assert elapsed <= budget_ms, f"run_pipeline.py {' '.join(args)} spent {elapsed:.0f} ms importing (budget {budget_ms} ms)"
+    return elapsed
+
+def test_help_import_budget():
+    check_budget(('--help',), BUDGETS_MS[('--help',)])
+
+def test_health_import_budget():
+    args = ('health', '--backend', 'sqlite')
+    check_budget(args, BUDGETS_MS[args])
+
+def test_run_is_default_command():
+    import run_pipeline
+    calls = []
+    real_run = run_pipeline.cmd_run
+    run_pipeline.cmd_run = lambda args: calls.append((args.command, args.daemon, args.backend)) or 0
+    try:
+        # Invocations from before subcommands existed still run the pipeline
+        assert run_pipeline.main([]) == 0
+        assert run_pipeline.main(['--daemon', '--backend', 'sqlite']) == 0
+    finally:
+        run_pipeline.cmd_run = real_run
+    assert calls == [('run', False, None), ('run', True, 'sqlite')]
+
+def test_simple_api_skips_dataframes():
+    # The simple API serves rows straight from sqlite3; it has no use for the dataframe stack
+    modules = set(import_times('-c', 'import api_simple'))
+    heavy = sorted({'pandas', 'numpy', 'pyarrow'} & modules)
+    assert not heavy, f"api_simple imports {', '.join(heavy)}"
+
+def main():
+    failed = False
+    for args, budget in BUDGETS_MS.items():
+        try:
+            elapsed = check_budget(args, budget)
+            print(f"✅ run_pipeline.py {' '.join(args)}: {elapsed:.1f} ms of imports (budget {budget} ms)")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {e}")
+    try:
+        test_run_is_default_command()
+        print("✅ run_pipeline.py without a command runs the pipeline")
+        test_simple_api_skips_dataframes()
+        print("✅ api_simple imports without pandas, numpy or pyarrow")
+    except AssertionError as e:
+        failed = True
+        print(f"❌ {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
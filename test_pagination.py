@@ -0,0 +1,158 @@
+"""Pagination strategies driven through the connectors against a local stub API that records each request"""
+import sys
+import json
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+from connectors.base_connector import BaseAPIConnector
+from connectors.async_base_connector import AsyncBaseAPIConnector
+from connectors.pagination import CursorPagination, OffsetPagination, SheetRangePagination, NextUrlPagination
+
+TOTAL_RECORDS = 25
+QUERY_PATH = '/services/data/v58.0/query'
+
+class RecordingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.requests = []
+
+class PagingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.requests.append((path, query))
+
+        if path == '/api/v1/charges':
+            start = int(query.get('starting_after', -1)) + 1
+            limit = int(query['limit'])
+            data = [{'id': i} for i in range(start, min(start + limit, TOTAL_RECORDS))]
+            body = {'data': data, 'has_more': start + limit < TOTAL_RECORDS}
+        elif path == '/api/v1/invoices':
+            offset, limit = int(query['offset']), int(query['limit'])
+            body = [{'id': i} for i in range(offset, min(offset + limit, TOTAL_RECORDS))]
+        elif path.startswith('/api/v4/values/'):
+            # Rows 2..TOTAL_RECORDS+1 hold data, one value per row
+            first, last = (int(cell[1:]) for cell in path.split('!')[1].split(':'))
+            rows = [[str(row)] for row in range(first, min(last, TOTAL_RECORDS + 1) + 1)]
+            body = {'range': f"'Sheet1'!A{first}:C{last}", 'values': rows}
+        elif path == QUERY_PATH:
+            body = {'records': [{'Id': '001'}], 'done': False, 'nextRecordsUrl': f"{QUERY_PATH}/01g-2"}
+        elif path == f"{QUERY_PATH}/01g-2":
+            body = {'records': [{'Id': '002'}], 'done': False, 'nextRecordsUrl': f"{QUERY_PATH}/01g-3"}
+        elif path == f"{QUERY_PATH}/01g-3":
+            body = {'records': [{'Id': '003'}], 'done': True}
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class StubConnector(BaseAPIConnector):
+    def authenticate(self) -> bool:
+        return True
+
+class AsyncStubConnector(AsyncBaseAPIConnector):
+    async def authenticate(self) -> bool:
+        return True
+
+def collect(base_path: str, endpoint: str, strategy, params=None):
+    """Records from every page, and the (path, query) of each request the server saw"""
+    server = RecordingServer(('127.0.0.1', 0), PagingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with StubConnector(f"http://127.0.0.1:{server.server_port}{base_path}", rate_limit_calls=10000) as api:
+            records = list(api.iter_records(endpoint, strategy, params=params))
+    finally:
+        server.shutdown()
+    return records, server.requests
+
+def test_cursor_pagination():
+    records, requests = collect('/api', 'v1/charges', CursorPagination(limit=10), params={'status': 'paid'})
+    assert [r['id'] for r in records] == list(range(TOTAL_RECORDS))
+    assert [query.get('starting_after') for _, query in requests] == [None, '9', '19']
+    # Caller params ride along on every page
+    assert all(query['status'] == 'paid' and query['limit'] == '10' for _, query in requests)
+
+def test_offset_pagination():
+    records, requests = collect('/api', 'v1/invoices', OffsetPagination(limit=10, records_key=None))
+    assert [r['id'] for r in records] == list(range(TOTAL_RECORDS))
+    # The short third page ends the walk without a fourth request
+    assert [query['offset'] for _, query in requests] == ['0', '10', '20']
+
+def test_offset_pagination_exact_multiple():
+    records, requests = collect('/api', 'v1/invoices', OffsetPagination(limit=5, records_key=None, start=15))
+    assert [r['id'] for r in records] == list(range(15, TOTAL_RECORDS))
+    # A full last page costs one more, empty request
+    assert [query['offset'] for _, query in requests] == ['15', '20', '25']
+
+def test_sheet_range_pagination():
+    records, requests = collect('/api', 'v4/values', SheetRangePagination('Sheet1', last_column='C', page_size=10))
+    assert [int(row[0]) for row in records] == list(range(2, TOTAL_RECORDS + 2))
+    assert [path for path, _ in requests] == [
+        '/api/v4/values/Sheet1!A2:C11', '/api/v4/values/Sheet1!A12:C21', '/api/v4/values/Sheet1!A22:C31',
+    ]
+
+def test_next_url_resolved_against_origin():
+    # base_url carries the API path, as the Salesforce connector's does; nextRecordsUrl repeats it
+    records, requests = collect('/services/data/v58.0', 'query', NextUrlPagination(), params={'q': 'SELECT Id'})
+    assert [r['Id'] for r in records] == ['001', '002', '003']
+    assert [path for path, _ in requests] == [QUERY_PATH, f"{QUERY_PATH}/01g-2", f"{QUERY_PATH}/01g-3"]
+    # The query string belongs to the first request only; the cursor URL carries the rest
+    assert [query for _, query in requests] == [{'q': 'SELECT Id'}, {}, {}]
+
+async def collect_async(base_url: str, endpoint: str, strategy):
+    async with AsyncStubConnector(base_url, rate_limit_calls=10000) as api:
+        return [record async for record in api.iter_records(endpoint, strategy)]
+
+def test_async_next_url_resolved_against_origin():
+    server = RecordingServer(('127.0.0.1', 0), PagingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}/services/data/v58.0"
+        records = asyncio.run(collect_async(base_url, 'query', NextUrlPagination()))
+    finally:
+        server.shutdown()
+    assert [r['Id'] for r in records] == ['001', '002', '003']
+    assert [path for path, _ in server.requests] == [QUERY_PATH, f"{QUERY_PATH}/01g-2", f"{QUERY_PATH}/01g-3"]
+
+def main():
+    print("=" * 80)
+    print("PAGINATION TEST")
+    print("=" * 80)
+
+    try:
+        test_cursor_pagination()
+        print("✅ Cursor pagination follows the last id while has_more is set")
+        test_offset_pagination()
+        print("✅ Offset pagination stops at a short page")
+        test_offset_pagination_exact_multiple()
+        print("✅ Offset pagination stops at an empty page")
+        test_sheet_range_pagination()
+        print("✅ Sheet range pagination walks A1 ranges")
+        test_next_url_resolved_against_origin()
+        print("✅ nextRecordsUrl is resolved against the origin")
+        test_async_next_url_resolved_against_origin()
+        print("✅ Async connector resolves nextRecordsUrl against the origin")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
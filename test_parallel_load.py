@@ -0,0 +1,163 @@
+"""Parallel fact loading: month partitions built in worker processes and swapped in together
+
+Runs against the configured Postgres in a throwaway schema that is dropped afterwards.
+"""
+import sys
+import tempfile
+import pandas as pd
+from etl.parallel_load import ParallelFactLoader, ShardLoadError
+from etl.staging import StagingArea
+from test_partitioned_warehouse import throwaway_warehouse, insert_fact
+
+TEST_SCHEMA = 'etl_test_parallel_load'
+KEY_COLUMNS = ['date_key', 'source_system', 'source_id']
+MATCH_COLUMNS = ['source_system', 'source_id']
+
+# The first new fact any worker inserts fails; later ones take the usual sales_key
+FAIL_FIRST_INSERT = """
+    CREATE SEQUENCE shard_faults;
+    CREATE FUNCTION fail_first_insert() RETURNS bigint AS $$
+    BEGIN
+        IF nextval('shard_faults') = 1 THEN
+            RAISE EXCEPTION 'injected shard failure';
+        END IF;
+        RETURN nextval('fact_sales_sales_key_seq');
+    END $$ LANGUAGE plpgsql;
+    ALTER TABLE fact_sales ALTER COLUMN sales_key SET DEFAULT fail_first_insert();
+"""
+
+def facts(*rows) -> pd.DataFrame:
+    """(source_id, date_key, amount) rows as loaded by the pipeline"""
+    return pd.DataFrame([
+        {'date_key': date_key, 'customer_key': 1, 'amount': amount,
+         'transaction_date': pd.Timestamp(str(date_key)), 'source_system': 'Salesforce', 'source_id': source_id}
+        for source_id, date_key, amount in rows
+    ])
+
+def load(db, batch: pd.DataFrame, retries: int = 0) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        staging = StagingArea(tmp)
+        loader = ParallelFactLoader(db, staging, staging.new_run(), 'fact_sales', KEY_COLUMNS, MATCH_COLUMNS,
+                                    workers=2, retries=retries)
+        loader.add(batch)
+        return loader.load()
+
+def stored(db) -> list:
+    return db.execute_query("SELECT source_id, date_key, amount FROM fact_sales ORDER BY source_id")
+
+def leftover_builds(db) -> list:
+    return db.execute_query("SELECT relname FROM pg_class WHERE relname LIKE 'fact_sales%load%' "
+                            "AND relnamespace = current_schema()::regnamespace")
+
+def test_partitions_built_and_swapped():
+    with throwaway_warehouse(TEST_SCHEMA) as db:
+        result = load(db, facts(('OPP1', 20240115, 100), ('OPP2', 20240210, 200)))
+        rows = stored(db)
+        months = db._partition_months('fact_sales')
+        builds = leftover_builds(db)
+    assert (result['staged'], result['inserted'], result['updated']) == (2, 2, 0)
+    assert rows == [('OPP1', 20240115, 100), ('OPP2', 20240210, 200)]
+    assert months == {202401, 202402}
+    assert builds == []
+
+def test_rebuild_carries_rows_over():
+    with throwaway_warehouse(TEST_SCHEMA) as db:
+        db.ensure_partitions('fact_sales', [20240115])
+        insert_fact(db, 'OPP1', 20240115)
+        insert_fact(db, 'OPP2', 20240115)
+        sales_key = db.execute_query("SELECT sales_key FROM fact_sales WHERE source_id = 'OPP2'")[0][0]
+        result = load(db, facts(('OPP2', 20240115, 250), ('OPP3', 20240115, 300)))
+        rows = stored(db)
+        kept_key = db.execute_query("SELECT sales_key FROM fact_sales WHERE source_id = 'OPP2'")[0][0]
+    # OPP1 is not in the load and is copied into the rebuilt partition untouched
+    assert rows == [('OPP1', 20240115, 100), ('OPP2', 20240115, 250), ('OPP3', 20240115, 300)]
+    assert (result['inserted'], result['updated']) == (1, 1)
+    assert kept_key == sales_key
+
+def test_moved_fact_leaves_old_month():
+    with throwaway_warehouse(TEST_SCHEMA) as db:
+        db.ensure_partitions('fact_sales', [20240115])
+        insert_fact(db, 'OPP1', 20240115)
+        insert_fact(db, 'OPP2', 20240115)
+        # OPP1 closes a month later than it was first loaded with; January is rebuilt without it
+        result = load(db, facts(('OPP1', 20240210, 100)))
+        rows = stored(db)
+    assert rows == [('OPP1', 20240210, 100), ('OPP2', 20240115, 100)]
+    assert result['moved_date_keys'] == [20240115]
+
+def test_failed_shard_retried():
+    with throwaway_warehouse(TEST_SCHEMA) as db:
+        db.execute(FAIL_FIRST_INSERT)
+        result = load(db, facts(('OPP1', 20240115, 100), ('OPP2', 20240210, 200)), retries=1)
+        rows = stored(db)
+    assert result['inserted'] == 2
+    assert [row[0] for row in rows] == ['OPP1', 'OPP2']
+
+def test_failed_shard_without_retries_rolls_back():
+    with throwaway_warehouse(TEST_SCHEMA) as db:
+        db.ensure_partitions('fact_sales', [20240115])
+        insert_fact(db, 'OPP1', 20240115)
+        db.execute(FAIL_FIRST_INSERT)
+        try:
+            load(db, facts(('OPP2', 20240115, 200), ('OPP3', 20240210, 300)))
+            raised = False
+        except ShardLoadError:
+            raised = True
+        rows = stored(db)
+        builds = leftover_builds(db)
+    assert raised
+    assert rows == [('OPP1', 20240115, 100)]
+    assert builds == []
+
+def test_failed_swap_rolls_back():
+    with throwaway_warehouse(TEST_SCHEMA) as db:
+        db.execute("INSERT INTO dim_date (date_key, full_date) VALUES (20240305, '2024-03-05') "
+                   "ON CONFLICT DO NOTHING")
+        db.ensure_partitions('fact_sales', [20240115])
+        insert_fact(db, 'OPP1', 20240115)
+        # A stray table with March's partition name: its build cannot be renamed into place
+        db.execute("CREATE TABLE fact_sales_202403 (LIKE fact_sales)")
+        with tempfile.TemporaryDirectory() as tmp:
+            staging = StagingArea(tmp)
+            loader = ParallelFactLoader(db, staging, staging.new_run(), 'fact_sales', KEY_COLUMNS,
+                                        MATCH_COLUMNS, workers=2, retries=0)
+            loader.add(facts(('OPP1', 20240115, 150), ('OPP2', 20240305, 200)))
+            try:
+                loader.load()
+                raised = False
+            except Exception:
+                raised = True
+        rows = stored(db)
+        months = db._partition_months('fact_sales')
+        builds = leftover_builds(db)
+    # Neither month landed: January keeps its stored row and the build tables are gone
+    assert raised
+    assert rows == [('OPP1', 20240115, 100)]
+    assert months == {202401}
+    assert builds == []
+
+def main():
+    print("=" * 80)
+    print("PARALLEL FACT LOAD TEST")
+    print("=" * 80)
+
+    try:
+        test_partitions_built_and_swapped()
+        print("✅ Month partitions are built by workers and swapped in")
+        test_rebuild_carries_rows_over()
+        print("✅ Rebuilt partitions keep rows outside the load and existing surrogate keys")
+        test_moved_fact_leaves_old_month()
+        print("✅ A fact moved to another month is removed from its old partition")
+        test_failed_shard_retried()
+        print("✅ A failed shard is retried")
+        test_failed_shard_without_retries_rolls_back()
+        print("✅ A shard that keeps failing leaves the warehouse unchanged")
+        test_failed_swap_rolls_back()
+        print("✅ A failed swap leaves the warehouse unchanged and drops the builds")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
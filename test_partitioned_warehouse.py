@@ -0,0 +1,271 @@
+"""Postgres fact_sales partitioning: migrating an older warehouse and atomic moved-fact reloads
+
+Runs against the configured Postgres in a throwaway schema that is dropped afterwards.
+"""
+import sys
+from contextlib import contextmanager
+import pandas as pd
+from models.database import DatabaseManager, SCHEMA_SQL
+
+TEST_SCHEMA = 'etl_test_partitions'
+
+# The warehouse as created by the first released schema.sql, before any migration
+BASELINE_SCHEMA = """
+    -- Customer Dimension
+    CREATE TABLE dim_customer (
+        customer_key SERIAL PRIMARY KEY,
+        customer_id VARCHAR(50) UNIQUE NOT NULL,
+        customer_name VARCHAR(255) NOT NULL,
+        customer_type VARCHAR(50),
+        industry VARCHAR(100),
+        email VARCHAR(255),
+        phone VARCHAR(50),
+        city VARCHAR(100),
+        state VARCHAR(50),
+        country VARCHAR(50),
+        created_date TIMESTAMP,
+        last_modified_date TIMESTAMP
+    );
+
+    -- Product Dimension
+    CREATE TABLE dim_product (
+        product_key SERIAL PRIMARY KEY,
+        product_id VARCHAR(50) UNIQUE NOT NULL,
+        product_name VARCHAR(255) NOT NULL,
+        product_category VARCHAR(100),
+        unit_price DECIMAL(10, 2),
+        is_active BOOLEAN DEFAULT TRUE,
+        created_date TIMESTAMP,
+        last_modified_date TIMESTAMP
+    );
+
+    -- Date Dimension
+    CREATE TABLE dim_date (
+        date_key INTEGER PRIMARY KEY,
+        full_date DATE UNIQUE NOT NULL,
+        day_of_week INTEGER,
+        day_name VARCHAR(10),
+        day_of_month INTEGER,
+        month INTEGER,
+        month_name VARCHAR(10),
+        quarter INTEGER,
+        year INTEGER,
+        is_weekend BOOLEAN
+    );
+
+    -- Territory Dimension
+    CREATE TABLE dim_territory (
+        territory_key SERIAL PRIMARY KEY,
+        territory_name VARCHAR(100) UNIQUE NOT NULL,
+        region VARCHAR(100),
+        is_active BOOLEAN DEFAULT TRUE
+    );
+
+    -- Sales Rep Dimension
+    CREATE TABLE dim_sales_rep (
+        sales_rep_key SERIAL PRIMARY KEY,
+        sales_rep_name VARCHAR(255) NOT NULL,
+        territory_key INTEGER,
+        region VARCHAR(100),
+        is_active BOOLEAN DEFAULT TRUE
+    );
+
+    -- Sales Fact Table
+    CREATE TABLE fact_sales (
+        sales_key SERIAL PRIMARY KEY,
+        date_key INTEGER,
+        customer_key INTEGER,
+        product_key INTEGER,
+        sales_rep_key INTEGER,
+        territory_key INTEGER,
+        amount DECIMAL(15, 2) NOT NULL,
+        quantity INTEGER DEFAULT 1,
+        is_won BOOLEAN DEFAULT FALSE,
+        is_closed BOOLEAN DEFAULT FALSE,
+        transaction_date TIMESTAMP NOT NULL,
+        source_system VARCHAR(50),
+        FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
+        FOREIGN KEY (customer_key) REFERENCES dim_customer(customer_key),
+        FOREIGN KEY (product_key) REFERENCES dim_product(product_key),
+        FOREIGN KEY (sales_rep_key) REFERENCES dim_sales_rep(sales_rep_key),
+        FOREIGN KEY (territory_key) REFERENCES dim_territory(territory_key)
+    );
+
+    -- ETL Log Table
+    CREATE TABLE etl_log (
+        log_id SERIAL PRIMARY KEY,
+        etl_process VARCHAR(100) NOT NULL,
+        source_system VARCHAR(50),
+        start_time TIMESTAMP NOT NULL,
+        end_time TIMESTAMP,
+        status VARCHAR(20),
+        records_processed INTEGER,
+        records_inserted INTEGER,
+        error_message TEXT,
+        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Populate Date Dimension
+    INSERT INTO dim_date (date_key, full_date, day_of_week, day_name, day_of_month, month, month_name, quarter, year, is_weekend)
+    SELECT 
+        TO_CHAR(date_series, 'YYYYMMDD')::INTEGER,
+        date_series::DATE,
+        EXTRACT(DOW FROM date_series)::INTEGER,
+        TO_CHAR(date_series, 'Day'),
+        EXTRACT(DAY FROM date_series)::INTEGER,
+        EXTRACT(MONTH FROM date_series)::INTEGER,
+        TO_CHAR(date_series, 'Month'),
+        EXTRACT(QUARTER FROM date_series)::INTEGER,
+        EXTRACT(YEAR FROM date_series)::INTEGER,
+        EXTRACT(DOW FROM date_series) IN (0, 6)
+    FROM generate_series('2023-01-01'::DATE, '2027-12-31'::DATE, '1 day'::INTERVAL) AS date_series;
+
+    -- Create indexes
+    CREATE INDEX idx_fact_sales_date ON fact_sales(date_key);
+    CREATE INDEX idx_fact_sales_customer ON fact_sales(customer_key);
+    CREATE INDEX idx_fact_sales_product ON fact_sales(product_key);
+"""
+
+@contextmanager
+def throwaway_warehouse(schema: str = TEST_SCHEMA, ddl: str = None):
+    """A warehouse created by ddl (schema.sql by default) in its own schema"""
+    admin = DatabaseManager()
+    admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+    db = DatabaseManager({**admin.connection_params, 'options': f"-c search_path={schema}"})
+    try:
+        db.execute(ddl or SCHEMA_SQL.read_text())
+        db.execute("INSERT INTO dim_date (date_key, full_date) VALUES "
+                   "(20240115, '2024-01-15'), (20240210, '2024-02-10'), (20240211, '2024-02-11') "
+                   "ON CONFLICT DO NOTHING")
+        db.execute("INSERT INTO dim_customer (customer_id, customer_name) VALUES ('SF001', 'Acme Corp')")
+        yield db
+    finally:
+        db.close()
+        admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        admin.close()
+
+def insert_fact(db, source_id: str, date_key: int, sales_key: int = None):
+    columns = "date_key, customer_key, amount, transaction_date, source_system, source_id"
+    values = "%s, 1, 100, %s, 'Salesforce', %s"
+    params = (date_key, f"{str(date_key)[:4]}-{str(date_key)[4:6]}-{str(date_key)[6:]}", source_id)
+    if sales_key is not None:
+        columns, values, params = f"sales_key, {columns}", f"%s, {values}", (sales_key,) + params
+    db.execute(f"INSERT INTO fact_sales ({columns}) VALUES ({values})", params)
+
+def insert_baseline_fact(db, date_key: int, sales_rep_key: int = None):
+    """A fact as the first pipeline loaded it, without a source_id"""
+    db.execute("INSERT INTO fact_sales (date_key, customer_key, sales_rep_key, amount, transaction_date, source_system) "
+               "VALUES (%s, 1, %s, 100, %s::text::date, 'Salesforce')", (date_key, sales_rep_key, date_key))
+
+def test_unpartitioned_facts_migrated():
+    with throwaway_warehouse(ddl=BASELINE_SCHEMA) as db:
+        for date_key in (20240115, 20240210, 20240211):
+            insert_baseline_fact(db, date_key)
+        # The operator has matched the old facts to their source records
+        db.execute("ALTER TABLE fact_sales ADD COLUMN source_id VARCHAR(50)")
+        db.execute("UPDATE fact_sales SET source_id = 'OPP' || sales_key")
+
+        assert db.initialize_schema() is False
+        months = db._partition_months('fact_sales')
+        rows = db.execute_query("SELECT sales_key, source_id FROM fact_sales ORDER BY sales_key")
+        insert_fact(db, 'OPP4', 20240211)
+        next_key = db.execute_query("SELECT sales_key FROM fact_sales WHERE source_id = 'OPP4'")[0][0]
+        legacy = db.execute_query("SELECT to_regclass('fact_sales_unpartitioned') IS NOT NULL")[0][0]
+    assert months == {202401, 202402}
+    assert rows == [(1, 'OPP1'), (2, 'OPP2'), (3, 'OPP3')]
+    assert next_key == 4
+    assert not legacy
+
+def test_facts_without_source_id_not_migrated():
+    with throwaway_warehouse(ddl=BASELINE_SCHEMA) as db:
+        insert_baseline_fact(db, 20240115)
+        try:
+            db.initialize_schema()
+            error = None
+        except RuntimeError as e:
+            error = str(e)
+        rows = db.execute_query("SELECT COUNT(*) FROM fact_sales")[0][0]
+        months = db._partition_months('fact_sales')
+    assert error and 'without a source_id' in error and 'backfill' in error
+    # The warehouse is left as it was for the operator to fix
+    assert rows == 1
+    assert months is None
+
+def test_duplicate_sales_reps_merged():
+    with throwaway_warehouse(ddl=BASELINE_SCHEMA) as db:
+        # The first pipeline inserted its reps again on every run
+        db.execute("INSERT INTO dim_sales_rep (sales_rep_name, region) "
+                   "VALUES ('Ann', 'West'), ('Bob', 'East'), ('Ann', 'West')")
+        insert_baseline_fact(db, 20240115, sales_rep_key=3)
+        db.execute("ALTER TABLE fact_sales ADD COLUMN source_id VARCHAR(50)")
+        db.execute("UPDATE fact_sales SET source_id = 'OPP1'")
+        db.initialize_schema()
+        reps = db.execute_query("SELECT sales_rep_key, sales_rep_name FROM dim_sales_rep ORDER BY 1")
+        fact_rep = db.execute_query("SELECT sales_rep_key FROM fact_sales")[0][0]
+        # Upserts conflict on the new unique key
+        reps_loaded = pd.DataFrame({'sales_rep_name': ['Ann', 'Cyd'], 'region': ['North', 'South']})
+        result = db.upsert('dim_sales_rep', reps_loaded, ['sales_rep_name'])
+    assert reps == [(1, 'Ann'), (2, 'Bob')]
+    assert fact_rep == 1
+    assert (result['inserted'], result['updated']) == (1, 1)
+
+def test_baseline_warehouse_upgraded():
+    tables = ['etl_watermark', 'agg_sales_daily', 'agg_sales_monthly', 'agg_refresh', 'load_generation',
+              'idx_etl_log_stage', 'idx_dim_customer_industry']
+    with throwaway_warehouse(ddl=BASELINE_SCHEMA) as db:
+        db.execute("INSERT INTO etl_log (etl_process, start_time, status) VALUES ('full', now(), 'SUCCESS')")
+        assert db.initialize_schema() is False
+        created = db.execute_query("SELECT to_regclass(name) IS NOT NULL FROM unnest(%s::text[]) name", (tables,))
+        log = db.execute_query("SELECT etl_process, stage, duration_seconds FROM etl_log")
+        generation = db.execute_query("SELECT generation FROM load_generation")
+        keys = db.execute_query("SELECT conrelid::regclass::text FROM pg_constraint "
+                                "WHERE contype = 'p' AND conrelid::regclass::text LIKE 'agg_sales_%%' ORDER BY 1")
+        months = db._partition_months('fact_sales')
+        # Upgrading again finds nothing left to do
+        assert db.initialize_schema() is False
+    assert all(exists for (exists,) in created)
+    assert log == [('full', None, None)]
+    assert generation == [(0,)]
+    assert keys == [('agg_sales_daily',), ('agg_sales_monthly',)]
+    assert months == set()
+
+def test_atomic_rolls_back_delete_and_partitions():
+    with throwaway_warehouse() as db:
+        db.ensure_partitions('fact_sales', [20240115])
+        insert_fact(db, 'OPP1', 20240115)
+        try:
+            with db.atomic():
+                db.execute("DELETE FROM fact_sales WHERE source_id = 'OPP1'")
+                db.ensure_partitions('fact_sales', [20240210])
+                raise RuntimeError("load failed after the delete")
+        except RuntimeError:
+            pass
+        kept = db.execute_query("SELECT COUNT(*) FROM fact_sales WHERE source_id = 'OPP1'")[0][0]
+        months = db._known_partitions('fact_sales')
+    assert kept == 1
+    # The partition created in the rolled back block is not remembered as existing
+    assert months == {202401}
+
+def main():
+    print("=" * 80)
+    print("PARTITIONED WAREHOUSE TEST")
+    print("=" * 80)
+
+    try:
+        test_unpartitioned_facts_migrated()
+        print("✅ An unpartitioned fact_sales is migrated with its rows and keys")
+        test_facts_without_source_id_not_migrated()
+        print("✅ Facts without a source_id are not migrated")
+        test_duplicate_sales_reps_merged()
+        print("✅ Duplicate sales reps are merged before their names are made unique")
+        test_baseline_warehouse_upgraded()
+        print("✅ A warehouse from the first schema.sql gains the tables, columns and keys added since")
+        test_atomic_rolls_back_delete_and_partitions()
+        print("✅ A failed atomic block keeps deleted facts and forgets its partitions")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Token buckets: burst and refill, server backoff headers, sharing across processes"""
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
+from connectors.rate_limiter import TokenBucket, SQLiteTokenBucket, get_rate_limiter
+
+def test_burst_then_refill_rate():
+    bucket = TokenBucket(10, 1, burst=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    # Two tokens of burst, then a token every 0.1s at 10 calls per second
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.05 < waits[2] <= 0.1
+    assert 0.15 < waits[3] <= 0.2
+
+def test_retry_after_blocks():
+    bucket = TokenBucket(100, 1)
+    bucket.update_from_headers({'Retry-After': '2'})
+    assert 1.9 < bucket.reserve() <= 2.0
+
+def test_limiters_shared_per_settings():
+    name = 'https://api.example.test'
+    first = get_rate_limiter(name, 100, 60, backend='memory')
+    assert get_rate_limiter(name, 100, 60, backend='memory') is first
+    # A caller with another rate does not silently inherit the first caller's
+    other = get_rate_limiter(name, 25, 1, backend='memory')
+    assert other is not first
+    assert other.rate == 25
+
+def reserve_from_process(path: str, count: int, results):
+    bucket = SQLiteTokenBucket('shared', 1, 1000, burst=5, path=Path(path))
+    results.put([bucket.reserve() for _ in range(count)])
+
+def test_sqlite_bucket_shared_across_processes():
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'rate_limits.sqlite')
+        results = context.Queue()
+        processes = [context.Process(target=reserve_from_process, args=(path, 5, results)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        waits = results.get(timeout=60) + results.get(timeout=60)
+        for process in processes:
+            process.join()
+    # The two processes draw on one burst of 5 between them
+    assert sum(wait == 0 for wait in waits) == 5
+    assert all(wait > 0 for wait in sorted(waits)[5:])
+
+async def tick_while(task) -> int:
+    ticks = 0
+    while not task.done():
+        await asyncio.sleep(0.01)
+        ticks += 1
+    return ticks
+
+async def acquire_and_tick(bucket) -> int:
+    acquire = asyncio.ensure_future(bucket.acquire_async())
+    update = asyncio.ensure_future(bucket.update_from_headers_async({'X-RateLimit-Remaining': '5'}))
+    ticks = await tick_while(asyncio.gather(acquire, update))
+    assert acquire.result() == 0.0
+    return ticks
+
+def test_sqlite_bucket_does_not_block_event_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'rate_limits.sqlite'
+        bucket = SQLiteTokenBucket('shared', 100, 1, path=path)
+        # Another process holds the bucket's write lock for a while
+        locked = threading.Event()
+
+        def hold_lock():
+            conn = sqlite3.connect(path, isolation_level=None)
+            conn.execute("BEGIN IMMEDIATE")
+            locked.set()
+            time.sleep(0.3)
+            conn.execute("COMMIT")
+            conn.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait()
+        ticks = asyncio.run(acquire_and_tick(bucket))
+        holder.join()
+    # Other coroutines keep running while the bucket waits for the lock
+    assert ticks >= 10
+
+def main():
+    print("=" * 80)
+    print("RATE LIMITER TEST")
+    print("=" * 80)
+
+    try:
+        test_burst_then_refill_rate()
+        print("✅ Token bucket allows its burst, then paces at its rate")
+        test_retry_after_blocks()
+        print("✅ Retry-After blocks the bucket")
+        test_limiters_shared_per_settings()
+        print("✅ Limiters are shared only between callers with the same rate")
+        test_sqlite_bucket_shared_across_processes()
+        print("✅ SQLite token bucket is shared across processes")
+        test_sqlite_bucket_does_not_block_event_loop()
+        print("✅ SQLite token bucket waits for its lock off the event loop")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Scheduler daemon: due sources, failure backoff, lock retries and graceful shutdown"""
+import os
+import sys
+import signal
+import tempfile
+from pathlib import Path
+from etl import scheduler
+from etl.run_lock import pipeline_lock
+from models.sqlite_database import SQLiteDatabaseManager
+
+INTERVALS = {'Salesforce': 300, 'Stripe': 60}
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class FakeKeys:
+    def save(self):
+        pass
+
+class FakePipeline:
+    """Returns the queued results in turn (SUCCESS by default) and records the sources of each run"""
+    def __init__(self, results=None, during_run=None):
+        self.results = list(results or [])
+        self.during_run = during_run
+        self.calls = []
+        self.keys = FakeKeys()
+
+    def run_incremental_pipeline(self, sources):
+        self.calls.append(list(sources))
+        if self.during_run:
+            self.during_run()
+        result = self.results.pop(0) if self.results else {'status': 'SUCCESS'}
+        return {'duration': 0.1, 'extract_errors': {}, **result}
+
+def make_scheduler(tmp: str, pipeline: FakePipeline) -> scheduler.PipelineScheduler:
+    db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+    daemon = scheduler.PipelineScheduler(db, intervals=INTERVALS, jitter=0, lock_path=Path(tmp) / 'pipeline.lock')
+    daemon.pipeline = pipeline
+    return daemon
+
+def with_clock(test):
+    def run():
+        clock, real_time = Clock(), scheduler.time
+        scheduler.time = clock
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                test(tmp, clock)
+        finally:
+            scheduler.time = real_time
+    run.__name__ = test.__name__
+    return run
+
+@with_clock
+def test_due_sources_share_a_run(tmp, clock):
+    pipeline = FakePipeline()
+    daemon = make_scheduler(tmp, pipeline)
+    try:
+        assert daemon.ready() == [] and daemon.run_due() is None
+        daemon._due.update(['Stripe', 'Salesforce'])
+        assert daemon.run_due()['status'] == 'SUCCESS'
+    finally:
+        daemon.close()
+    assert pipeline.calls == [['Salesforce', 'Stripe']]
+    assert daemon._due == set()
+
+@with_clock
+def test_failed_sources_back_off(tmp, clock):
+    pipeline = FakePipeline([
+        {'status': 'PARTIAL', 'extract_errors': {'Stripe': 'timed out'}},
+        {'status': 'FAILED', 'error': 'warehouse unreachable'},
+        {'status': 'FAILED', 'error': 'warehouse unreachable'},
+    ])
+    daemon = make_scheduler(tmp, pipeline)
+    try:
+        daemon._due.update(INTERVALS)
+        daemon.run_due()
+        # Only the failed source is due again, after the first backoff
+        assert daemon._due == {'Stripe'}
+        assert daemon.ready() == []
+        clock.now += scheduler.FAILURE_RETRY_SECONDS
+        assert daemon.ready() == ['Stripe']
+        daemon.run_due()
+        # The second failure doubles the backoff, capped at Stripe's 60s interval
+        clock.now += scheduler.FAILURE_RETRY_SECONDS
+        assert daemon.ready() == []
+        clock.now += 60 - scheduler.FAILURE_RETRY_SECONDS
+        daemon.run_due()
+        clock.now += 60
+        daemon.run_due()
+        failures = dict(daemon._failures)
+    finally:
+        daemon.close()
+    assert pipeline.calls == [['Salesforce', 'Stripe'], ['Stripe'], ['Stripe'], ['Stripe']]
+    # The last run succeeded, so Stripe is back on its schedule
+    assert failures == {}
+    assert daemon._due == set()
+
+@with_clock
+def test_locked_run_retried(tmp, clock):
+    pipeline = FakePipeline()
+    daemon = make_scheduler(tmp, pipeline)
+    try:
+        daemon._due.add('Stripe')
+        with pipeline_lock(daemon.lock_path):
+            assert daemon.run_due() is None
+        # The source stays due, but waits before trying the lock again
+        assert daemon._due == {'Stripe'}
+        assert daemon.ready() == []
+        clock.now += scheduler.LOCK_RETRY_SECONDS
+        assert daemon.run_due()['status'] == 'SUCCESS'
+    finally:
+        daemon.close()
+    assert pipeline.calls == [['Stripe']]
+
+def test_sigterm_finishes_current_run():
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    with tempfile.TemporaryDirectory() as tmp:
+        # The signal arrives mid-run; the run completes and no further run starts
+        pipeline = FakePipeline(during_run=lambda: os.kill(os.getpid(), signal.SIGTERM))
+        daemon = make_scheduler(tmp, pipeline)
+        try:
+            daemon.run_forever()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+    assert daemon.runs == 1
+    assert pipeline.calls == [['Salesforce', 'Stripe']]
+
+def main():
+    print("=" * 80)
+    print("SCHEDULER TEST")
+    print("=" * 80)
+
+    try:
+        test_due_sources_share_a_run()
+        print("✅ Due sources share one run")
+        test_failed_sources_back_off()
+        print("✅ Failed sources stay due behind a doubling backoff")
+        test_locked_run_retried()
+        print("✅ A run blocked by the lock is retried")
+        test_sigterm_finishes_current_run()
+        print("✅ SIGTERM stops the daemon after the current run")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
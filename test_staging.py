@@ -0,0 +1,68 @@
+"""Parquet staging: a failed or cancelled extract leaves no part files behind"""
+import sys
+import tempfile
+import pandas as pd
+from etl.staging import StagingArea
+
+def chunks_then_error(count: int):
+    for n in range(count):
+        yield pd.DataFrame({'id': range(n * 100, (n + 1) * 100)})
+    raise ConnectionError("connection reset mid-extract")
+
+def test_failed_write_removes_parts():
+    with tempfile.TemporaryDirectory() as tmp:
+        staging = StagingArea(tmp, rows_per_file=250, batch_rows=100)
+        run_id = staging.new_run()
+        try:
+            # Fails with one complete part file and a second still open
+            staging.write(run_id, 'Stripe', 'charges', chunks_then_error(4))
+            failed = False
+        except ConnectionError:
+            failed = True
+        left = list(staging._entity_dir(run_id, 'Stripe', 'charges').glob('*.parquet'))
+        # The next attempt starts from an empty entity directory
+        staged = staging.write(run_id, 'Stripe', 'charges', pd.DataFrame({'id': range(10)}))
+        rows = len(staging.read(run_id, 'Stripe', 'charges'))
+    assert failed
+    assert left == []
+    assert staged['files'] == ['part-00000.parquet']
+    assert rows == 10
+
+def test_interrupted_write_removes_parts():
+    with tempfile.TemporaryDirectory() as tmp:
+        staging = StagingArea(tmp, rows_per_file=250, batch_rows=100)
+        run_id = staging.new_run()
+        chunks = chunks_then_error(10)
+        writes = []
+
+        def stop_after_two():
+            for chunk in chunks:
+                writes.append(chunk)
+                if len(writes) == 2:
+                    raise KeyboardInterrupt
+                yield chunk
+
+        try:
+            staging.write(run_id, 'Stripe', 'charges', stop_after_two())
+        except KeyboardInterrupt:
+            pass
+        left = list(staging._entity_dir(run_id, 'Stripe', 'charges').glob('*.parquet'))
+    assert left == []
+
+def main():
+    print("=" * 80)
+    print("STAGING TEST")
+    print("=" * 80)
+
+    try:
+        test_failed_write_removes_parts()
+        print("✅ A failed extract leaves no part files")
+        test_interrupted_write_removes_parts()
+        print("✅ An interrupted extract leaves no part files")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
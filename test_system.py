@@ -2,6 +2,7 @@
 import sys
 from config.logger import setup_logger
 from models.database import db_manager
+from config.settings import load_env
 
 logger = setup_logger(__name__)
 
@@ -38,6 +39,7 @@ def test_database():
         return False
 
 def main():
+    load_env()
     print("\n" + "=" * 80)
     print("SALES API PIPELINE - SYSTEM TEST")
     print("=" * 80)
@@ -0,0 +1,86 @@
+"""Incremental runs: watermarks only move forward, and upserts report what they inserted and updated
+
+Each test runs against SQLite and, in a throwaway schema, the configured Postgres.
+"""
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+from etl.watermarks import WatermarkStore
+from models.sqlite_database import SQLiteDatabaseManager
+from test_partitioned_warehouse import throwaway_warehouse
+
+@contextmanager
+def sqlite_warehouse():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDatabaseManager(Path(tmp) / 'warehouse.db')
+        db.initialize_schema()
+        try:
+            yield db
+        finally:
+            db.close()
+
+def warehouses():
+    return [sqlite_warehouse(), throwaway_warehouse('etl_test_watermarks')]
+
+def modified(*dates) -> pd.DataFrame:
+    return pd.DataFrame({'last_modified': pd.to_datetime(list(dates))})
+
+def check_watermarks(db):
+    store = WatermarkStore(db)
+    assert store.get('Salesforce', 'accounts') is None
+    assert store.advance('Salesforce', 'accounts', modified('2024-01-10', '2024-01-12'), 'last_modified') \
+        == pd.Timestamp('2024-01-12')
+    # An older batch (a replayed page, say) does not move the mark back
+    store.advance('Salesforce', 'accounts', modified('2024-01-05'), 'last_modified')
+    assert pd.Timestamp(store.get('Salesforce', 'accounts')) == pd.Timestamp('2024-01-12')
+    store.advance('Salesforce', 'accounts', modified('2024-02-01'), 'last_modified')
+    assert pd.Timestamp(store.get('Salesforce', 'accounts')) == pd.Timestamp('2024-02-01')
+    # Nothing extracted, or no timestamps: nothing to advance to
+    assert store.advance('Salesforce', 'accounts', modified(), 'last_modified') is None
+    assert store.advance('Salesforce', 'accounts', modified(None), 'last_modified') is None
+    assert pd.Timestamp(store.get('Salesforce', 'accounts')) == pd.Timestamp('2024-02-01')
+    # Marks are per source and entity
+    assert store.get('Salesforce', 'opportunities') is None
+
+def check_upsert_counts(db):
+    customers = pd.DataFrame({'customer_id': ['C1', 'C2'], 'customer_name': ['Acme', 'Globex']})
+    first = db.upsert('dim_customer', customers, ['customer_id'])
+    again = db.upsert('dim_customer', customers, ['customer_id'])
+    changed = pd.DataFrame({'customer_id': ['C1', 'C2', 'C3'], 'customer_name': ['Acme', 'Globex Inc', 'Initech']})
+    update = db.upsert('dim_customer', changed, ['customer_id'])
+    names = dict(db.execute_query("SELECT customer_id, customer_name FROM dim_customer WHERE customer_id LIKE 'C%'"))
+    assert (first['staged'], first['inserted'], first['updated']) == (2, 2, 0)
+    # Rows identical to the stored ones are neither inserted nor updated
+    assert (again['inserted'], again['updated']) == (0, 0)
+    assert (update['staged'], update['inserted'], update['updated']) == (3, 1, 1)
+    assert names == {'C1': 'Acme', 'C2': 'Globex Inc', 'C3': 'Initech'}
+
+def test_watermarks_only_advance():
+    for warehouse in warehouses():
+        with warehouse as db:
+            check_watermarks(db)
+
+def test_upsert_counts():
+    for warehouse in warehouses():
+        with warehouse as db:
+            check_upsert_counts(db)
+
+def main():
+    print("=" * 80)
+    print("WATERMARK AND UPSERT TEST")
+    print("=" * 80)
+
+    try:
+        test_watermarks_only_advance()
+        print("✅ Watermarks advance to the newest timestamp and never move back")
+        test_upsert_counts()
+        print("✅ Upserts count inserted and updated rows, skipping unchanged ones")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Test failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())